@@ -0,0 +1,27 @@
+"""Release notes generation from the changes between two commits.
+
+Importing the package needs no credentials: API clients are created on first
+use, and PyGithub, httpx and openai are only imported by the code paths that
+need them. The command line entry point is ``python -m release_notes``.
+"""
+from .analysis import (
+    analyze_change_stream,
+    analyze_changes_with_ai,
+    analyze_file_changes,
+    determine_version_increment,
+)
+from .notes import format_release_notes, render_release_notes, update_release_notes
+from .patches import parse_patch
+from .versioning import increment_version
+
+__all__ = [
+    'analyze_change_stream',
+    'analyze_changes_with_ai',
+    'analyze_file_changes',
+    'determine_version_increment',
+    'format_release_notes',
+    'increment_version',
+    'parse_patch',
+    'render_release_notes',
+    'update_release_notes',
+]
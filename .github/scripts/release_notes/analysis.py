@@ -0,0 +1,513 @@
+"""Per-file change analysis and the streaming pipeline that runs it."""
+import os
+import logging
+import itertools
+
+from .instrumentation import export_aggregates, get_tracer, merge_aggregates, span
+from .models import snapshot_file
+from .moves import moves_enabled, pair_moves
+from .patches import parse_patch
+from .paths import SKIPPED_KINDS, skip_reason
+from .records import FileRecord, FileStatus
+from .rules import get_rule_engine
+from .summarize import ExcerptSelector, file_excerpt
+from .triage import classify_commits, settling_rule, tiering_enabled
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the per-file analysis changes so cached results are not reused
+ANALYZER_VERSION = "6"
+
+# Files per task sent to an analysis worker process
+ANALYSIS_CHUNK_SIZE = 32
+
+# Below this much patch text a batch is analyzed in-process; pickling would cost more
+PARALLEL_MIN_PATCH_BYTES = 256 * 1024
+
+def analyze_ui_changes(parsed, filename=None):
+    """Analyze UI changes in HTML/Blade files."""
+    return [message for _, message in get_rule_engine().evaluate('ui', parsed, filename)]
+
+def rule_status(file):
+    """Return the status the rule table sees: a moved or copied file's edits count as modifications."""
+    return 'modified' if file.status in ('renamed', 'copied') else file.status
+
+def file_version_increment(file, parsed):
+    """Return 'major', 'minor' or None for the version bump a single file calls for."""
+    return get_rule_engine().bump(parsed, file.filename, rule_status(file))
+
+def file_calls_for_major(file, parsed):
+    """Tell whether a file calls for a major release, looking only at the rules that can say so."""
+    return get_rule_engine().bump(parsed, file.filename, rule_status(file), until='major') == 'major'
+
+def version_increment_flags(bumps):
+    """Collapse per-file bumps into (major, minor, patch) increment flags."""
+    major_increment = 'major' in bumps
+    minor_increment = not major_increment and 'minor' in bumps
+
+    # If no major or minor changes, increment patch
+    patch_increment = not major_increment and not minor_increment
+
+    return major_increment, minor_increment, patch_increment
+
+def triage_file(file):
+    """Return (skip reason, settling rule) of a file; only when both are None does its patch need reading."""
+    reason = skip_reason(file)
+    return reason, settling_rule(file) if reason is None else None
+
+def determine_version_increment(changes):
+    """Determine how to increment the version based on the type of changes.
+
+    Files a metadata rule settles call for that rule's bump. Every other
+    file is first checked for a major change, which takes keyword lookups
+    only; the rules that extract symbols are only run if there is none, and
+    only until the first file that calls for a minor release.
+    """
+    files = []
+    bumps = set()
+    for file in changes['files']:
+        reason, rule = triage_file(file)
+        if rule is not None:
+            bumps.add(rule.bump)
+        elif reason is None:
+            files.append(file)
+
+    # Check for breaking changes (MAJOR version increment)
+    if 'major' in bumps:
+        return version_increment_flags(bumps)
+    for file in files:
+        if file_calls_for_major(file, parse_patch(getattr(file, 'patch', None))):
+            return version_increment_flags({'major'})
+
+    # Check for new features (MINOR version increment)
+    for file in files:
+        if 'minor' in bumps:
+            break
+        bumps.add(file_version_increment(file, parse_patch(getattr(file, 'patch', None))))
+
+    return version_increment_flags(bumps)
+
+def counted_file_analysis(file, changes):
+    """Summarize a file from its line counts alone, with the given description of its changes."""
+    additions = file.additions if file.status != 'removed' else 0
+    deletions = file.deletions if file.status != 'added' else 0
+    analysis = {
+        'status': file.status,
+        'filename': file.filename,
+        'changes': changes,
+        'additions': additions,
+        'deletions': deletions
+    }
+    if file.status in ('renamed', 'copied'):
+        analysis['previous_filename'] = file.previous_filename
+    return analysis
+
+def skipped_file_analysis(file, reason):
+    """Summarize a file the path filter skips from its line counts alone."""
+    return counted_file_analysis(file, f"{SKIPPED_KINDS[reason]}, not analyzed")
+
+def detected_changes(file, parsed):
+    """Return what a file's patch changes: UI changes first, then the code changes, as listed in the rule table."""
+    changes = analyze_ui_changes(parsed, file.filename)
+    changes.extend(message for _, message in get_rule_engine().evaluate('summary', parsed, file.filename))
+    return changes
+
+def analyze_file_changes(file, parsed=None):
+    """Analyze changes in a specific file."""
+    reason, rule = triage_file(file)
+    if reason is not None:
+        return skipped_file_analysis(file, reason)
+    if rule is not None:
+        return counted_file_analysis(file, rule.message)
+
+    try:
+        # Get the file content before and after the change
+        if hasattr(file, 'raw_url'):
+            # For added files, we only have the new content
+            if file.status == 'added':
+                return {
+                    'status': 'added',
+                    'filename': file.filename,
+                    'changes': 'New file added',
+                    'additions': file.additions,
+                    'deletions': 0
+                }
+
+            # For modified files, we need to get the diff
+            elif file.status == 'modified':
+                # Get the patch to analyze the changes
+                if parsed is None:
+                    parsed = parse_patch(getattr(file, 'patch', None))
+
+                # Count the number of additions and deletions
+                additions = file.additions
+                deletions = file.deletions
+
+                changes = detected_changes(file, parsed)
+
+                # If no specific changes were detected, provide a generic message
+                if not changes:
+                    changes = ["Code modifications"]
+
+                return {
+                    'status': 'modified',
+                    'filename': file.filename,
+                    'changes': ", ".join(changes),
+                    'additions': additions,
+                    'deletions': deletions
+                }
+
+            # For removed files, we only know it was deleted
+            elif file.status == 'removed':
+                return {
+                    'status': 'removed',
+                    'filename': file.filename,
+                    'changes': 'File removed',
+                    'additions': 0,
+                    'deletions': file.deletions
+                }
+
+            # For moved and copied files, only the edits made along the way are analyzed
+            elif file.status in ('renamed', 'copied'):
+                if parsed is None:
+                    parsed = parse_patch(getattr(file, 'patch', None))
+                if parsed.hunks:
+                    changes = detected_changes(file, parsed) or ["Code modifications"]
+                else:
+                    changes = [f"{'Moved' if file.status == 'renamed' else 'Copied'} from {file.previous_filename}"]
+
+                return {
+                    'status': file.status,
+                    'filename': file.filename,
+                    'previous_filename': file.previous_filename,
+                    'changes': ", ".join(changes),
+                    'additions': file.additions,
+                    'deletions': file.deletions
+                }
+
+        # Fallback for files without raw_url
+        return {
+            'status': file.status,
+            'filename': file.filename,
+            'changes': f"File {file.status}",
+            'additions': getattr(file, 'additions', 0),
+            'deletions': getattr(file, 'deletions', 0)
+        }
+    except Exception as e:
+        logger.error(f"Error analyzing file {file.filename}: {str(e)}")
+        return {
+            'status': file.status,
+            'filename': file.filename,
+            'changes': f"Error analyzing changes: {str(e)}",
+            'additions': 0,
+            'deletions': 0
+        }
+
+def new_analysis_summary():
+    """Create the running totals that analyze_changes_with_ai reports on."""
+    return {
+        'added': [],
+        'modified': [],
+        'moved': [],
+        'removed': [],
+        'files': 0,
+        'additions': 0,
+        'deletions': 0
+    }
+
+def add_file_analysis(summary, record):
+    """Fold one file's record into the summary, keeping only its summary line."""
+    status = record.status
+    if status == FileStatus.ADDED:
+        summary['added'].append(f"- {record.filename}")
+    elif status == FileStatus.MODIFIED:
+        summary['modified'].append(f"- {record.filename}: {record.changes} (+{record.additions}/-{record.deletions} lines)")
+    elif status == FileStatus.RENAMED:
+        if record.additions or record.deletions:
+            summary['moved'].append(f"- {record.previous_filename} -> {record.filename}: {record.changes} (+{record.additions}/-{record.deletions} lines)")
+        else:
+            summary['moved'].append(f"- {record.previous_filename} -> {record.filename}")
+    elif status == FileStatus.COPIED:
+        summary['added'].append(f"- {record.filename} (copied from {record.previous_filename})")
+    elif status == FileStatus.REMOVED:
+        summary['removed'].append(f"- {record.filename}")
+
+    summary['files'] += 1
+    summary['additions'] += record.additions
+    summary['deletions'] += record.deletions
+
+def render_analysis_summary(summary):
+    """Render the accumulated file analyses as a detailed summary."""
+    lines = []
+
+    # Summary of added files
+    if summary['added']:
+        lines.append("Added Files:")
+        lines.extend(summary['added'])
+
+    # Summary of modified files
+    if summary['modified']:
+        lines.append("\nModified Files:")
+        lines.extend(summary['modified'])
+
+    # Summary of moved files
+    if summary['moved']:
+        lines.append("\nMoved Files:")
+        lines.extend(summary['moved'])
+
+    # Summary of removed files
+    if summary['removed']:
+        lines.append("\nRemoved Files:")
+        lines.extend(summary['removed'])
+
+    # Add a general summary
+    lines.append(f"\nTotal Changes: {summary['files']} files changed, {summary['additions']} additions, {summary['deletions']} deletions")
+
+    return "\n".join(lines)
+
+def analyze_changes_with_ai(changes):
+    """Analyze code changes and generate a detailed summary."""
+    logger.info("Analyzing code changes")
+    try:
+        summary = new_analysis_summary()
+        for file in changes['files']:
+            add_file_analysis(summary, FileRecord.from_analysis(analyze_file_changes(file)))
+
+        return render_analysis_summary(summary)
+    except Exception as e:
+        logger.error(f"Failed to analyze changes: {str(e)}")
+        return "Unable to generate detailed summary due to an error."
+
+def new_note_categories():
+    """Create the empty release note sections, in the order they are rendered."""
+    return {key: [] for key, _ in get_rule_engine().sections}
+
+def file_note_entries(file, parsed):
+    """Return the release note entries one changed file contributes, by category."""
+    if file.status != 'modified' and (file.status not in ('renamed', 'copied') or not parsed.hunks):
+        # A file moved or copied without edits has nothing to note, like an added or removed one
+        return None
+
+    entries = {key: [] for key, _ in get_rule_engine().sections if key != 'other'}
+    for section, message in get_rule_engine().evaluate('notes', parsed, file.filename, rule_status(file)):
+        entries.setdefault(section, []).append(message)
+    return entries
+
+def add_file_note_entries(categories, filename, entries):
+    """Merge one file's release note entries into the running categories."""
+    if entries is None:
+        return
+
+    for key, changes in entries.items():
+        categories[key].extend(changes)
+
+    # Other changes
+    if not any(changes for key, changes in categories.items() if key != 'other'):
+        categories['other'].append(f"Updated {filename}")
+
+def skipped_file_note_entries(file):
+    """Return the note entries of a skipped file: none of its own, like a modified file with no detected changes."""
+    return {} if file.status == 'modified' else None
+
+def categorize_file_changes(file, parsed, categories):
+    """Add the release note entries for one changed file to the categories."""
+    add_file_note_entries(categories, file.filename, file_note_entries(file, parsed))
+
+def compact_note_entries(entries):
+    """Return note entries as the (section index, message) pairs a record keeps, None staying None."""
+    if entries is None:
+        return None
+    index = {key: number for number, (key, _) in enumerate(get_rule_engine().sections)}
+    return tuple((index[key], message) for key, messages in entries.items() for message in messages)
+
+def add_record_note_entries(categories, record):
+    """Merge the release note entries of a record into the running categories."""
+    if record.notes is None:
+        return
+    keys = [key for key, _ in get_rule_engine().sections]
+    entries = {}
+    for section, message in record.notes:
+        entries.setdefault(keys[section], []).append(message)
+    add_file_note_entries(categories, record.filename, entries)
+
+def analyze_file(file, parsed):
+    """Run every per-file stage and return a record that no longer refers to the patch."""
+    with span('analyze_file_changes', aggregate=True):
+        record = FileRecord.from_analysis(analyze_file_changes(file, parsed))
+    with span('file_version_increment', aggregate=True):
+        record.bump = file_version_increment(file, parsed)
+    with span('file_note_entries', aggregate=True):
+        record.notes = compact_note_entries(file_note_entries(file, parsed))
+    with span('file_excerpt', aggregate=True):
+        record.excerpt = file_excerpt(file, parsed)
+    return record
+
+def skipped_file_record(file, reason):
+    """Return the analysis record of a file the path filter skips, without reading its patch."""
+    record = FileRecord.from_analysis(skipped_file_analysis(file, reason))
+    record.notes = compact_note_entries(skipped_file_note_entries(file))
+    return record
+
+def settled_file_record(file, rule):
+    """Return the record of a file a metadata rule settles, with the rule's description and bump."""
+    record = FileRecord.from_analysis(counted_file_analysis(file, rule.message))
+    record.bump = rule.bump
+    record.notes = compact_note_entries(skipped_file_note_entries(file))
+    return record
+
+def analyze_file_batch(files):
+    """Analyze a chunk of files."""
+    records = []
+    for file in files:
+        records.append(analyze_file(file, parse_patch(file.patch)))
+    return records
+
+def analyze_worker_batch(files):
+    """Analyze a chunk of files in a worker process, returning the records and their timings."""
+    return analyze_file_batch(files), export_aggregates()
+
+def get_analysis_workers():
+    """Return the number of analysis processes from RELEASE_NOTES_WORKERS, default one per CPU."""
+    workers = os.environ.get('RELEASE_NOTES_WORKERS')
+    return max(1, int(workers)) if workers else (os.cpu_count() or 1)
+
+def iter_file_records(files, cache=None, workers=1, executor=None):
+    """Yield (filename, record) for every changed file, in stream order.
+
+    Files are read from the stream a window at a time. Files the path filter
+    skips or a metadata rule settles are summarized from their path and line
+    counts without hashing or parsing their patch. Cache hits are served
+    directly, and the misses are analyzed in chunks across a process pool,
+    which is only started once a window carries enough patch text to be
+    worth it.
+    Results are put back in stream order before they are yielded, so the
+    output never depends on which worker finished first. A pool passed in as
+    executor, e.g. one shared by the repositories of a batch, is used instead
+    and left running.
+    """
+    files = iter(files)
+    window_size = max(1, workers) * ANALYSIS_CHUNK_SIZE * 4
+    owns_executor = executor is None
+    tracer = get_tracer()
+    skipped = 0
+    settled = 0
+
+    try:
+        while True:
+            window = list(itertools.islice(files, window_size))
+            if not window:
+                break
+
+            keys = [None] * len(window)
+            records = [None] * len(window)
+            pending = []
+            for index, file in enumerate(window):
+                reason, rule = triage_file(file)
+                if reason is not None:
+                    records[index] = skipped_file_record(file, reason)
+                    skipped += 1
+                    tracer.count('patch_scans_skipped')
+                    continue
+                if rule is not None:
+                    records[index] = settled_file_record(file, rule)
+                    settled += 1
+                    tracer.count('patch_scans_skipped')
+                    continue
+                if cache is not None:
+                    keys[index] = cache.key(file)
+                    cached = cache.get(keys[index])
+                    if cached is not None:
+                        records[index] = FileRecord.from_json(cached)
+                if records[index] is None:
+                    pending.append(index)
+
+            snapshots = [snapshot_file(window[index]) for index in pending]
+            patch_bytes = sum(len(snapshot.patch or "") for snapshot in snapshots)
+            if workers > 1 and patch_bytes >= PARALLEL_MIN_PATCH_BYTES:
+                if executor is None:
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    logger.info(f"Starting {workers} analysis worker processes")
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                chunks = [snapshots[start:start + ANALYSIS_CHUNK_SIZE]
+                          for start in range(0, len(snapshots), ANALYSIS_CHUNK_SIZE)]
+                analyzed = []
+                for batch, timings in executor.map(analyze_worker_batch, chunks):
+                    analyzed.extend(batch)
+                    merge_aggregates(timings)
+            else:
+                analyzed = analyze_file_batch(snapshots)
+
+            for index, record in zip(pending, analyzed):
+                records[index] = record
+                if cache is not None:
+                    cache.put(keys[index], record.to_json())
+
+            for file, record in zip(window, records):
+                yield file.filename, record
+
+        if skipped:
+            logger.info(f"Skipped {skipped} lockfile, vendored, generated or binary files by path")
+        if settled:
+            logger.info(f"Settled {settled} files from their path, status and line counts without scanning their patch")
+    finally:
+        if owns_executor and executor is not None:
+            executor.shutdown()
+
+def analyze_change_stream(changes, cache=None, workers=1, executor=None, commits=None):
+    """Run every analysis stage over the changed files in a single streaming pass.
+
+    Files are parsed, analyzed and categorized as the change source yields them
+    and released afterwards, so memory is bounded by the notes being collected
+    rather than by the size of the compare. With a cache, files whose diff was
+    analyzed in an earlier run are not parsed at all, and with more than one
+    worker the remaining files are analyzed in parallel. The most significant
+    patch excerpts are kept, within the summary's token budget, for the model.
+    Removed and added files with the same content are joined into moves, so
+    only the edits made along the way are analyzed. The commit info dicts of
+    the range, if given, are classified by their Conventional Commit
+    messages first; their bump and note entries are added to the files'.
+    """
+    logger.info("Analyzing code changes")
+    commit_tier = classify_commits(commits) if commits and tiering_enabled() else None
+    bumps = set()
+    summary = new_analysis_summary()
+    categories = new_note_categories()
+    excerpts = ExcerptSelector()
+    changed_files = []
+
+    files = pair_moves(changes['files']) if moves_enabled() else changes['files']
+    for filename, record in iter_file_records(files, cache, workers, executor):
+        bumps.add(record.bump)
+        add_file_analysis(summary, record)
+        add_record_note_entries(categories, record)
+        excerpts.add(filename, record.excerpt)
+        changed_file = {
+            'filename': filename,
+            'status': str(record.status),
+            'additions': record.additions,
+            'deletions': record.deletions
+        }
+        if record.previous_filename is not None:
+            changed_file['previous_filename'] = record.previous_filename
+        changed_files.append(changed_file)
+
+    if commit_tier is not None:
+        bumps.add(commit_tier['bump'])
+        for section, entries in commit_tier['entries'].items():
+            categories[section].extend(entries)
+
+    logger.info(f"Analyzed {summary['files']} changed files")
+    if excerpts.dropped:
+        logger.info(f"Left {excerpts.dropped} less significant file excerpts out of the summary's token budget")
+    if cache is not None:
+        cache.evict()
+        cache.log_stats()
+
+    return {
+        'version_increment': version_increment_flags(bumps),
+        'analysis_summary': render_analysis_summary(summary),
+        'categories': categories,
+        'files': changed_files,
+        'excerpts': excerpts.selected()
+    }
@@ -0,0 +1,191 @@
+"""Resumable backfill of release notes over existing history.
+
+A backfill turns a stretch of history in the local checkout into a series
+of releases: one per commit on the first-parent line, or one per tag, from
+the `from` ref (the root commit by default) to the `to` ref. The releases
+are analyzed in parallel worker processes, a window at a time, but are
+versioned and stored strictly in order: each release's version increment is
+applied to the version of the release before it, starting from the `from`
+ref's version tag, --start-version or 1.0.0.
+
+Progress is checkpointed to backfill.json in the notes store after every
+stored release, together with the list of steps, so an interrupted backfill
+started again with the same range carries on after the last stored release.
+At most one window of analyzed but unstored releases is lost on an
+interruption.
+"""
+import os
+import sys
+import json
+import logging
+
+from .instrumentation import span
+from .store import ReleaseNotesStore, atomic_write
+from .versioning import CURRENT_VERSION, increment_version, version_from_ref
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'backfill.json'
+
+# Releases analyzed ahead of the one being stored, per worker
+WINDOW_PER_WORKER = 2
+
+# How often progress is logged, in stored releases
+PROGRESS_INTERVAL = 50
+
+def backfill_steps(source, from_ref, to_ref, by):
+    """Return the [base, head, label] of every release between two refs, oldest first."""
+    head = source.resolve(to_ref)
+    base = source.resolve(from_ref) if from_ref else None
+    if by == 'tags':
+        tags = source.tags_between(base, head)
+        if base is None and tags:
+            # History before the first tag is its release; it starts at the root commit
+            base = source.first_parent_commits(None, tags[0][1])[0]
+        steps = []
+        for name, sha in tags:
+            if sha != base:
+                steps.append([base, sha, name])
+            base = sha
+        return steps
+
+    commits = source.first_parent_commits(base, head)
+    if base is None:
+        # The root commit has no parent to compare with, so the walk starts from it
+        base, commits = commits[0], commits[1:]
+    steps = []
+    for sha in commits:
+        steps.append([base, sha, sha[:12]])
+        base = sha
+    return steps
+
+def init_backfill_worker():
+    # Each worker analyzes one release at a time; nested process pools would only compete
+    os.environ['RELEASE_NOTES_WORKERS'] = '1'
+    logging.disable(logging.INFO)
+
+def analyze_backfill_step(workspace, base, head):
+    """Analyze one release of a backfill in a worker process."""
+    from .local_git import LocalGitChangeSource
+    from .pipeline import analyze_release
+
+    return analyze_release(head, base, source=LocalGitChangeSource(workspace))
+
+class Backfill:
+    """A backfill of one range into one notes store, and its checkpoint."""
+
+    def __init__(self, workspace=None, store=None):
+        from .local_git import LocalGitChangeSource
+
+        self.workspace = workspace or os.environ.get('GITHUB_WORKSPACE', '.')
+        self.source = LocalGitChangeSource(self.workspace)
+        self.store = store or ReleaseNotesStore()
+        self.checkpoint_path = self.store.directory / CHECKPOINT_NAME
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.error(f"Failed to read backfill checkpoint {self.checkpoint_path}: {str(e)}")
+            sys.exit(1)
+
+    def save_checkpoint(self, checkpoint):
+        self.store.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.checkpoint_path, json.dumps(checkpoint, separators=(',', ':')))
+
+    def plan(self, from_ref, to_ref, by, start_version=None, restart=False):
+        """Return the checkpoint to work from: the stored one for this range, or a fresh plan."""
+        checkpoint = None if restart else self.load_checkpoint()
+        if checkpoint is not None:
+            if checkpoint['range'] != [from_ref, to_ref, by]:
+                logger.error(f"{self.checkpoint_path} belongs to a backfill of {checkpoint['range']}; "
+                             f"finish it, or start over with --restart")
+                sys.exit(1)
+            logger.info(f"Resuming backfill after {checkpoint['done']} of {len(checkpoint['steps'])} releases")
+            return self.reconcile(checkpoint)
+
+        try:
+            steps = backfill_steps(self.source, from_ref, to_ref, by)
+        except Exception as e:
+            logger.error(f"Failed to list the releases between {from_ref or 'the root commit'} and {to_ref}: {str(e)}")
+            sys.exit(1)
+        version = start_version or (version_from_ref(from_ref) if from_ref else None) or CURRENT_VERSION
+        checkpoint = {'range': [from_ref, to_ref, by], 'steps': steps, 'done': 0, 'version': version}
+        self.save_checkpoint(checkpoint)
+        logger.info(f"Backfilling {len(steps)} releases by {by} from version {version}")
+        return checkpoint
+
+    def reconcile(self, checkpoint):
+        """Count a release that was stored before the run stopped but after its checkpoint was written."""
+        done = checkpoint['done']
+        last = self.store.last_entry()
+        if done < len(checkpoint['steps']) and last and last.get('head') == checkpoint['steps'][done][1]:
+            checkpoint['done'] = done + 1
+            checkpoint['version'] = last['version']
+            self.save_checkpoint(checkpoint)
+        return checkpoint
+
+    def store_release(self, checkpoint, analysis):
+        """Version an analyzed release after the one before it, store it and move the checkpoint on."""
+        from .notes import update_release_notes
+        from .pipeline import release_metadata, release_record, render_release
+
+        analysis['current_version'] = checkpoint['version']
+        analysis['version'] = increment_version(checkpoint['version'], *analysis['version_increment'])
+        update_release_notes(render_release(analysis), release_metadata(analysis), release_record(analysis),
+                             self.store)
+        checkpoint['done'] += 1
+        checkpoint['version'] = analysis['version']
+        self.save_checkpoint(checkpoint)
+
+    def run(self, checkpoint, workers):
+        """Analyze the remaining releases in parallel and store them in order."""
+        from concurrent.futures import ProcessPoolExecutor
+
+        steps = checkpoint['steps']
+        window = max(1, workers) * WINDOW_PER_WORKER
+        futures = {}
+        next_step = checkpoint['done']
+        with span('backfill', releases=len(steps) - checkpoint['done'], workers=workers), \
+                ProcessPoolExecutor(max_workers=workers, initializer=init_backfill_worker) as executor:
+            try:
+                while checkpoint['done'] < len(steps):
+                    while next_step < len(steps) and next_step - checkpoint['done'] < window:
+                        base, head, _ = steps[next_step]
+                        futures[next_step] = executor.submit(analyze_backfill_step, self.workspace, base, head)
+                        next_step += 1
+
+                    index = checkpoint['done']
+                    try:
+                        analysis = futures.pop(index).result()
+                    except (SystemExit, Exception) as e:
+                        # A worker that exits has logged why; only its progress logging is off
+                        detail = f": {str(e)}" if isinstance(e, Exception) else ""
+                        logger.error(f"Analyzing release {steps[index][2]} failed{detail}; "
+                                     f"run the backfill again to retry from it")
+                        sys.exit(1)
+                    self.store_release(checkpoint, analysis)
+                    if checkpoint['done'] % PROGRESS_INTERVAL == 0 or checkpoint['done'] == len(steps):
+                        logger.info(f"Stored {checkpoint['done']} of {len(steps)} releases, "
+                                    f"at {steps[index][2]} version {checkpoint['version']}")
+            finally:
+                for future in futures.values():
+                    future.cancel()
+
+def run_backfill(from_ref=None, to_ref='HEAD', by='commits', start_version=None, workers=None, restart=False,
+                 compose=True):
+    """Backfill release notes for a range of history, resuming an interrupted run of the same range."""
+    from .analysis import get_analysis_workers
+    from .notes import compose_release_notes
+
+    backfill = Backfill()
+    checkpoint = backfill.plan(from_ref, to_ref, by, start_version, restart)
+    if checkpoint['done'] < len(checkpoint['steps']):
+        backfill.run(checkpoint, workers or get_analysis_workers())
+    logger.info(f"Backfill complete: {len(checkpoint['steps'])} releases, up to version {checkpoint['version']}")
+    if compose:
+        compose_release_notes(store=backfill.store)
+    return checkpoint
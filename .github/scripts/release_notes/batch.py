@@ -0,0 +1,219 @@
+"""Batch mode: release notes for many repositories in one process.
+
+The manifest is a JSON document listing the repositories and their ranges,
+with defaults for any field an entry leaves out:
+
+    {
+      "defaults": {"base": "last-tag"},
+      "repositories": [
+        {"repository": "acme/api", "head": "main"},
+        {"repository": "acme/web", "head": "v2.1.0", "base": "v2.0.0", "output": "notes/web"},
+        {"repository": "acme/cli", "path": "checkouts/cli", "head": "HEAD"}
+      ]
+    }
+
+Entries with a path are read from that local checkout, the others from the
+GitHub API. API repositories share one pooled client on one event loop, so
+they share its connection pool, its HTTP concurrency limit and its view of
+the rate limit, and the client refuses requests past the batch's request
+budget (RELEASE_NOTES_BATCH_REQUEST_BUDGET). Up to
+RELEASE_NOTES_BATCH_CONCURRENCY repositories are processed at once, each in
+its own thread and span tree, over one analysis process pool and the shared
+analysis cache. Once the budget is spent, API repositories that have not
+started yet are skipped.
+
+Each repository gets its own notes store and analysis.json, plus
+release_note.txt with --compose, in its output directory, <output dir>/<owner>/<name> unless
+the entry names one. A repository that fails is logged and reported and the
+others carry on; batch-report.json in the output directory lists how each
+one went.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+from .instrumentation import scoped_tracer, span
+from .store import ReleaseNotesStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_OUTPUT = 'release-notes-batch'
+DEFAULT_BATCH_CONCURRENCY = 4
+BATCH_REPORT_NAME = 'batch-report.json'
+
+# Fields a manifest entry may set
+ENTRY_FIELDS = ('repository', 'head', 'base', 'path', 'output')
+
+def load_manifest(path):
+    """Return the manifest's entries with its defaults filled in, exiting if it is unusable."""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to read batch manifest {path}: {str(e)}")
+        sys.exit(1)
+
+    if isinstance(manifest, list):
+        manifest = {'repositories': manifest}
+    defaults = manifest.get('defaults', {})
+    entries = []
+    for number, entry in enumerate(manifest.get('repositories', []), 1):
+        entry = {**defaults, **entry}
+        unknown = [field for field in entry if field not in ENTRY_FIELDS]
+        if unknown or not entry.get('repository') or not entry.get('head'):
+            logger.error(f"Batch manifest entry {number} needs a repository and a head"
+                         f"{' and has unknown fields ' + ', '.join(unknown) if unknown else ''}")
+            sys.exit(1)
+        entries.append(entry)
+
+    if not entries:
+        logger.error(f"Batch manifest {path} lists no repositories")
+        sys.exit(1)
+    return entries
+
+def entry_output_dir(entry, output_dir):
+    """Return the directory a repository's notes, store and analysis are written to."""
+    if entry.get('output'):
+        return Path(entry['output'])
+    owner, _, name = entry['repository'].partition('/')
+    return Path(output_dir) / owner / (name or owner)
+
+class BatchRunner:
+    """Processes manifest entries concurrently over shared HTTP, process pool and cache resources."""
+
+    def __init__(self, output_dir=None, concurrency=None, request_budget=None, compose=False):
+        self.output_dir = Path(output_dir or os.environ.get('RELEASE_NOTES_BATCH_OUTPUT', DEFAULT_BATCH_OUTPUT))
+        self.concurrency = max(1, int(concurrency or os.environ.get('RELEASE_NOTES_BATCH_CONCURRENCY',
+                                                                    DEFAULT_BATCH_CONCURRENCY)))
+        budget = request_budget or os.environ.get('RELEASE_NOTES_BATCH_REQUEST_BUDGET')
+        self.request_budget = int(budget) if budget else None
+        self.compose = compose
+        self.client = None
+        self.shared_loop = None
+        self.executor = None
+        # Guards the shared resources, which the first repository thread to need them sets up
+        self._lock = threading.Lock()
+
+    def _ensure_client(self):
+        # The API client, its event loop thread and httpx are only set up for API entries
+        with self._lock:
+            if self.client is not None:
+                return self.client
+            from .clients import get_github_token
+            from .github_async import DEFAULT_HTTP_CONCURRENCY, AsyncGitHubClient, SharedEventLoop
+
+            concurrency = int(os.environ.get('RELEASE_NOTES_HTTP_CONCURRENCY', DEFAULT_HTTP_CONCURRENCY))
+            self.client = AsyncGitHubClient(get_github_token(), concurrency=concurrency,
+                                            request_budget=self.request_budget)
+            self.shared_loop = SharedEventLoop()
+            return self.client
+
+    def _ensure_executor(self, workers):
+        # Repositories run in threads, so the pool starts its workers fresh instead of forking them
+        with self._lock:
+            if self.executor is None and workers > 1:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self.executor = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            return self.executor
+
+    def budget_spent(self):
+        return (self.client is not None and self.request_budget is not None
+                and self.client.request_count >= self.request_budget)
+
+    def source_for(self, entry):
+        if entry.get('path'):
+            from .local_git import LocalGitChangeSource
+            return LocalGitChangeSource(entry['path'])
+
+        from .github_async import AsyncGitHubChangeSource
+        client = self._ensure_client()
+        return AsyncGitHubChangeSource(entry['repository'], client, self.shared_loop)
+
+    def process(self, entry):
+        """Generate one repository's notes and return its outcome; never raises."""
+        from .analysis import get_analysis_workers
+        from .pipeline import generate_release_notes
+
+        repository = entry['repository']
+        output = entry_output_dir(entry, self.output_dir)
+        outcome = {'repository': repository, 'head': entry['head'], 'output': str(output)}
+        if not entry.get('path') and self.budget_spent():
+            logger.warning(f"Skipping {repository}: the batch's GitHub request budget is used up")
+            return {**outcome, 'status': 'skipped', 'error': "request budget used up"}
+
+        started = time.perf_counter()
+        with scoped_tracer('repository', repository=repository) as tracer:
+            try:
+                output.mkdir(parents=True, exist_ok=True)
+                store = ReleaseNotesStore(output / 'release-notes', output / 'release_note.txt')
+                analysis = generate_release_notes(
+                    entry['head'], entry.get('base'), compose=self.compose, source=self.source_for(entry),
+                    store=store, executor=self._ensure_executor(get_analysis_workers())
+                )
+                with open(output / 'analysis.json', 'w') as f:
+                    json.dump(analysis, f, indent=2)
+                outcome.update(status='ok', version=analysis['version'])
+            except SystemExit:
+                # The stage that failed has logged why before exiting
+                outcome.update(status='failed', error="stopped by an error logged above")
+            except Exception as e:
+                outcome.update(status='failed', error=str(e))
+
+        outcome['seconds'] = round(time.perf_counter() - started, 3)
+        outcome['http_requests'] = tracer.root.counters['http_requests']
+        if outcome['status'] == 'ok':
+            logger.info(f"Generated release notes {outcome['version']} for {repository} in {outcome['output']}")
+        else:
+            logger.error(f"Release notes for {repository} failed: {outcome['error']}")
+        return outcome
+
+    def run(self, entries):
+        """Process every entry, at most `concurrency` at a time, and return their outcomes in manifest order."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        logger.info(f"Processing {len(entries)} repositories, {self.concurrency} at a time")
+        try:
+            with span('batch', repositories=len(entries), concurrency=self.concurrency):
+                with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch') as pool:
+                    return list(pool.map(self.process, entries))
+        finally:
+            self.close()
+
+    def close(self):
+        if self.shared_loop is not None:
+            self.shared_loop.close(self.client)
+            self.shared_loop = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+def write_batch_report(output_dir, outcomes):
+    """Write the outcome of every repository next to their outputs and return the report's path."""
+    path = Path(output_dir) / BATCH_REPORT_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {status: sum(outcome['status'] == status for outcome in outcomes)
+              for status in ('ok', 'failed', 'skipped')}
+    with open(path, 'w') as f:
+        json.dump({**counts, 'repositories': outcomes}, f, indent=2)
+    return path
+
+def run_batch(manifest_path, output_dir=None, concurrency=None, request_budget=None, compose=False):
+    """Generate release notes for every repository in a manifest, returning their outcomes."""
+    entries = load_manifest(manifest_path)
+    runner = BatchRunner(output_dir, concurrency, request_budget, compose)
+    outcomes = runner.run(entries)
+
+    report_path = write_batch_report(runner.output_dir, outcomes)
+    failed = [outcome['repository'] for outcome in outcomes if outcome['status'] != 'ok']
+    logger.info(f"Batch finished: {len(outcomes) - len(failed)} of {len(outcomes)} repositories succeeded; "
+                f"wrote {report_path}")
+    if failed:
+        logger.error(f"No release notes for: {', '.join(failed)}")
+    return outcomes
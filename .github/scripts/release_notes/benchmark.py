@@ -0,0 +1,418 @@
+"""Offline benchmarks of each pipeline stage over synthetic change sets.
+
+Fixtures are generated deterministically in memory, shaped like a GitHub
+comparison (files with unified diff patches, plus commits), so no GitHub or
+OpenAI access is needed: the summary stage talks to the local OpenAI stub,
+which answers after a fixed latency. Every stage is timed separately, best of
+several runs, and run once more under tracemalloc for its peak memory; the
+summary stage also records its model requests and tokens per run. Results
+can be stored as a baseline; later runs fail when a stage gets slower,
+hungrier or costlier than the baseline by more than a threshold percentage.
+Timings only compare on one machine: CI benchmarks the base commit on the
+same runner and uses that as the baseline, while benchmarks/baseline.json
+holds a developer machine's numbers for local runs and is rewritten only in
+a commit of its own that explains the shift.
+
+A fixture can also be a GitHub recording (see recording.py) of a real
+release: its changes are replayed from the archive, and an extra
+replay_changes stage times reading them back through the API client.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import logging
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .analysis import (
+    analyze_change_stream,
+    analyze_changes_with_ai,
+    analyze_file_changes,
+    determine_version_increment,
+    rule_status,
+)
+from .instrumentation import get_tracer
+from .models import ChangedCommit, ChangedFile, commit_info_from_commit
+from .notes import format_release_notes, update_release_notes
+from .openai_stub import OpenAIStubServer
+from .patches import parse_patch
+from .rules import get_rule_engine
+from .summarize import DEFAULT_BATCH_TOKENS, ExcerptSelector, file_excerpt, summarize_release
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().parent.parent / 'benchmarks' / 'baseline.json'
+
+# A stage regresses when it is this many percent slower or bigger than its baseline
+DEFAULT_THRESHOLD_PERCENT = 25
+
+# Differences below these are noise, whatever the percentage
+MIN_SECONDS_DELTA = 0.005
+MIN_BYTES_DELTA = 256 * 1024
+MIN_TOKENS_DELTA = 100
+
+# Seconds the OpenAI stub takes to answer each request, roughly a fast hosted model
+STUB_LATENCY = 0.05
+STUB_CONCURRENCY = 4
+
+# name: (number of files, hunks per file, total patch size to reach instead, if any)
+FIXTURES = {
+    'single-file': (1, 4, None),
+    '100-files': (100, 4, None),
+    '5000-files': (5000, 4, None),
+    '20mb-patch': (1, 0, 20 * 1024 * 1024),
+}
+
+FIXTURE_SEED = 20240101
+
+# Hunk bodies per file type, {i} is the hunk number; a mix of context, removed and added lines
+HUNK_TEMPLATES = {
+    'php': (
+        "class UserController{i} extends Controller",
+        [
+            " public function index{i}(Request $request)",
+            " {{",
+            "-    return view('users.index', ['users' => User::all()]);",
+            "+    return view('users.index', ['users' => User::paginate(20)]); // fix: bug in api/users",
+            " }}",
+            "+public function store{i}(Request $request): JsonResponse",
+            "+{{",
+            "+    return response()->json(['status' => 'created'], 201);",
+            "+}}",
+            "+Route::post('/api/users/{i}', [UserController::class, 'store{i}']);",
+        ],
+    ),
+    'blade.php': (
+        "",
+        [
+            " <div class=\"container\">",
+            "-    <x-alert type=\"error\" :message=\"$message\"/>",
+            "+    <x-alert-banner type=\"error\" :message=\"$message\"/>",
+            "+    <div class=\"modal\" role=\"dialog\" aria-labelledby=\"title{i}\">",
+            "+        <input type=\"text\" name=\"name{i}\"> <button class=\"btn btn-primary\">Save</button>",
+            "+        @livewire('user-table-{i}')",
+            "+    </div>",
+            " </div>",
+        ],
+    ),
+    'py': (
+        "class Service{i}:",
+        [
+            "     def load{i}(self, key):",
+            "-        return self.cache[key]",
+            "+        return self.cache.get(key)  # fix missing key bug",
+            " ",
+            "+    def test_refresh{i}(self):",
+            "+        return self.load{i}('api/endpoint')",
+        ],
+    ),
+    'js': (
+        "export class Store{i} {{",
+        [
+            "   async fetch{i}(id) {{",
+            "-    const response = await api.get(`/api/items/${{id}}`);",
+            "+    const response = await api.get(`/api/v2/items/${{id}}`, {{ timeout: 5000 }});",
+            "     return response.data;",
+            "   }}",
+            "+export const format{i} = (item) => {{",
+            "+  return `${{item.name}} (${{item.id}})`;",
+            "+}};",
+        ],
+    ),
+    'css': (
+        "",
+        [
+            " .card-{i} {{",
+            "-  padding: 8px;",
+            "+  padding: 12px;",
+            "+  border-radius: 4px;",
+            " }}",
+            "+@media (max-width: 600px) {{ .card-{i} {{ padding: 4px; }} }}",
+        ],
+    ),
+}
+
+FILE_TYPES = list(HUNK_TEMPLATES)
+
+def synthetic_hunk(file_type, number, line):
+    """Return one @@ block of a synthetic patch and its (additions, deletions)."""
+    context, body = HUNK_TEMPLATES[file_type]
+    lines = [template.format(i=number) for template in body]
+    additions = sum(1 for text in lines if text.startswith('+'))
+    deletions = sum(1 for text in lines if text.startswith('-'))
+    old_count = len(lines) - additions
+    new_count = len(lines) - deletions
+    header = f"@@ -{line},{old_count} +{line},{new_count} @@ {context.format(i=number)}".rstrip()
+    return "\n".join([header, *lines]), additions, deletions
+
+def synthetic_file(rng, index, hunks, patch_bytes=None):
+    """Build one changed file with a synthetic patch of the given number of hunks or size."""
+    file_type = FILE_TYPES[index % len(FILE_TYPES)]
+    status = 'modified' if patch_bytes else rng.choice(['modified', 'modified', 'modified', 'added', 'removed'])
+    file = ChangedFile(f"src/module{index % 50}/file{index}.{file_type}", status)
+    file.sha = f"{index:040x}"
+    file.raw_url = f"https://example.invalid/raw/{file.filename}"
+
+    parts = []
+    size = 0
+    number = 0
+    while (size < patch_bytes) if patch_bytes else (number < hunks):
+        hunk, additions, deletions = synthetic_hunk(file_type, number, 1 + number * 20)
+        parts.append(hunk)
+        size += len(hunk) + 1
+        file.additions += additions
+        file.deletions += deletions
+        number += 1
+
+    if status == 'added':
+        file.deletions = 0
+    elif status == 'removed':
+        file.additions = 0
+    file.changes = file.additions + file.deletions
+    file.patch = "\n".join(parts)
+    return file
+
+def build_fixture(name):
+    """Return the comparison for a fixture: {'files': [...], 'commits': [...]}."""
+    if is_recording(name):
+        fixture = replayed_changes(name)
+        fixture['recording'] = name
+        return fixture
+
+    file_count, hunks, patch_bytes = FIXTURES[name]
+    rng = random.Random(FIXTURE_SEED)
+    files = [synthetic_file(rng, index, hunks, patch_bytes) for index in range(file_count)]
+
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    commits = [
+        ChangedCommit(f"{index:040x}", f"Author {index % 7}", f"author{index % 7}@example.com",
+                      start + timedelta(minutes=index), f"Change {index}", login=f"author{index % 7}")
+        for index in range(max(1, file_count // 10))
+    ]
+    return {'files': files, 'commits': commits}
+
+def replayed_changes(path):
+    """Read the release range of a GitHub recording back through the API source, with no network."""
+    from .github_async import AsyncGitHubChangeSource, AsyncGitHubClient
+    from .recording import ReplayTransport, recorded_range
+
+    repository, base, head = recorded_range(path)
+    source = AsyncGitHubChangeSource(repository, AsyncGitHubClient(None, transport=ReplayTransport(path)))
+    try:
+        changes = source.get_changes(base, head)
+        return {'files': list(changes['files']), 'commits': list(changes['commits'])}
+    finally:
+        source.close()
+
+def is_recording(name):
+    """Tell whether a fixture name is the path of a GitHub recording rather than a synthetic fixture."""
+    return name not in FIXTURES and os.path.isfile(name)
+
+def fresh_changes(fixture):
+    """Return the comparison without any patches parsed by an earlier stage."""
+    return {'files': fixture['files'], 'commits': fixture['commits']}
+
+def stage_analyze_file_changes(fixture):
+    for file in fixture['files']:
+        analyze_file_changes(file)
+
+def stage_determine_version_increment(fixture):
+    determine_version_increment(fresh_changes(fixture))
+
+def stage_analyze_changes_with_ai(fixture):
+    analyze_changes_with_ai(fresh_changes(fixture))
+
+def stage_format_release_notes(fixture):
+    commit_info = commit_info_from_commit(fixture['commits'][-1])
+    format_release_notes(commit_info, fresh_changes(fixture), "", "1.2.3")
+
+def stage_classify_files(fixture):
+    engine = get_rule_engine()
+    for file in fixture['files']:
+        parsed = parse_patch(file.patch)
+        engine.evaluate('ui', parsed, file.filename)
+        engine.evaluate('summary', parsed, file.filename)
+        engine.bump(parsed, file.filename, rule_status(file))
+        engine.evaluate('notes', parsed, file.filename, rule_status(file))
+
+def stage_analyze_change_stream(fixture):
+    analyze_change_stream(fresh_changes(fixture))
+
+def stage_summarize_changes(fixture):
+    excerpts = ExcerptSelector()
+    for file in fixture['files']:
+        excerpts.add(file.filename, file_excerpt(file, parse_patch(file.patch)))
+    summarize_release(excerpts.selected(), None, fixture['summary_settings'])
+
+def stage_update_release_notes(fixture):
+    update_release_notes(fixture['notes'], {'version': "1.2.3"})
+
+def stage_replay_changes(fixture):
+    replayed_changes(fixture['recording'])
+
+STAGES = (
+    ('analyze_file_changes', stage_analyze_file_changes),
+    ('determine_version_increment', stage_determine_version_increment),
+    ('analyze_changes_with_ai', stage_analyze_changes_with_ai),
+    ('format_release_notes', stage_format_release_notes),
+    ('classify_files', stage_classify_files),
+    ('analyze_change_stream', stage_analyze_change_stream),
+    ('summarize_changes', stage_summarize_changes),
+    ('update_release_notes', stage_update_release_notes),
+)
+
+# Stages that only recorded fixtures have
+RECORDING_STAGES = (
+    ('replay_changes', stage_replay_changes),
+)
+
+@contextmanager
+def quiet_logging():
+    """Silence the stages' progress logging while they are measured."""
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+@contextmanager
+def scratch_store():
+    """Point the notes store at a throwaway directory, away from the real release_note.txt."""
+    previous_cwd = os.getcwd()
+    previous_store = os.environ.get('RELEASE_NOTES_STORE')
+    with tempfile.TemporaryDirectory(prefix='release-notes-bench-') as workdir:
+        os.chdir(workdir)
+        os.environ['RELEASE_NOTES_STORE'] = os.path.join(workdir, 'release-notes')
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous_cwd)
+            if previous_store is None:
+                os.environ.pop('RELEASE_NOTES_STORE', None)
+            else:
+                os.environ['RELEASE_NOTES_STORE'] = previous_store
+
+def measure(stage, fixture, repeat):
+    """Return (best wall seconds, peak traced bytes) for one stage."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        stage(fixture)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Memory is measured in a separate run; tracing slows the stage down too much to time it
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage(fixture)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def model_usage():
+    """Return the (model requests, model tokens) counted so far in this process."""
+    counters = get_tracer().root.counters
+    return counters['llm_requests'], counters['llm_prompt_tokens'] + counters['llm_completion_tokens']
+
+def run_benchmarks(fixture_names, repeat):
+    """Run every stage over each fixture and return {fixture: {stage: {'seconds', 'peak_bytes', ...}}}."""
+    # Compile the rule table up front so the first stage does not pay for it
+    get_rule_engine()
+
+    stub = OpenAIStubServer(latency=STUB_LATENCY).start()
+    summary_settings = {
+        'api_key': 'benchmark',
+        'base_url': stub.base_url,
+        'model': 'stub',
+        'concurrency': STUB_CONCURRENCY,
+        'batch_tokens': DEFAULT_BATCH_TOKENS,
+    }
+    results = {}
+    try:
+        for fixture_name in fixture_names:
+            logger.info(f"Building fixture {fixture_name}")
+            with quiet_logging():
+                fixture = build_fixture(fixture_name)
+            # Recordings are stored in the baseline under their file name, wherever they are
+            name = os.path.basename(fixture_name)
+            stages = STAGES + RECORDING_STAGES if 'recording' in fixture else STAGES
+            fixture['summary_settings'] = summary_settings
+            with quiet_logging():
+                commit_info = commit_info_from_commit(fixture['commits'][-1])
+                fixture['notes'] = format_release_notes(commit_info, fresh_changes(fixture), "", "1.2.3")
+
+            results[name] = {}
+            with scratch_store():
+                for stage_name, stage in stages:
+                    requests_before, tokens_before = model_usage()
+                    with quiet_logging():
+                        seconds, peak_bytes = measure(stage, fixture, repeat)
+                    result = results[name][stage_name] = {'seconds': round(seconds, 6), 'peak_bytes': peak_bytes}
+                    requests_after, tokens_after = model_usage()
+
+                    usage = ""
+                    if requests_after > requests_before:
+                        # measure() runs the stage repeat times, then once more for memory
+                        result['model_requests'] = (requests_after - requests_before) // (repeat + 1)
+                        result['model_tokens'] = (tokens_after - tokens_before) // (repeat + 1)
+                        usage = f" {result['model_requests']:4} requests {result['model_tokens']:7} tokens"
+                    logger.info(f"{name:>12} {stage_name:<28} {seconds * 1000:10.1f}ms {peak_bytes / 1024:10.0f}KB{usage}")
+    finally:
+        stub.stop()
+    return results
+
+def compare_to_baseline(results, baseline, threshold_percent):
+    """Return a description of every stage that regressed against the baseline."""
+    limit = 1 + threshold_percent / 100
+    regressions = []
+    for fixture, stages in results.items():
+        for stage, result in stages.items():
+            expected = baseline.get(fixture, {}).get(stage)
+            if not expected:
+                continue
+            for metric, floor, unit in (('seconds', MIN_SECONDS_DELTA, 's'), ('peak_bytes', MIN_BYTES_DELTA, 'B'),
+                                        ('model_tokens', MIN_TOKENS_DELTA, ' tokens')):
+                if metric not in result or metric not in expected:
+                    continue
+                measured, allowed = result[metric], expected[metric]
+                if measured > allowed * limit and measured - allowed > floor:
+                    change = (measured / allowed - 1) * 100 if allowed else float('inf')
+                    regressions.append(f"{fixture} {stage} {metric}: {measured}{unit} vs baseline "
+                                       f"{allowed}{unit} (+{change:.0f}%)")
+    return regressions
+
+def load_baseline(path):
+    """Return the stored baseline results, or {} if there are none yet."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get('results', {})
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.error(f"Failed to read benchmark baseline {path}: {str(e)}")
+        sys.exit(1)
+
+def save_baseline(path, results):
+    """Merge results into the baseline file, keeping fixtures that were not run."""
+    path = Path(path)
+    merged = load_baseline(path)
+    merged.update(results)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        'python': sys.version.split()[0],
+        'recorded': datetime.now().strftime('%Y-%m-%d'),
+        'results': merged,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+    logger.info(f"Wrote benchmark baseline to {path}")
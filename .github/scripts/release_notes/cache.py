@@ -0,0 +1,120 @@
+"""Persistent content-addressed caches of per-file analysis records and model summaries."""
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+from .analysis import ANALYZER_VERSION
+from .rules import get_rule_engine
+
+logger = logging.getLogger(__name__)
+
+# Default size limit for the on-disk analysis cache
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+class AnalysisCache:
+    """Content-addressed on-disk store of per-file analysis records.
+
+    Records live in one small JSON file each, named by a hash of everything the
+    analysis depends on, so a diff seen in any earlier run is never analyzed
+    again. Reads refresh a file's mtime and evict() drops the least recently
+    used records once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def key(self, file):
+        """Hash the filename and any previous one, status, patch (or blob SHA), analyzer version and rule table."""
+        digest = hashlib.sha256()
+        patch = getattr(file, 'patch', None)
+        for part in (ANALYZER_VERSION, get_rule_engine().fingerprint, file.filename,
+                     getattr(file, 'previous_filename', None), file.status,
+                     getattr(file, 'additions', 0), getattr(file, 'deletions', 0), getattr(file, 'sha', None)):
+            digest.update(str(part).encode())
+            digest.update(b'\0')
+        if patch:
+            digest.update(patch.encode('utf-8', errors='surrogatepass'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached record for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                record = json.load(f)
+            # Mark the record as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record
+
+    def put(self, key, record):
+        """Store a record, writing through a temporary file so readers never see half of it."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, 'w') as f:
+                json.dump(record, f, separators=(',', ':'))
+            os.replace(temp_path, path)
+            self.writes += 1
+        except OSError as e:
+            logger.warning(f"Failed to write analysis cache entry {key}: {str(e)}")
+
+    def evict(self):
+        """Delete the least recently used records until the cache fits in max_bytes."""
+        entries = []
+        total_size = 0
+        for path in self.directory.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+            self.evictions += 1
+
+    def log_stats(self):
+        logger.info(f"Analysis cache: {self.hits} hits, {self.misses} misses, {self.writes} writes, {self.evictions} evictions")
+
+def get_analysis_cache():
+    """Return the analysis cache configured by RELEASE_NOTES_CACHE_DIR, if any."""
+    directory = os.environ.get('RELEASE_NOTES_CACHE_DIR')
+    if not directory:
+        return None
+
+    max_bytes = int(os.environ.get('RELEASE_NOTES_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+    logger.info(f"Using analysis cache at {directory} (limit {max_bytes} bytes)")
+    return AnalysisCache(directory, max_bytes)
+
+def get_summary_cache():
+    """Return the cache of model responses, kept next to the analysis cache, if one is configured."""
+    directory = os.environ.get('RELEASE_NOTES_CACHE_DIR')
+    if not directory:
+        return None
+
+    max_bytes = int(os.environ.get('RELEASE_NOTES_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+    # Analysis records sit in two-character subdirectories, so neither cache evicts the other's entries
+    return AnalysisCache(Path(directory) / 'summaries', max_bytes)
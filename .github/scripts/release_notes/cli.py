@@ -0,0 +1,345 @@
+"""Command line interface: ``python -m release_notes {generate,analyze,render,compose,query,batch,serve,backfill,benchmark,openai-stub}``."""
+import os
+import sys
+import json
+import logging
+import argparse
+import subprocess
+
+from .instrumentation import instrumented_run
+
+logger = logging.getLogger(__name__)
+
+# Budget for importing the CLI in a fresh interpreter, checked by `import-time`
+IMPORT_TIME_BUDGET_MS = 50
+
+def configure_logging(stream=sys.stdout):
+    """Set up run logging; commands that print results to stdout log to stderr instead."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(stream)
+        ]
+    )
+    # httpx logs every request at INFO, which would drown out the run's own progress
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+def add_range_arguments(parser):
+    parser.add_argument('--head', help="head commit of the release (default: RELEASE_NOTES_HEAD or GITHUB_SHA)")
+    parser.add_argument('--base', help="base ref or 'last-tag' (default: RELEASE_NOTES_BASE, else the head's parent)")
+    parser.add_argument('--source', choices=['auto', 'git', 'github', 'github-async'],
+                        help="where to read changes from (default: RELEASE_NOTES_SOURCE or auto)")
+
+def add_instrumentation_arguments(parser):
+    parser.add_argument('--report', help="write a JSON report of stage timings and API usage here "
+                                         "(default: RELEASE_NOTES_REPORT)")
+    parser.add_argument('--profile', help="save a cProfile of the analysis stage here (default: RELEASE_NOTES_PROFILE)")
+
+def command_generate(args):
+    from .pipeline import generate_release_notes
+
+    logger.info("Starting release notes generation")
+    try:
+        generate_release_notes(args.head, args.base, args.source, compose=args.compose, profile_path=args.profile)
+        logger.info("Release notes generation completed successfully")
+    except Exception as e:
+        logger.error(f"Unexpected error in main function: {str(e)}")
+        sys.exit(1)
+
+def command_analyze(args):
+    from .pipeline import analyze_release
+
+    analysis = analyze_release(args.head, args.base, args.source, args.profile)
+    if args.output == '-':
+        json.dump(analysis, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(analysis, f, indent=2)
+        logger.info(f"Wrote analysis to {args.output}")
+
+def command_render(args):
+    from .notes import update_release_notes
+    from .pipeline import release_metadata, render_release
+
+    if args.analysis == '-':
+        analysis = json.load(sys.stdin)
+    else:
+        with open(args.analysis, 'r') as f:
+            analysis = json.load(f)
+
+    notes = render_release(analysis)
+    if args.write:
+        update_release_notes(notes, release_metadata(analysis))
+    else:
+        print(notes)
+
+def command_compose(args):
+    from .notes import compose_release_notes
+
+    compose_release_notes(args.output)
+
+def command_query(args):
+    from .history import ReleaseIndex
+
+    index = ReleaseIndex()
+    try:
+        if args.version:
+            releases = index.by_version(args.version)
+        elif args.file:
+            releases = index.touching(args.file)
+        else:
+            releases = index.by_author(args.author)
+
+        for release in releases:
+            if args.text:
+                print(index.notes(release))
+                print()
+            else:
+                print(json.dumps(release))
+    finally:
+        index.close()
+
+def command_batch(args):
+    from .batch import run_batch
+
+    outcomes = run_batch(args.manifest, args.output_dir, args.concurrency, args.request_budget,
+                         compose=args.compose)
+    if any(outcome['status'] != 'ok' for outcome in outcomes):
+        sys.exit(1)
+
+def command_serve(args):
+    from .server import ReleaseNotesService, WebhookServer
+
+    service = ReleaseNotesService(source_mode=args.source, coalesce_seconds=args.coalesce_seconds)
+    service.warm_up()
+    server = WebhookServer(service, args.port, args.host)
+    service.start()
+    logger.info(f"Listening for push webhooks on {server.url}/webhook")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        logger.info(f"Generated release notes {service.completed} times")
+
+def command_post_webhook(args):
+    from .server import post_webhook, wait_until_idle
+
+    secret = args.secret or os.environ.get('RELEASE_NOTES_WEBHOOK_SECRET')
+    for path in args.payload:
+        with open(path, 'rb') as f:
+            status, response = post_webhook(args.url, f.read(), args.event, secret)
+        logger.info(f"{path}: {status} {response.get('message', '')}")
+        if status >= 400:
+            sys.exit(1)
+    if args.wait:
+        print(json.dumps(wait_until_idle(args.url), indent=2))
+
+def command_backfill(args):
+    from .backfill import run_backfill
+
+    run_backfill(args.from_ref, args.to_ref, args.by, args.start_version, args.workers, args.restart,
+                 compose=not args.no_compose)
+
+def measure_import_time(module='release_notes.cli'):
+    """Import a module in a fresh interpreter and return the package's import time in ms."""
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_parent, env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, env=env, check=True
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | name"; nested imports
+    # are indented, so summing the top-level package entries avoids double counting
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith(' release_notes'):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+def command_import_time(args):
+    elapsed_ms = min(measure_import_time() for _ in range(args.repeat))
+    logger.info(f"Importing release_notes.cli took {elapsed_ms:.1f}ms (budget {args.budget_ms}ms)")
+    if elapsed_ms > args.budget_ms:
+        logger.error("Import time is over budget")
+        sys.exit(1)
+
+def command_benchmark(args):
+    from .benchmark import (
+        DEFAULT_BASELINE_PATH,
+        DEFAULT_THRESHOLD_PERCENT,
+        FIXTURES,
+        compare_to_baseline,
+        is_recording,
+        load_baseline,
+        run_benchmarks,
+        save_baseline,
+    )
+
+    unknown = [name for name in args.fixture or [] if name not in FIXTURES and not is_recording(name)]
+    if unknown:
+        logger.error(f"Unknown benchmark fixtures: {', '.join(unknown)} "
+                     f"(available: {', '.join(FIXTURES)}, or the path of a GitHub recording)")
+        sys.exit(1)
+    baseline_path = args.baseline or os.environ.get('RELEASE_NOTES_BENCHMARK_BASELINE') or DEFAULT_BASELINE_PATH
+    threshold = DEFAULT_THRESHOLD_PERCENT if args.threshold is None else args.threshold
+
+    results = run_benchmarks(args.fixture or list(FIXTURES), args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Wrote benchmark results to {args.output}")
+
+    if args.update_baseline:
+        save_baseline(baseline_path, results)
+        return
+
+    baseline = load_baseline(baseline_path)
+    if not baseline:
+        logger.warning(f"No benchmark baseline at {baseline_path}; run with --update-baseline to record one")
+        return
+    regressions = compare_to_baseline(results, baseline, threshold)
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+    logger.info(f"No stage regressed by more than {threshold}%")
+
+def command_openai_stub(args):
+    from .openai_stub import OpenAIStubServer
+
+    server = OpenAIStubServer(args.port, args.latency)
+    logger.info(f"OpenAI stub listening; set OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"OpenAI stub answered {server.requests} requests")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='release_notes', description="Generate release notes from code changes.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help="analyze a range and append its notes to the notes store")
+    add_range_arguments(generate)
+    add_instrumentation_arguments(generate)
+    generate.add_argument('--compose', action='store_true',
+                          help="also rebuild release_note.txt from the whole store, as `compose` does")
+    generate.set_defaults(handler=command_generate)
+
+    analyze = subparsers.add_parser('analyze', help="analyze a range and write the result as JSON")
+    add_range_arguments(analyze)
+    add_instrumentation_arguments(analyze)
+    analyze.add_argument('--output', '-o', default='-', help="file to write the analysis to (default: stdout)")
+    analyze.set_defaults(handler=command_analyze)
+
+    render = subparsers.add_parser('render', help="render release notes from an analysis JSON file")
+    render.add_argument('analysis', help="analysis file written by `analyze`, or - for stdin")
+    render.add_argument('--write', action='store_true', help="append the notes to the notes store instead of printing them")
+    render.set_defaults(handler=command_render)
+
+    compose = subparsers.add_parser('compose', help="rebuild release_note.txt from the notes store")
+    compose.add_argument('--output', '-o', help="where to write the combined notes (default: release_note.txt)")
+    compose.set_defaults(handler=command_compose)
+
+    query = subparsers.add_parser('query', help="look up releases in the indexed release history")
+    lookup = query.add_mutually_exclusive_group(required=True)
+    lookup.add_argument('--version', help="releases with this version")
+    lookup.add_argument('--file', help="releases that changed this file, or anything under a directory ending in /")
+    lookup.add_argument('--author', help="releases this author committed to")
+    query.add_argument('--text', action='store_true', help="print the rendered notes instead of JSON lines")
+    query.set_defaults(handler=command_query)
+
+    batch = subparsers.add_parser('batch', help="generate release notes for every repository in a manifest")
+    batch.add_argument('manifest', help="JSON file listing the repositories and their ranges")
+    batch.add_argument('--output-dir', help="where each repository's notes go, under owner/name "
+                                            "(default: RELEASE_NOTES_BATCH_OUTPUT or release-notes-batch)")
+    batch.add_argument('--concurrency', type=int,
+                       help="repositories processed at once (default: RELEASE_NOTES_BATCH_CONCURRENCY or 4)")
+    batch.add_argument('--request-budget', type=int,
+                       help="GitHub API requests the whole batch may make "
+                            "(default: RELEASE_NOTES_BATCH_REQUEST_BUDGET, else no limit)")
+    batch.add_argument('--compose', action='store_true',
+                       help="also rebuild each repository's release_note.txt from its notes store")
+    add_instrumentation_arguments(batch)
+    batch.set_defaults(handler=command_batch)
+
+    serve = subparsers.add_parser('serve', help="generate release notes for push webhooks as they arrive")
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    serve.add_argument('--source', choices=['git', 'github', 'github-async'],
+                       help="where to read changes from (default: RELEASE_NOTES_SOURCE or github-async)")
+    serve.add_argument('--coalesce-seconds', type=float,
+                       help="how long a branch's queued pushes wait for more (default: RELEASE_NOTES_COALESCE_SECONDS or 2)")
+    add_instrumentation_arguments(serve)
+    serve.set_defaults(handler=command_serve)
+
+    post = subparsers.add_parser('post-webhook', help="post recorded push payloads to a running `serve`")
+    post.add_argument('payload', nargs='+', help="JSON payload files, posted in order")
+    post.add_argument('--url', default='http://127.0.0.1:8080', help="the server (default: http://127.0.0.1:8080)")
+    post.add_argument('--event', default='push', help="X-GitHub-Event header to send (default: push)")
+    post.add_argument('--secret', help="sign payloads with this secret (default: RELEASE_NOTES_WEBHOOK_SECRET)")
+    post.add_argument('--wait', action='store_true', help="wait for the server to go idle and print its status")
+    post.set_defaults(handler=command_post_webhook)
+
+    backfill = subparsers.add_parser('backfill', help="store release notes for a range of existing history, "
+                                                      "resuming an interrupted run")
+    backfill.add_argument('--from', dest='from_ref', help="ref the history starts after (default: the root commit)")
+    backfill.add_argument('--to', dest='to_ref', default='HEAD', help="ref the history ends at (default: HEAD)")
+    backfill.add_argument('--by', choices=['commits', 'tags'], default='commits',
+                          help="one release per first-parent commit, or per tag (default: commits)")
+    backfill.add_argument('--start-version', help="version before the first release (default: the --from tag's, else 1.0.0)")
+    backfill.add_argument('--workers', type=int, help="analysis processes (default: RELEASE_NOTES_WORKERS or one per CPU)")
+    backfill.add_argument('--restart', action='store_true', help="ignore the checkpoint of an earlier backfill")
+    backfill.add_argument('--no-compose', action='store_true', help="only append to the notes store")
+    add_instrumentation_arguments(backfill)
+    backfill.set_defaults(handler=command_backfill)
+
+    import_time = subparsers.add_parser('import-time', help="check the CLI import time against its budget")
+    import_time.add_argument('--budget-ms', type=float, default=IMPORT_TIME_BUDGET_MS)
+    import_time.add_argument('--repeat', type=int, default=3, help="take the best of this many fresh imports")
+    import_time.set_defaults(handler=command_import_time)
+
+    benchmark = subparsers.add_parser('benchmark', help="time each stage on synthetic change sets and check for regressions")
+    benchmark.add_argument('--fixture', action='append',
+                           help="fixture to run: single-file, 100-files, 5000-files, 20mb-patch or the "
+                                "path of a GitHub recording; may be repeated (default: the synthetic ones)")
+    benchmark.add_argument('--repeat', type=int, default=3, help="take the best of this many runs per stage")
+    benchmark.add_argument('--baseline', help="stored results to compare against "
+                                              "(default: RELEASE_NOTES_BENCHMARK_BASELINE or benchmarks/baseline.json)")
+    benchmark.add_argument('--threshold', type=float,
+                           help="percent slowdown or memory growth that fails the run (default: 25)")
+    benchmark.add_argument('--update-baseline', action='store_true', help="store these results as the new baseline")
+    benchmark.add_argument('--output', '-o', help="also write the results as JSON to this file")
+    benchmark.set_defaults(handler=command_benchmark)
+
+    openai_stub = subparsers.add_parser('openai-stub', help="serve a local stand-in for the OpenAI chat API")
+    openai_stub.add_argument('--port', type=int, default=8000)
+    openai_stub.add_argument('--latency', type=float, default=0.0, help="seconds to wait before each response")
+    openai_stub.set_defaults(handler=command_openai_stub)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    prints_to_stdout = (
+        (args.command == 'analyze' and args.output == '-')
+        or (args.command == 'render' and not args.write)
+        or args.command == 'query'
+        or (args.command == 'post-webhook' and args.wait)
+    )
+    configure_logging(sys.stderr if prints_to_stdout else sys.stdout)
+    with instrumented_run(args.command, getattr(args, 'report', None)):
+        args.handler(args)
+    return 0
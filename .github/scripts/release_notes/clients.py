@@ -0,0 +1,70 @@
+"""Lazily created API clients, so importing the package needs no secrets."""
+import os
+import sys
+import logging
+
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+_github = None
+
+def get_github_token():
+    """Return GITHUB_TOKEN, exiting the run if it is not set."""
+    github_token = os.environ.get('GITHUB_TOKEN')
+    if not github_token:
+        logger.error("GITHUB_TOKEN environment variable is not set")
+        sys.exit(1)
+    return github_token
+
+def get_github():
+    """Return the shared PyGithub client, creating it on first use."""
+    global _github
+    if _github is None:
+        # PyGithub pulls in requests and friends; only pay for it when the API is used
+        from github import Github
+
+        from .http_cache import install_pygithub_adapter
+
+        install_pygithub_adapter()
+        # GITHUB_API_URL points at GitHub Enterprise Server or a local stand-in when set
+        base_url = os.environ.get('GITHUB_API_URL')
+        if base_url:
+            _github = Github(get_github_token(), base_url=base_url)
+        else:
+            _github = Github(get_github_token())
+        logger.info("GitHub client initialized successfully")
+    return _github
+
+def new_openai_client(api_key=None, base_url=None):
+    """Create an asyncio OpenAI client, importing openai on first use.
+
+    The key defaults to OPENAI_API_KEY, and the base URL to OPENAI_BASE_URL,
+    which points the client at a compatible server or a local stub.
+    """
+    api_key = api_key or os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        logger.error("OPENAI_API_KEY environment variable is not set")
+        sys.exit(1)
+
+    from openai import AsyncOpenAI
+
+    # Each summary stage runs its own event loop, so the client is not shared between runs
+    return AsyncOpenAI(api_key=api_key, base_url=base_url or os.environ.get('OPENAI_BASE_URL'))
+
+def get_repository():
+    """Get the current repository from GitHub Actions environment."""
+    github_repository = os.environ.get('GITHUB_REPOSITORY')
+    if not github_repository:
+        logger.error("GITHUB_REPOSITORY environment variable is not set")
+        sys.exit(1)
+
+    logger.info(f"Getting repository: {github_repository}")
+    try:
+        with span('get_repository', repository=github_repository):
+            repo = get_github().get_repo(github_repository)
+        logger.info(f"Successfully retrieved repository: {repo.full_name}")
+        return repo
+    except Exception as e:
+        logger.error(f"Failed to get repository: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,285 @@
+"""Concurrent GitHub REST access over a pooled asyncio HTTP client."""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+
+from .instrumentation import CACHE_STATUS_HEADER, get_tracer, record_http_response, with_tracer
+from .models import commit_from_json, commit_info_from_commit, file_from_json
+from .recording import wrap_transport
+from .sources import (
+    COMPARE_FILE_LIMIT,
+    COMPARE_PAGE_SIZE,
+    TAG_SEARCH_LIMIT,
+    exit_on_stream_error,
+    merge_commit_files,
+)
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests and retry policy for the asyncio GitHub client
+DEFAULT_HTTP_CONCURRENCY = 8
+HTTP_TIMEOUT = 30.0
+HTTP_MAX_RETRIES = 5
+HTTP_MAX_RETRY_DELAY = 300
+
+# Page size for the commit endpoint's files
+COMMIT_FILES_PAGE_SIZE = 100
+
+class RequestBudgetExceeded(RuntimeError):
+    """Raised instead of sending a request once the client's request budget is spent."""
+
+class AsyncGitHubClient:
+    """Pooled asyncio HTTP client for the GitHub REST endpoints this script reads.
+
+    Requests share one keep-alive connection pool and at most `concurrency` of
+    them are in flight at once. Responses that ask the client to back off, via
+    Retry-After or an exhausted X-RateLimit-Remaining, are retried after the
+    advertised delay, and later requests wait for the rate-limit reset. With a
+    request_budget, requests past that many fail with RequestBudgetExceeded;
+    responses the response cache serves without asking GitHub do not count.
+    The connection pool can be swapped for another httpx transport, such as
+    one that replays recorded responses.
+    """
+
+    def __init__(self, token, base_url=None, concurrency=DEFAULT_HTTP_CONCURRENCY, request_budget=None,
+                 transport=None):
+        self.token = token
+        self.base_url = (base_url or os.environ.get('GITHUB_API_URL') or 'https://api.github.com').rstrip('/')
+        self.concurrency = concurrency
+        self.request_budget = request_budget
+        self.transport = transport
+        self.request_count = 0
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        # httpx is only needed when this client is actually used
+        import httpx
+
+        from .http_cache import cached_transport
+
+        if self._client is None:
+            headers = {
+                'Accept': 'application/vnd.github+json',
+                'X-GitHub-Api-Version': '2022-11-28'
+            }
+            if self.token:
+                headers['Authorization'] = f"Bearer {self.token}"
+            # A recording keeps what the client sees, so it sits outside the response cache
+            transport = self.transport or wrap_transport(cached_transport(httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            )))
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=HTTP_TIMEOUT,
+                transport=transport
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    def _record_rate_limit(self, response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is not None:
+            self.rate_limit_remaining = int(remaining)
+        if reset is not None:
+            self.rate_limit_reset = int(reset)
+
+    def _retry_delay(self, response, attempt):
+        """Return how long to wait before retrying a response, or None if it should not be retried."""
+        retry_after = response.headers.get('Retry-After')
+        rate_limited = response.status_code == 429 or (
+            response.status_code == 403 and (retry_after is not None or self.rate_limit_remaining == 0)
+        )
+        if not rate_limited and response.status_code not in (500, 502, 503, 504):
+            return None
+        if attempt >= HTTP_MAX_RETRIES:
+            return None
+
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif rate_limited and self.rate_limit_reset is not None:
+            delay = self.rate_limit_reset - time.time() + 1
+        else:
+            delay = 2 ** attempt
+        return max(0.0, delay)
+
+    async def _wait_for_rate_limit(self):
+        """Hold new requests until the reset time once the budget is used up."""
+        if self.rate_limit_remaining == 0 and self.rate_limit_reset is not None:
+            delay = self.rate_limit_reset - time.time() + 1
+            if delay > 0:
+                logger.warning(f"GitHub rate limit exhausted, waiting {delay:.0f}s for reset")
+                await asyncio.sleep(delay)
+
+    async def get_json(self, path, params=None):
+        """GET a REST path and return the decoded JSON body, retrying when asked to back off."""
+        client = self._ensure_client()
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                await self._wait_for_rate_limit()
+                if self.request_budget is not None and self.request_count >= self.request_budget:
+                    raise RequestBudgetExceeded(f"The budget of {self.request_budget} GitHub requests is used up")
+                response = await client.get(path, params=params)
+                if response.headers.get(CACHE_STATUS_HEADER) != 'hit':
+                    self.request_count += 1
+                self._record_rate_limit(response)
+                record_http_response(len(response.content), response.headers)
+
+                delay = self._retry_delay(response, attempt)
+                if delay is None:
+                    response.raise_for_status()
+                    return response.json()
+                if delay > HTTP_MAX_RETRY_DELAY:
+                    raise RuntimeError(f"GitHub asked to wait {delay:.0f}s before retrying {path}")
+
+                logger.warning(f"GitHub returned {response.status_code} for {path}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class SharedEventLoop:
+    """An event loop on a background thread, so sources used from several threads can share one client."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='github-async', daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        """Run a coroutine on the shared loop and wait for its result, charging its requests to the caller's spans."""
+        return asyncio.run_coroutine_threadsafe(with_tracer(get_tracer(), coroutine), self.loop).result()
+
+    def close(self, client=None):
+        if client is not None:
+            self.run(client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+class AsyncGitHubChangeSource:
+    """Change source that fetches from the GitHub REST API concurrently over one connection pool.
+
+    Given a SharedEventLoop, the source runs its requests there and leaves
+    the client open when it is closed, for whoever shares it to close.
+    """
+    name = 'github-async'
+
+    def __init__(self, repository, client, shared_loop=None):
+        self.repository = repository
+        self.client = client
+        self.shared_loop = shared_loop
+        self._loop = None
+
+    def _run(self, coroutine):
+        """Run a coroutine on this source's event loop, which outlives each call."""
+        if self.shared_loop is not None:
+            return self.shared_loop.run(coroutine)
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+
+    def _path(self, suffix):
+        return f"/repos/{self.repository}/{suffix}"
+
+    async def _gather(self, requests):
+        return await asyncio.gather(*(self.client.get_json(path, params) for path, params in requests))
+
+    async def _commit_files(self, commit_sha):
+        """Fetch every page of a commit's changed files."""
+        files = []
+        page = 1
+        while True:
+            data = await self.client.get_json(self._path(f"commits/{commit_sha}"),
+                                              {'per_page': COMMIT_FILES_PAGE_SIZE, 'page': page})
+            page_files = data.get('files', [])
+            files.extend(page_files)
+            if len(page_files) < COMMIT_FILES_PAGE_SIZE:
+                return files
+            page += 1
+
+    async def _gather_commit_files(self, commit_shas):
+        return await asyncio.gather(*(self._commit_files(sha) for sha in commit_shas))
+
+    def get_commit_info(self, commit_sha):
+        """Get commit information including author and date."""
+        logger.info(f"Getting commit info for SHA: {commit_sha}")
+        try:
+            data = self._run(self.client.get_json(self._path(f"commits/{commit_sha}"), {'per_page': 1}))
+            commit_info = commit_info_from_commit(commit_from_json(data))
+            logger.info(f"Commit info retrieved - Author: {commit_info['author']}, Date: {commit_info['date']}, Time: {commit_info['time']}")
+            return commit_info
+        except Exception as e:
+            logger.error(f"Failed to get commit info: {str(e)}")
+            sys.exit(1)
+
+    def iter_commit_files(self, commits):
+        """Yield the files of each non-merge commit, fetching a window of commits at a time."""
+        shas = [commit.sha for commit in commits if len(commit.parents) <= 1]
+        window_size = self.client.concurrency
+        for start in range(0, len(shas), window_size):
+            for files in self._run(self._gather_commit_files(shas[start:start + window_size])):
+                for data in files:
+                    yield file_from_json(data)
+
+    def get_changes(self, base_sha, head_sha):
+        """Get the diff between two commits, fetching all compare pages concurrently."""
+        logger.info(f"Getting changes between {base_sha} and {head_sha}")
+        compare_path = self._path(f"compare/{base_sha}...{head_sha}")
+        try:
+            first_page = self._run(self.client.get_json(compare_path, {'per_page': COMPARE_PAGE_SIZE, 'page': 1}))
+            page_count = max(1, -(-first_page['total_commits'] // COMPARE_PAGE_SIZE))
+            other_pages = self._run(self._gather(
+                (compare_path, {'per_page': COMPARE_PAGE_SIZE, 'page': page}) for page in range(2, page_count + 1)
+            ))
+            commits = []
+            for page in [first_page, *other_pages]:
+                for data in page['commits']:
+                    commit = commit_from_json(data)
+                    commit.parents = data.get('parents', [])
+                    commits.append(commit)
+            logger.info(f"Comparison covers {len(commits)} commits in {page_count} pages")
+
+            # Files are only listed on the first page
+            files = first_page.get('files', [])
+            if len(files) < COMPARE_FILE_LIMIT:
+                files_stream = (file_from_json(data) for data in files)
+            else:
+                logger.warning(f"Comparison lists {len(files)} files, the API limit; reading changed files per commit")
+                files_stream = merge_commit_files(self.iter_commit_files(commits))
+
+            return {
+                'files': exit_on_stream_error(files_stream, "changed files"),
+                'commits': iter(commits)
+            }
+        except Exception as e:
+            logger.error(f"Failed to get changes: {str(e)}")
+            sys.exit(1)
+
+    def find_last_tag(self, head_sha):
+        """Return the closest tag behind head_sha among the most recent tags, comparing them concurrently."""
+        tags = self._run(self.client.get_json(self._path('tags'), {'per_page': TAG_SEARCH_LIMIT}))
+        tags = [tag for tag in tags if tag['commit']['sha'] != head_sha]
+        comparisons = self._run(self._gather(
+            (self._path(f"compare/{tag['commit']['sha']}...{head_sha}"), {'per_page': 1}) for tag in tags
+        ))
+        behind = [(comparison['ahead_by'], tag['name']) for tag, comparison in zip(tags, comparisons)
+                  if comparison['status'] == 'ahead']
+        return min(behind)[1] if behind else None
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.run_until_complete(self.client.aclose())
+            self._loop.close()
+            self._loop = None
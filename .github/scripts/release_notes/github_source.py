@@ -0,0 +1,108 @@
+"""Change source backed by the synchronous PyGithub client."""
+import sys
+import logging
+import itertools
+
+from .clients import get_repository
+from .models import commit_info_from_commit
+from .sources import (
+    COMPARE_FILE_LIMIT,
+    COMPARE_PAGE_SIZE,
+    TAG_SEARCH_LIMIT,
+    exit_on_stream_error,
+    merge_commit_files,
+)
+
+logger = logging.getLogger(__name__)
+
+def get_commit_info(repo, commit_sha):
+    """Get commit information including author and date."""
+    logger.info(f"Getting commit info for SHA: {commit_sha}")
+    try:
+        commit_info = commit_info_from_commit(repo.get_commit(commit_sha))
+        logger.info(f"Commit info retrieved - Author: {commit_info['author']}, Date: {commit_info['date']}, Time: {commit_info['time']}")
+        return commit_info
+    except Exception as e:
+        logger.error(f"Failed to get commit info: {str(e)}")
+        sys.exit(1)
+
+def compare_commits(repo, comparison, base_sha, head_sha):
+    """Return every commit of a comparison, paging through /compare if it covers more than it lists."""
+    if comparison.total_commits <= len(comparison.commits):
+        return comparison.commits
+
+    # An unpaginated compare lists at most 250 commits; the paginated one lists them all
+    logger.info(f"Comparison lists {len(comparison.commits)} of {comparison.total_commits} commits; paging through them")
+    from github.Commit import Commit
+    from github.PaginatedList import PaginatedList
+
+    return PaginatedList(Commit, repo._requester, f"{repo.url}/compare/{base_sha}...{head_sha}",
+                         {'per_page': COMPARE_PAGE_SIZE}, list_item='commits')
+
+def iter_compare_files(repo, comparison, commits):
+    """Yield the changed files of a comparison, netting them from its commits if it was truncated."""
+    files = comparison.files
+    if len(files) < COMPARE_FILE_LIMIT:
+        yield from files
+        return
+
+    # The compare response silently stops at the limit, so walk the range one
+    # commit at a time instead; each commit's file list is paginated and lazy.
+    logger.warning(f"Comparison lists {len(files)} files, the API limit; reading changed files per commit")
+    del files
+    yield from merge_commit_files(
+        file for commit in commits
+        # Merge commits repeat the changes of the commits they bring in
+        if len(commit.parents) <= 1
+        for file in repo.get_commit(commit.sha).files
+    )
+
+def get_changes(repo, base_sha, head_sha):
+    """Get the diff between two commits as lazily fetched file and commit streams."""
+    logger.info(f"Getting changes between {base_sha} and {head_sha}")
+    try:
+        comparison = repo.compare(base_sha, head_sha)
+        logger.info(f"Comparison covers {comparison.total_commits} commits")
+        # A paginated list keeps the commits it has fetched, so both streams read each page once
+        commits = compare_commits(repo, comparison, base_sha, head_sha)
+        # Neither stream is materialized; pages are fetched as the analysis consumes them
+        return {
+            'files': exit_on_stream_error(iter_compare_files(repo, comparison, commits), "changed files"),
+            'commits': exit_on_stream_error(commits, "commits")
+        }
+    except Exception as e:
+        logger.error(f"Failed to get changes: {str(e)}")
+        sys.exit(1)
+
+class GitHubChangeSource:
+    """Change source that reads commits and diffs through the GitHub REST API."""
+    name = 'github'
+
+    def __init__(self, repo=None):
+        self._repo = repo
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            self._repo = get_repository()
+        return self._repo
+
+    def get_commit_info(self, commit_sha):
+        return get_commit_info(self.repo, commit_sha)
+
+    def get_changes(self, base_sha, head_sha):
+        return get_changes(self.repo, base_sha, head_sha)
+
+    def close(self):
+        pass
+
+    def find_last_tag(self, head_sha):
+        """Return the closest tag behind head_sha among the most recent tags."""
+        closest = None
+        for tag in itertools.islice(self.repo.get_tags(), TAG_SEARCH_LIMIT):
+            if tag.commit.sha == head_sha:
+                continue
+            comparison = self.repo.compare(tag.commit.sha, head_sha)
+            if comparison.status == 'ahead' and (closest is None or comparison.ahead_by < closest[1]):
+                closest = (tag.name, comparison.ahead_by)
+        return closest[0] if closest else None
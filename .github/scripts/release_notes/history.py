@@ -0,0 +1,181 @@
+"""Indexed queries over the release history kept in the notes store.
+
+The SQLite database is a derived, rebuildable index: sync() reads only the
+index.jsonl lines appended since the last sync (it remembers the byte offset)
+and loads their JSON records, so lookups by version, file or author never scan
+the rendered notes.
+"""
+import os
+import json
+import sqlite3
+import logging
+from pathlib import Path
+
+from .store import ReleaseNotesStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS releases (
+    seq INTEGER PRIMARY KEY,
+    version TEXT,
+    date TEXT,
+    time TEXT,
+    author TEXT,
+    base TEXT,
+    head TEXT,
+    fragment TEXT,
+    record TEXT
+);
+CREATE TABLE IF NOT EXISTS release_files (
+    seq INTEGER,
+    filename TEXT,
+    status TEXT,
+    additions INTEGER,
+    deletions INTEGER
+);
+CREATE TABLE IF NOT EXISTS release_authors (seq INTEGER, author TEXT, UNIQUE (seq, author));
+CREATE TABLE IF NOT EXISTS release_entries (seq INTEGER, section TEXT, entry TEXT);
+CREATE INDEX IF NOT EXISTS releases_version ON releases (version);
+CREATE INDEX IF NOT EXISTS release_files_filename ON release_files (filename);
+CREATE INDEX IF NOT EXISTS release_authors_author ON release_authors (author COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS release_entries_seq ON release_entries (seq);
+"""
+
+RELEASE_COLUMNS = "r.seq, r.version, r.date, r.time, r.author, r.base, r.head, r.fragment, r.record"
+
+class ReleaseIndex:
+    """SQLite index over the notes store, answering version, file and author lookups."""
+
+    def __init__(self, store=None, path=None):
+        self.store = store or ReleaseNotesStore()
+        self.path = Path(path or os.environ.get('RELEASE_NOTES_INDEX_DB', self.store.directory / 'index.sqlite'))
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _get_offset(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'index_offset'").fetchone()
+        return int(row['value']) if row else 0
+
+    def sync(self):
+        """Index the releases appended to the store since the last sync; return how many."""
+        index_path = self.store.index_path
+        if not index_path.exists():
+            return 0
+
+        offset = self._get_offset()
+        if offset > index_path.stat().st_size:
+            # The store was replaced; start over rather than read from a bogus offset
+            logger.warning("Release index is ahead of the notes store, rebuilding it")
+            self.rebuild()
+            offset = 0
+
+        added = 0
+        with open(index_path, 'rb') as f, self.connection:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # A release is being appended right now; pick it up next time
+                    break
+                offset += len(line)
+                if line.strip():
+                    self._add_release(json.loads(line))
+                    added += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('index_offset', ?)", (str(offset),)
+            )
+
+        if added:
+            logger.info(f"Indexed {added} new releases")
+        return added
+
+    def rebuild(self):
+        """Drop everything indexed so far; the next sync reloads the whole store."""
+        with self.connection:
+            for table in ('releases', 'release_files', 'release_authors', 'release_entries', 'meta'):
+                self.connection.execute(f"DELETE FROM {table}")
+
+    def _add_release(self, entry):
+        seq = entry['seq']
+        record = self.store.read_record(entry) or {}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (seq, entry.get('version'), entry.get('date'), entry.get('time'), entry.get('author'),
+             entry.get('base'), entry.get('head'), entry['fragment'], entry.get('record'))
+        )
+
+        self.connection.executemany(
+            "INSERT INTO release_files VALUES (?, ?, ?, ?, ?)",
+            ((seq, file['filename'], file.get('status'), file.get('additions', 0), file.get('deletions', 0))
+             for file in record.get('files', []))
+        )
+
+        # Everyone who committed to the release counts as one of its authors
+        authors = {entry.get('author')} | {commit.get('author') for commit in record.get('commits', [])}
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO release_authors VALUES (?, ?)",
+            ((seq, author) for author in authors if author)
+        )
+
+        self.connection.executemany(
+            "INSERT INTO release_entries VALUES (?, ?, ?)",
+            ((seq, section, text) for section, texts in record.get('sections', {}).items() for text in texts)
+        )
+
+    def _releases(self, sql, params):
+        self.sync()
+        rows = self.connection.execute(sql, params).fetchall()
+        releases = []
+        for row in rows:
+            release = dict(row)
+            release['sections'] = self._sections(release['seq'])
+            releases.append(release)
+        return releases
+
+    def _sections(self, seq):
+        sections = {}
+        for row in self.connection.execute("SELECT section, entry FROM release_entries WHERE seq = ? ORDER BY rowid", (seq,)):
+            sections.setdefault(row['section'], []).append(row['entry'])
+        return sections
+
+    def by_version(self, version):
+        """Return the releases with the given version, newest first."""
+        return self._releases(
+            f"SELECT {RELEASE_COLUMNS} FROM releases r WHERE r.version = ? ORDER BY r.seq DESC", (version,)
+        )
+
+    def touching(self, path):
+        """Return the releases that changed a file, or anything under a directory ending in "/"."""
+        if path.endswith('/'):
+            condition, params = "f.filename >= ? AND f.filename < ?", (path, path[:-1] + '0')
+        else:
+            condition, params = "f.filename = ?", (path,)
+        return self._releases(
+            f"SELECT DISTINCT {RELEASE_COLUMNS} FROM releases r JOIN release_files f ON f.seq = r.seq "
+            f"WHERE {condition} ORDER BY r.seq DESC", params
+        )
+
+    def by_author(self, author):
+        """Return the releases an author committed to, newest first."""
+        return self._releases(
+            f"SELECT DISTINCT {RELEASE_COLUMNS} FROM releases r JOIN release_authors a ON a.seq = r.seq "
+            "WHERE a.author = ? COLLATE NOCASE ORDER BY r.seq DESC", (author,)
+        )
+
+    def notes(self, release):
+        """Return the rendered notes of a release returned by one of the lookups."""
+        return self.store.read_fragment(release)
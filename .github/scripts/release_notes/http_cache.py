@@ -0,0 +1,251 @@
+"""Persistent cache of GitHub API responses, revalidated with conditional requests.
+
+With RELEASE_NOTES_CACHE_DIR set, the GET responses both GitHub clients
+receive (the asyncio client and PyGithub) are kept in its http/ directory,
+one JSON file per request, and reused by later runs:
+
+- Responses for paths that name only full commit SHAs (a commit, a
+  comparison of two SHAs, a git tree or blob) never change, so they are
+  served from the cache without sending a request at all.
+- Any other cached response, such as the repository, a branch comparison
+  or the tag list, is revalidated: the request carries If-None-Match or
+  If-Modified-Since, and a 304 answer, which GitHub does not charge to the
+  rate limit, is answered with the cached body.
+
+Entries are keyed by URL and Accept header but not by token, since GitHub
+Actions hands every run a new one; revalidation still goes through GitHub's
+access checks, but responses served outright do not, so a cache directory
+should only be shared by tokens that can read the same repositories. The
+least recently used entries are evicted once the directory grows past
+RELEASE_NOTES_CACHE_MAX_BYTES.
+Responses the cache answered carry an X-Release-Notes-Cache header, 'hit' or
+'revalidated', which the run report counts separately from requests.
+RELEASE_NOTES_HTTP_CACHE=0 turns the cache off. PyGithub's requests always
+go through an injected requests adapter, which counts them for the run
+report whether the cache is on or not. Because the clients read the
+API base URL from GITHUB_API_URL, the cache can be exercised against a local
+stand-in server that sends ETags.
+"""
+import os
+import re
+import hashlib
+import logging
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .cache import DEFAULT_CACHE_MAX_BYTES, AnalysisCache
+from .instrumentation import CACHE_STATUS_HEADER, record_http_response
+
+logger = logging.getLogger(__name__)
+
+# Headers kept with a cached response; rate-limit headers would be stale when it is served again
+CACHED_HEADERS = ('content-type', 'etag', 'last-modified', 'link')
+
+# Paths whose response is fixed by the commit SHAs they name
+IMMUTABLE_PATH_RE = re.compile(
+    r'/(?:commits|git/commits|git/trees|git/blobs)/[0-9a-f]{40}$|/compare/[0-9a-f]{40}\.\.\.?[0-9a-f]{40}$'
+)
+
+_pygithub_adapter_installed = False
+
+def is_immutable(path):
+    """Tell whether a request path can only ever return the same response."""
+    return IMMUTABLE_PATH_RE.search(path) is not None
+
+def response_entry(status, headers, body):
+    """Return the cache entry of a response: its status, the headers worth keeping and the decoded body."""
+    return {
+        'status': status,
+        'headers': {name: headers[name] for name in CACHED_HEADERS if name in headers},
+        'body': body
+    }
+
+def conditional_headers(entry):
+    """Return the headers that ask the server to answer 304 if a cached response is still current."""
+    headers = {}
+    if 'etag' in entry['headers']:
+        headers['If-None-Match'] = entry['headers']['etag']
+    if 'last-modified' in entry['headers']:
+        headers['If-Modified-Since'] = entry['headers']['last-modified']
+    return headers
+
+def served_headers(entry, state, fresh=None):
+    """Return the headers of a response answered from the cache, with any rate-limit headers of the 304."""
+    headers = dict(entry['headers'])
+    for name, value in (fresh or {}).items():
+        if name.lower().startswith('x-ratelimit-'):
+            headers[name.lower()] = value
+    headers[CACHE_STATUS_HEADER] = state
+    return headers
+
+class HttpResponseCache(AnalysisCache):
+    """On-disk store of GitHub API responses, with the analysis cache's layout and eviction."""
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes)
+        self.served = 0
+        self.revalidated = 0
+        self.fetched = 0
+
+    def request_key(self, url, headers):
+        """Hash the URL and Accept header a GET request is sent with."""
+        digest = hashlib.sha256()
+        for part in ('GET', url, headers.get('accept') or ''):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def lookup(self, url, path, headers):
+        """Return (key, cached entry or None, whether the entry can be served without asking GitHub)."""
+        key = self.request_key(url, headers)
+        entry = self.get(key)
+        if entry is not None and is_immutable(path):
+            self.served += 1
+            return key, entry, True
+        return key, entry, False
+
+    def store(self, key, entry, status, headers, body):
+        """Record what came back for a request; returns the entry to answer a 304 with, if any."""
+        if status == 304 and entry is not None:
+            self.revalidated += 1
+            return entry
+        if status == 200:
+            self.fetched += 1
+            self.put(key, response_entry(status, headers, body))
+        return None
+
+    def log_stats(self):
+        logger.info(f"GitHub response cache: {self.served} served, {self.revalidated} revalidated, "
+                    f"{self.fetched} fetched, {self.evictions} evictions")
+
+def get_http_cache():
+    """Return the GitHub response cache kept under RELEASE_NOTES_CACHE_DIR, if one is configured."""
+    directory = os.environ.get('RELEASE_NOTES_CACHE_DIR')
+    if not directory or os.environ.get('RELEASE_NOTES_HTTP_CACHE', '1') == '0':
+        return None
+
+    max_bytes = int(os.environ.get('RELEASE_NOTES_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+    cache = HttpResponseCache(Path(directory) / 'http', max_bytes)
+    # Trim what earlier runs left behind; a run adds at most its own responses on top
+    cache.evict()
+    return cache
+
+class CachingTransport:
+    """httpx transport that answers GETs from the response cache and revalidates the rest."""
+
+    def __init__(self, cache, transport):
+        self.cache = cache
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        import httpx
+
+        if request.method != 'GET':
+            return await self.transport.handle_async_request(request)
+
+        key, entry, servable = self.cache.lookup(str(request.url), request.url.path, request.headers)
+        if servable:
+            return httpx.Response(entry['status'], headers=served_headers(entry, 'hit'),
+                                  content=entry['body'].encode('utf-8'), request=request)
+        if entry is not None:
+            request.headers.update(conditional_headers(entry))
+
+        response = await self.transport.handle_async_request(request)
+        if response.status_code not in (200, 304):
+            return response
+        # Read the body here so it can be stored; the client then reads it from memory
+        body = await response.aread()
+        current = self.cache.store(key, entry, response.status_code, response.headers,
+                                   body.decode('utf-8', errors='replace'))
+        if current is None:
+            return response
+        return httpx.Response(current['status'], headers=served_headers(current, 'revalidated', response.headers),
+                              content=current['body'].encode('utf-8'), request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+        self.cache.log_stats()
+
+def cached_transport(transport):
+    """Return the transport wrapped in the response cache when one is configured, else as it is."""
+    cache = get_http_cache()
+    if cache is None:
+        return transport
+    logger.info(f"Caching GitHub responses in {cache.directory}")
+    return CachingTransport(cache, transport)
+
+def install_pygithub_adapter():
+    """Route PyGithub's requests through an adapter that counts them and, when one is configured, the response cache."""
+    global _pygithub_adapter_installed
+    if _pygithub_adapter_installed:
+        return
+    cache = get_http_cache()
+
+    # Only PyGithub runs need requests, so it is imported here rather than with the module
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+    def cached_response(entry, request, state, fresh=None):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(served_headers(entry, state, fresh))
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    class CountingAdapter(requests.adapters.HTTPAdapter):
+        """requests adapter that counts every response and, with a cache, answers GETs from it or revalidates them."""
+
+        def send(self, request, **kwargs):
+            response = self.fetch(request, **kwargs)
+            record_http_response(len(response.content), response.headers)
+            return response
+
+        def fetch(self, request, **kwargs):
+            if cache is None or request.method != 'GET':
+                return super().send(request, **kwargs)
+            key, entry, servable = cache.lookup(request.url, urlsplit(request.url).path, request.headers)
+            if servable:
+                return cached_response(entry, request, 'hit')
+            if entry is not None:
+                request.headers.update(conditional_headers(entry))
+
+            response = super().send(request, **kwargs)
+            if response.status_code not in (200, 304):
+                return response
+            current = cache.store(key, entry, response.status_code, response.headers, response.text)
+            if current is None:
+                return response
+            return cached_response(current, request, 'revalidated', response.headers)
+
+        def close(self):
+            # PyGithub closes its session after every request once connection classes are injected;
+            # the adapter and its connection pool are shared by all of them and live for the run
+            pass
+
+    adapters = []
+
+    def mount(connection):
+        if not adapters:
+            adapters.append(CountingAdapter(max_retries=connection.retry, pool_connections=connection.pool_size,
+                                           pool_maxsize=connection.pool_size))
+        connection.session.mount(f"{connection.protocol}://", adapters[0])
+
+    class CountingHTTPConnection(HTTPRequestsConnectionClass):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            mount(self)
+
+    class CountingHTTPSConnection(HTTPSRequestsConnectionClass):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            mount(self)
+
+    Requester.injectConnectionClasses(CountingHTTPConnection, CountingHTTPSConnection)
+    _pygithub_adapter_installed = True
+    if cache is not None:
+        logger.info(f"Caching GitHub responses in {cache.directory}")
@@ -0,0 +1,321 @@
+"""Span-based run instrumentation and the JSON run report.
+
+Every stage of a run is wrapped in a span that records wall time, CPU time
+(its own process and any worker processes it waited for), the HTTP requests,
+bytes downloaded and rate-limit budget spent while it was open, and the model
+requests and tokens of the summary stage. Spans nest, and counters are added
+to every open span, so each span's numbers include its children. Per-file
+work uses aggregate spans, which are entered many times and keep running
+totals instead of one span per file.
+
+The report (RELEASE_NOTES_REPORT, or --report) lists the spans with
+OpenTelemetry-style ids and nanosecond timestamps. RELEASE_NOTES_PROFILE
+(or --profile) additionally runs the analysis stage under cProfile.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('http_requests', 'bytes_downloaded', 'rate_limit_used', 'http_cache_hits', 'http_not_modified',
+            'llm_requests', 'llm_prompt_tokens', 'llm_completion_tokens', 'llm_cache_hits',
+            'patch_fetches_skipped', 'patch_scans_skipped')
+
+# Set by the GitHub response cache on the responses it answered: 'hit' without a request, or 'revalidated' by a 304
+CACHE_STATUS_HEADER = 'x-release-notes-cache'
+
+_tracer = None
+
+# A tracer of its own for work traced separately, such as one repository of a batch run
+_scoped_tracer = ContextVar('release_notes_tracer', default=None)
+_attach_lock = threading.Lock()
+
+def cpu_times():
+    """Return (CPU seconds of this process, CPU seconds of finished child processes)."""
+    times = os.times()
+    return times.user + times.system, times.children_user + times.children_system
+
+class Span:
+    """A timed stage of the run; aggregate spans add up every time they are entered."""
+    __slots__ = ('name', 'attributes', 'children', 'aggregates', 'calls', 'start_ns', 'end_ns',
+                 'wall_seconds', 'cpu_seconds', 'child_cpu_seconds', 'counters', '_entered')
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.children = []
+        # Aggregate children by name, so re-entering one finds the same span
+        self.aggregates = {}
+        self.calls = 0
+        self.start_ns = None
+        self.end_ns = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.child_cpu_seconds = 0.0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._entered = None
+
+    def enter(self):
+        self.calls += 1
+        if self.start_ns is None:
+            self.start_ns = time.time_ns()
+        self._entered = (time.perf_counter(), *cpu_times())
+
+    def exit(self):
+        wall, cpu, child_cpu = self._entered
+        now_cpu, now_child_cpu = cpu_times()
+        self.wall_seconds += time.perf_counter() - wall
+        self.cpu_seconds += now_cpu - cpu
+        self.child_cpu_seconds += now_child_cpu - child_cpu
+        self.end_ns = time.time_ns()
+
+    def add(self, calls, wall_seconds, cpu_seconds):
+        """Fold in totals measured somewhere else, such as a worker process."""
+        self.calls += calls
+        self.wall_seconds += wall_seconds
+        self.cpu_seconds += cpu_seconds
+
+class Tracer:
+    """The spans of one process; worker processes get their own."""
+
+    def __init__(self, name='run', attributes=None):
+        self.pid = os.getpid()
+        self.root = Span(name, attributes)
+        self.stack = [self.root]
+        self.rate_limit = None
+
+    def open(self, name, aggregate=False, attributes=None):
+        parent = self.stack[-1]
+        if aggregate:
+            span = parent.aggregates.get(name)
+            if span is None:
+                span = parent.aggregates[name] = Span(name, attributes)
+        else:
+            span = Span(name, attributes)
+            parent.children.append(span)
+        span.enter()
+        self.stack.append(span)
+        return span
+
+    def close(self, span):
+        span.exit()
+        # Tolerate spans closed out of order, e.g. by a generator that was abandoned
+        if span in self.stack:
+            del self.stack[self.stack.index(span):]
+
+    def count(self, counter, amount=1):
+        for span in self.stack:
+            span.counters[counter] += amount
+
+    def record_rate_limit(self, remaining, reset):
+        """Charge the rate-limit budget spent since the last response to the open spans."""
+        previous = self.rate_limit
+        if previous is None or previous[1] != reset:
+            # First response, or a new rate-limit window
+            self.rate_limit = (remaining, reset)
+        elif remaining < previous[0]:
+            # Concurrent responses arrive out of order, so only a new low counts
+            self.count('rate_limit_used', previous[0] - remaining)
+            self.rate_limit = (remaining, reset)
+
+def get_tracer():
+    """Return the tracer of the current scope, else this process's, starting a fresh one in a newly forked worker."""
+    global _tracer
+    scoped = _scoped_tracer.get()
+    if scoped is not None and scoped.pid == os.getpid():
+        return scoped
+    if _tracer is None or _tracer.pid != os.getpid():
+        _tracer = Tracer()
+    return _tracer
+
+@contextmanager
+def scoped_tracer(name, attach=True, **attributes):
+    """Trace a block under a root span of its own, e.g. in a thread that runs alongside others.
+
+    Spans opened by concurrent threads would interleave on one span stack, so
+    each thread gets its own tracer. When the block ends its root span is
+    attached below the span that was open where the block started, and its
+    counters are added to that span and everything enclosing it, unless
+    attach is false.
+    """
+    parent = get_tracer()
+    parent_stack = list(parent.stack)
+    tracer = Tracer(name, attributes)
+    token = _scoped_tracer.set(tracer)
+    tracer.root.enter()
+    try:
+        yield tracer
+    finally:
+        tracer.root.exit()
+        _scoped_tracer.reset(token)
+        if attach:
+            with _attach_lock:
+                parent_stack[-1].children.append(tracer.root)
+                for span in parent_stack:
+                    for counter, amount in tracer.root.counters.items():
+                        span.counters[counter] += amount
+
+async def with_tracer(tracer, awaitable):
+    """Await something on another thread's event loop, charging what it counts to tracer."""
+    token = _scoped_tracer.set(tracer)
+    try:
+        return await awaitable
+    finally:
+        _scoped_tracer.reset(token)
+
+@contextmanager
+def span(name, aggregate=False, **attributes):
+    """Time a block as a span nested in whatever span is open."""
+    tracer = get_tracer()
+    opened = tracer.open(name, aggregate, attributes)
+    try:
+        yield opened
+    finally:
+        tracer.close(opened)
+
+def traced_iter(name, iterable):
+    """Yield from iterable, timing the work of producing each item in an aggregate span."""
+    iterator = iter(iterable)
+    while True:
+        with span(name, aggregate=True):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def record_http_response(content_length, headers):
+    """Count one API response, its size and the rate-limit budget it shows."""
+    tracer = get_tracer()
+    cache_status = headers.get(CACHE_STATUS_HEADER)
+    if cache_status == 'hit':
+        # Answered from the response cache; nothing was sent
+        tracer.count('http_cache_hits')
+        return
+    tracer.count('http_requests')
+    if cache_status == 'revalidated':
+        # Only a 304 without a body came over the wire
+        tracer.count('http_not_modified')
+    else:
+        tracer.count('bytes_downloaded', content_length)
+    remaining = headers.get('x-ratelimit-remaining')
+    reset = headers.get('x-ratelimit-reset')
+    if remaining is not None and reset is not None:
+        try:
+            tracer.record_rate_limit(int(remaining), int(reset))
+        except ValueError:
+            pass
+
+def export_aggregates():
+    """Return and forget this process's top-level aggregate spans, for a worker to send back."""
+    tracer = get_tracer()
+    exported = {
+        name: (span.calls, span.wall_seconds, span.cpu_seconds)
+        for name, span in tracer.root.aggregates.items()
+    }
+    tracer.root.aggregates.clear()
+    return exported
+
+def merge_aggregates(exported):
+    """Add aggregate totals returned by a worker to the aggregate spans of the open span."""
+    tracer = get_tracer()
+    parent = tracer.stack[-1]
+    for name, (calls, wall_seconds, cpu_seconds) in exported.items():
+        span = parent.aggregates.get(name)
+        if span is None:
+            span = parent.aggregates[name] = Span(name, {'worker_processes': True})
+        span.add(calls, wall_seconds, cpu_seconds)
+
+def span_documents(span, parent_id, ids):
+    """Flatten a span tree into report entries, parents before children."""
+    span_id = f"{next(ids):016x}"
+    document = {
+        'name': span.name,
+        'span_id': span_id,
+        'parent_span_id': parent_id,
+        'start_time_unix_nano': span.start_ns,
+        'end_time_unix_nano': span.end_ns,
+        'calls': span.calls,
+        'wall_seconds': round(span.wall_seconds, 6),
+        'cpu_seconds': round(span.cpu_seconds, 6),
+        'child_process_cpu_seconds': round(span.child_cpu_seconds, 6),
+        'attributes': {**span.attributes, **span.counters},
+    }
+    documents = [document]
+    for child in [*span.children, *span.aggregates.values()]:
+        documents.extend(span_documents(child, span_id, ids))
+    return documents
+
+def build_report(command=None):
+    """Return the run report as a JSON-serializable document."""
+    from datetime import datetime, timezone
+
+    tracer = get_tracer()
+    root = tracer.root
+    ids = iter(range(1, 1 << 62))
+    return {
+        'command': command,
+        'started': datetime.fromtimestamp((root.start_ns or time.time_ns()) / 1e9, timezone.utc).isoformat(),
+        'wall_seconds': round(root.wall_seconds, 6),
+        'cpu_seconds': round(root.cpu_seconds, 6),
+        'child_process_cpu_seconds': round(root.child_cpu_seconds, 6),
+        'totals': dict(root.counters),
+        'rate_limit_remaining': tracer.rate_limit[0] if tracer.rate_limit else None,
+        'spans': span_documents(root, None, ids),
+    }
+
+def log_summary():
+    """Log one line per top-level stage of the run."""
+    for child in get_tracer().root.children:
+        counters = child.counters
+        model_usage = ""
+        if counters['llm_requests'] or counters['llm_cache_hits']:
+            model_usage = (f", {counters['llm_requests']} model requests "
+                           f"({counters['llm_prompt_tokens'] + counters['llm_completion_tokens']} tokens)")
+        logger.info(
+            f"Stage {child.name}: {child.wall_seconds:.2f}s wall, {child.cpu_seconds:.2f}s CPU, "
+            f"{counters['http_requests']} requests, {counters['bytes_downloaded']} bytes{model_usage}"
+        )
+
+@contextmanager
+def instrumented_run(command, report_path=None):
+    """Run a command inside the root span and write the report when it ends, even on failure."""
+    report_path = report_path or os.environ.get('RELEASE_NOTES_REPORT')
+    tracer = get_tracer()
+    tracer.root.enter()
+    try:
+        yield tracer
+    finally:
+        tracer.root.exit()
+        if report_path:
+            log_summary()
+            try:
+                with open(report_path, 'w') as f:
+                    json.dump(build_report(command), f, indent=2)
+                logger.info(f"Wrote run report to {report_path}")
+            except OSError as e:
+                logger.warning(f"Failed to write run report {report_path}: {str(e)}")
+
+@contextmanager
+def profiled(path=None):
+    """Run a block under cProfile when a profile path is configured, saving pstats data there."""
+    path = path or os.environ.get('RELEASE_NOTES_PROFILE')
+    if not path:
+        yield
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"Wrote analysis profile to {path} (worker processes are not included)")
@@ -0,0 +1,263 @@
+"""Change source that streams commits and diffs from a local git checkout."""
+import sys
+import logging
+import subprocess
+import tempfile
+from datetime import datetime
+
+from .instrumentation import get_tracer
+from .models import ChangedCommit, ChangedFile, commit_info_from_commit
+from .paths import get_path_classifier
+from .sources import exit_on_stream_error
+from .triage import patch_needed
+
+logger = logging.getLogger(__name__)
+
+# NUL-separated fields, record separator between commits
+GIT_LOG_FORMAT = '%H%x00%an%x00%ae%x00%aI%x00%B%x1e'
+GIT_QUOTED_PATH_ESCAPES = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+
+def unquote_git_path(path):
+    """Undo git's C-style quoting of paths with unusual characters."""
+    if not (path.startswith('"') and path.endswith('"')):
+        return path
+    raw = path[1:-1]
+    result = bytearray()
+    i = 0
+    while i < len(raw):
+        char = raw[i]
+        if char == '\\' and i + 1 < len(raw):
+            following = raw[i + 1]
+            if following in GIT_QUOTED_PATH_ESCAPES:
+                result.extend(GIT_QUOTED_PATH_ESCAPES[following].encode())
+                i += 2
+                continue
+            if raw[i + 1:i + 4].isdigit():
+                result.append(int(raw[i + 1:i + 4], 8))
+                i += 4
+                continue
+        result.extend(char.encode())
+        i += 1
+    return result.decode('utf-8', errors='replace')
+
+def parse_diff_header_paths(header):
+    """Return the old and new paths named in a "diff --git" header line."""
+    rest = header[len('diff --git '):]
+    if rest.startswith('"'):
+        old_path, _, new_path = rest[1:].partition('" ')
+        old_path = f'"{old_path}"'
+    else:
+        old_path, _, new_path = rest.partition(' b/')
+        new_path = f"b/{new_path}"
+    return strip_diff_prefix(old_path), strip_diff_prefix(new_path)
+
+def strip_diff_prefix(path):
+    """Turn an "a/..." or "b/..." diff header path into a repository path."""
+    path = unquote_git_path(path)
+    if path == '/dev/null':
+        return None
+    return path[2:] if path[:2] in ('a/', 'b/') else path
+
+class LocalGitChangeSource:
+    """Change source that streams commits and diffs from a local git checkout."""
+    name = 'git'
+
+    def __init__(self, path='.'):
+        self.path = path
+
+    def _run(self, *args):
+        """Run a git command to completion and return its stdout."""
+        result = subprocess.run(
+            ['git', '-C', str(self.path), *args],
+            capture_output=True, text=True, encoding='utf-8', errors='replace', check=True
+        )
+        return result.stdout
+
+    def _stream(self, *args):
+        """Run a git command and yield its stdout line by line as it is produced."""
+        # stderr goes to a file: a pipe nobody reads until stdout ends would
+        # block git once its warnings fill the pipe buffer
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(
+                ['git', '-C', str(self.path), *args],
+                stdout=subprocess.PIPE, stderr=stderr_file,
+                text=True, encoding='utf-8', errors='replace'
+            )
+            completed = False
+            try:
+                yield from process.stdout
+                completed = True
+            finally:
+                if not completed:
+                    # The consumer stopped early; there is no point letting git finish
+                    process.kill()
+                process.stdout.close()
+                if process.wait() != 0 and completed:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read().decode('utf-8', errors='replace')
+                    raise subprocess.CalledProcessError(process.returncode, args, stderr=stderr)
+
+    def has_commit(self, commit_sha):
+        """Check whether a commit is present in the local object database."""
+        try:
+            self._run('cat-file', '-e', f"{commit_sha}^{{commit}}")
+            return True
+        except (OSError, subprocess.CalledProcessError):
+            return False
+
+    def fetch(self, ref):
+        """Fetch a branch or commit from origin, e.g. one that was just pushed."""
+        self._run('fetch', '--quiet', 'origin', ref)
+
+    def resolve(self, ref):
+        """Return the commit SHA a ref names."""
+        return self._run('rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}").strip()
+
+    def first_parent_commits(self, base_sha, head_sha):
+        """Return the SHAs on head_sha's first-parent line after base_sha, oldest first; all of it without a base."""
+        revisions = f"{base_sha}..{head_sha}" if base_sha else head_sha
+        return self._run('rev-list', '--first-parent', '--reverse', revisions).split()
+
+    def tags_between(self, base_sha, head_sha):
+        """Return (tag, commit SHA) for the tags reachable from head_sha but not base_sha, oldest first."""
+        args = ['for-each-ref', '--sort=creatordate', f"--merged={head_sha}",
+                '--format=%(refname:short)%00%(objectname)%00%(*objectname)']
+        if base_sha:
+            args.append(f"--no-merged={base_sha}")
+        tags = []
+        for line in self._run(*args, 'refs/tags').splitlines():
+            name, sha, peeled = line.split('\x00')
+            # Annotated tags point at a tag object; the commit is what it peels to
+            tags.append((name, peeled or sha))
+        return tags
+
+    def iter_commits(self, base_sha, head_sha):
+        """Yield the commits reachable from head_sha but not from base_sha, oldest first."""
+        record = ''
+        for line in self._stream('log', '--reverse', f"--format={GIT_LOG_FORMAT}", f"{base_sha}..{head_sha}"):
+            record += line
+            if '\x1e' in record:
+                entry, record = record.split('\x1e', 1)
+                yield self._parse_commit(entry.lstrip('\n'))
+
+    def _parse_commit(self, entry):
+        sha, name, email, date, message = entry.split('\x00', 4)
+        # There is no GitHub login offline, so the author name stands in for it
+        return ChangedCommit(sha, name, email, datetime.fromisoformat(date), message.rstrip('\n'), login=name)
+
+    def iter_files(self, base_sha, head_sha):
+        """Yield one ChangedFile per changed path by streaming `git diff` output.
+
+        Lines are counted for every file, but the patch text of files the path
+        filter skips (lockfiles, generated files and the like) or a metadata
+        rule settles by path (documentation, tests) is never kept. A file
+        whose mode alone changed is reported as "changed", as the API does.
+        """
+        classifier = get_path_classifier()
+        tracer = get_tracer()
+        current = None
+        patch_lines = []
+        keep_patch = True
+
+        def finish():
+            if patch_lines:
+                current.patch = "\n".join(patch_lines)
+            current.changes = current.additions + current.deletions
+            if current.status == 'modified' and mode_changed and not binary and not current.changes:
+                current.status = 'changed'
+            if current.status not in ('renamed', 'copied'):
+                # Like the API, only report a previous name for renames and copies
+                current.previous_filename = None
+            return current
+
+        in_hunks = mode_changed = binary = False
+        for line in self._stream('-c', 'core.quotePath=false', 'diff', '--no-color', '--no-ext-diff',
+                                 '--find-renames', '--full-index', base_sha, head_sha):
+            line = line.rstrip('\n')
+            if line.startswith('diff --git '):
+                if current is not None:
+                    yield finish()
+                # Provisional names from the header; refined by ---/+++ or rename lines below
+                old_path, new_path = parse_diff_header_paths(line)
+                current = ChangedFile(new_path, previous_filename=old_path)
+                patch_lines = []
+                in_hunks = mode_changed = binary = False
+                continue
+            if current is None:
+                continue
+
+            if in_hunks:
+                if line.startswith('+'):
+                    current.additions += 1
+                elif line.startswith('-'):
+                    current.deletions += 1
+                if keep_patch:
+                    patch_lines.append(line)
+            elif line.startswith('@@'):
+                in_hunks = True
+                # The file's name is final once its hunks start
+                keep_patch = (classifier.classify(current.filename) is None
+                              and patch_needed(current.filename, current.status))
+                if keep_patch:
+                    patch_lines.append(line)
+                else:
+                    tracer.count('patch_fetches_skipped')
+            elif line.startswith('old mode '):
+                mode_changed = True
+            elif line.startswith('Binary files '):
+                binary = True
+            elif line.startswith('new file mode'):
+                current.status = 'added'
+            elif line.startswith('deleted file mode'):
+                current.status = 'removed'
+            elif line.startswith('rename from '):
+                current.status = 'renamed'
+                current.previous_filename = unquote_git_path(line[len('rename from '):])
+            elif line.startswith('rename to '):
+                current.filename = unquote_git_path(line[len('rename to '):])
+            elif line.startswith('copy from '):
+                current.status = 'copied'
+                current.previous_filename = unquote_git_path(line[len('copy from '):])
+            elif line.startswith('copy to '):
+                current.filename = unquote_git_path(line[len('copy to '):])
+            elif line.startswith('index '):
+                old_blob, _, new_blob = line.split()[1].partition('..')
+                # Removed files keep the blob they had before the change
+                current.sha = old_blob if current.status == 'removed' else new_blob
+            elif line.startswith('+++ '):
+                current.filename = strip_diff_prefix(line[4:]) or current.filename
+            elif line.startswith('--- '):
+                current.previous_filename = strip_diff_prefix(line[4:]) or current.previous_filename
+
+        if current is not None:
+            yield finish()
+
+    def find_last_tag(self, head_sha):
+        """Return the most recent tag reachable from the parent of head_sha."""
+        try:
+            return self._run('describe', '--tags', '--abbrev=0', f"{head_sha}^").strip() or None
+        except subprocess.CalledProcessError:
+            return None
+
+    def get_commit_info(self, commit_sha):
+        """Get commit information including author and date from local git."""
+        logger.info(f"Getting commit info for SHA from local git: {commit_sha}")
+        try:
+            entry = self._run('show', '-s', f"--format={GIT_LOG_FORMAT}", commit_sha).split('\x1e', 1)[0]
+            commit_info = commit_info_from_commit(self._parse_commit(entry))
+            logger.info(f"Commit info retrieved - Author: {commit_info['author']}, Date: {commit_info['date']}, Time: {commit_info['time']}")
+            return commit_info
+        except Exception as e:
+            logger.error(f"Failed to get commit info from local git: {str(e)}")
+            sys.exit(1)
+
+    def close(self):
+        pass
+
+    def get_changes(self, base_sha, head_sha):
+        """Get the diff between two commits from local git as lazy streams."""
+        logger.info(f"Getting changes between {base_sha} and {head_sha} from local git")
+        return {
+            'files': exit_on_stream_error(self.iter_files(base_sha, head_sha), "changed files from local git"),
+            'commits': exit_on_stream_error(self.iter_commits(base_sha, head_sha), "commits from local git")
+        }
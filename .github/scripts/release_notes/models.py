@@ -0,0 +1,77 @@
+"""Client-independent file and commit objects shaped like PyGithub's."""
+from datetime import datetime
+from types import SimpleNamespace
+
+class ChangedFile:
+    """A changed file not tied to any API client, shaped like PyGithub's File."""
+    __slots__ = ('filename', 'previous_filename', 'status', 'additions', 'deletions',
+                 'changes', 'patch', 'sha', 'raw_url')
+
+    def __init__(self, filename, status='modified', previous_filename=None):
+        self.filename = filename
+        self.previous_filename = previous_filename
+        self.status = status
+        self.additions = 0
+        self.deletions = 0
+        self.changes = 0
+        self.patch = None
+        self.sha = None
+        # Local files have no download URL, but the analyzers only check that it exists
+        self.raw_url = None
+
+def snapshot_file(file):
+    """Copy the fields the analyzers read into a picklable ChangedFile."""
+    if isinstance(file, ChangedFile):
+        return file
+    snapshot = ChangedFile(file.filename, file.status, getattr(file, 'previous_filename', None))
+    snapshot.additions = getattr(file, 'additions', 0)
+    snapshot.deletions = getattr(file, 'deletions', 0)
+    snapshot.changes = getattr(file, 'changes', 0)
+    snapshot.patch = getattr(file, 'patch', None)
+    snapshot.sha = getattr(file, 'sha', None)
+    snapshot.raw_url = getattr(file, 'raw_url', None)
+    return snapshot
+
+class ChangedCommit:
+    """A commit not tied to any API client, shaped like PyGithub's Commit."""
+    __slots__ = ('sha', 'author', 'commit', 'parents')
+
+    def __init__(self, sha, author_name, author_email, date, message, login=None):
+        self.sha = sha
+        # Like PyGithub, author is None when the commit is not linked to a GitHub user
+        self.author = SimpleNamespace(login=login, email=author_email) if login else None
+        self.parents = []
+        self.commit = SimpleNamespace(
+            author=SimpleNamespace(name=author_name, email=author_email, date=date),
+            message=message
+        )
+
+def commit_info_from_commit(commit):
+    """Extract author, date and message from a GitHub or local commit object."""
+    author = commit.author.login if commit.author else 'Unknown'
+    return {
+        'sha': commit.sha,
+        'author': author,
+        'date': commit.commit.author.date.strftime('%Y-%m-%d'),
+        'time': commit.commit.author.date.strftime('%H:%M:%S'),
+        'message': commit.commit.message
+    }
+
+def file_from_json(data):
+    """Build a ChangedFile from a file entry of a compare or commit response."""
+    file = ChangedFile(data['filename'], data['status'], data.get('previous_filename'))
+    file.additions = data.get('additions', 0)
+    file.deletions = data.get('deletions', 0)
+    file.changes = data.get('changes', 0)
+    file.patch = data.get('patch')
+    file.sha = data.get('sha')
+    file.raw_url = data.get('raw_url')
+    return file
+
+def commit_from_json(data):
+    """Build a ChangedCommit from a commit entry of a compare or commit response."""
+    author = data['commit']['author']
+    login = (data.get('author') or {}).get('login')
+    date = datetime.fromisoformat(author['date'].replace('Z', '+00:00'))
+    return ChangedCommit(data['sha'], author.get('name'), author.get('email'), date,
+                         data['commit']['message'], login=login)
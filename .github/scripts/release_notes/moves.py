@@ -0,0 +1,302 @@
+"""Detection of moved files among the removed and added files of a release.
+
+Git and the GitHub API only report a rename they spotted themselves. Git
+stops looking past diff.renameLimit, and per-commit file listings see a move
+spread over several commits as a removal and an addition. A moved directory
+of vendored code then shows up as thousands of deleted and new files, each
+summarized and scanned as a whole.
+
+pair_moves() keeps a compact candidate of each removed and added file (its
+name, blob SHA and a signature of its lines, not its patch) and, once the
+stream ends, pairs them up in two passes, neither of which compares every
+removed file with every added one:
+
+- identical content: the same blob SHA, found with one dict lookup per
+  file, which also pairs files whose patch was never kept;
+- similar content: a MinHash signature over each file's distinct lines
+  (one-permutation hashing, so one pass over the lines per file), banded
+  for locality-sensitive hashing, so only files that share a whole band
+  are ever compared.
+
+Each pair is yielded as a single renamed file whose patch holds only the
+lines that differ between the two versions, so the analysis sees the real
+edits and not the whole file twice. Modified, renamed and other files pass
+straight through; only removed and added files are held back, spooled to a
+temporary file that spills to disk past SPOOL_MEMORY_BYTES, and yielded
+after the rest of the stream once the pairs are known, in their own order,
+with a move in the place of its added file. RELEASE_NOTES_DETECT_MOVES=0
+turns detection off.
+"""
+import os
+import zlib
+import pickle
+import logging
+import posixpath
+import tempfile
+from collections import Counter, defaultdict
+
+from .models import ChangedFile, snapshot_file
+
+logger = logging.getLogger(__name__)
+
+# Bins of a MinHash signature, and how they are banded: files are compared when all rows of a band match
+SIGNATURE_SIZE = 64
+SIGNATURE_BANDS = 16
+BAND_ROWS = SIGNATURE_SIZE // SIGNATURE_BANDS
+
+# Share of matching signature bins (estimated Jaccard similarity of the lines) a pair needs
+SIMILARITY_THRESHOLD = 0.5
+
+# Files with fewer distinct lines are only paired when identical; their signatures say too little
+MIN_FINGERPRINT_LINES = 3
+
+# Bands shared by more files than this are common boilerplate and are not used to find candidates
+MAX_BAND_BUCKET = 64
+
+_BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+_VALUE_BITS = 64 - _BIN_BITS
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+# Bytes of spooled files kept in memory before the spool moves to a temporary file on disk
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# Blob SHAs that say nothing about where a file came from: no content, and an empty file
+NULL_SHA = '0' * 40
+EMPTY_BLOB_SHA = 'e69de29bb2d1d6434b8b29ae775ad8c2e48c5391'
+
+def moves_enabled():
+    """Return whether move detection is on; RELEASE_NOTES_DETECT_MOVES=0 turns it off."""
+    return os.environ.get('RELEASE_NOTES_DETECT_MOVES', '1') != '0'
+
+def patch_content(patch, marker):
+    """Return the lines of an added ('+') or removed ('-') file's content from its patch."""
+    return [line[1:] for line in patch.splitlines() if line.startswith(marker)]
+
+def line_features(lines):
+    """Return 64-bit hashes of a file's distinct non-blank lines, ignoring indentation and trailing space."""
+    features = set()
+    for line in lines:
+        line = line.strip()
+        if line:
+            features.add((zlib.crc32(line.encode('utf-8', errors='surrogatepass')) * _MIX) & _MASK64)
+    return features
+
+def minhash_signature(features):
+    """Return a one-permutation MinHash signature of a set of line hashes.
+
+    The top bits of a hash pick its bin and each bin keeps its smallest
+    value. Empty bins borrow the next filled bin's value, offset by the
+    distance, so small files still get comparable signatures.
+    """
+    bins = [None] * SIGNATURE_SIZE
+    for feature in features:
+        index = feature >> _VALUE_BITS
+        value = feature & _VALUE_MASK
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    for index in range(SIGNATURE_SIZE):
+        if bins[index] is None:
+            for distance in range(1, SIGNATURE_SIZE):
+                value = bins[(index + distance) % SIGNATURE_SIZE]
+                if value is not None:
+                    bins[index] = (distance << _VALUE_BITS) | value
+                    break
+    return tuple(bins)
+
+def signature_similarity(left, right):
+    """Return the share of bins two signatures agree on, an estimate of their Jaccard similarity."""
+    return sum(a == b for a, b in zip(left, right)) / SIGNATURE_SIZE
+
+def signature_bands(signature):
+    return [(band, signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]) for band in range(SIGNATURE_BANDS)]
+
+def edit_patch(old_lines, new_lines):
+    """Return (patch, additions, deletions) of the lines one version of a file has and the other lacks.
+
+    Lines are matched as a multiset, not aligned, so this is linear in the
+    file's length; the patch is one hunk of the removed then the added lines,
+    each in file order. The hunk starts at line 0 on both sides, which marks
+    it as out of order: the symbol pass reads the declarations on its lines
+    but follows no scopes through them.
+    """
+    old_counts = Counter(old_lines)
+    new_counts = Counter(new_lines)
+    removed = []
+    for line in old_lines:
+        if new_counts[line] > 0:
+            new_counts[line] -= 1
+        else:
+            removed.append(line)
+    added = []
+    for line in new_lines:
+        if old_counts[line] > 0:
+            old_counts[line] -= 1
+        else:
+            added.append(line)
+    if not removed and not added:
+        return None, 0, 0
+    header = f"@@ -0,{len(removed)} +0,{len(added)} @@"
+    patch = "\n".join([header, *(f"-{line}" for line in removed), *(f"+{line}" for line in added)])
+    return patch, len(added), len(removed)
+
+def moved_file(removed, added):
+    """Return the renamed file that stands for a removed and an added file with (nearly) the same content."""
+    file = ChangedFile(added.filename, 'renamed', removed.filename)
+    file.sha = added.sha
+    file.raw_url = added.raw_url
+    identical = usable_sha(removed) is not None and removed.sha == added.sha
+    if not identical and removed.patch and added.patch:
+        file.patch, file.additions, file.deletions = edit_patch(patch_content(removed.patch, '-'),
+                                                                patch_content(added.patch, '+'))
+    elif not identical:
+        # The content differs but one side has no patch to compare; count every line as changed
+        file.additions, file.deletions = added.additions, removed.deletions
+    file.changes = file.additions + file.deletions
+    return file
+
+def usable_sha(file):
+    return file.sha if file.sha and file.sha not in (NULL_SHA, EMPTY_BLOB_SHA) else None
+
+class MoveCandidate:
+    """What pairing needs of a removed or added file: its place in the spool, name, blob SHA and signature."""
+    __slots__ = ('offset', 'filename', 'sha', 'signature')
+
+    def __init__(self, offset, file, marker):
+        self.offset = offset
+        self.filename = file.filename
+        self.sha = usable_sha(file)
+        self.signature = file_signature(file, marker)
+
+def pair_identical(removed, added):
+    """Return (removed index, added index) pairs with the same blob SHA, preferring the same file name."""
+    by_sha = defaultdict(list)
+    for index, candidate in enumerate(removed):
+        if candidate.sha is not None:
+            by_sha[candidate.sha].append(index)
+
+    pairs = []
+    for added_index, candidate in enumerate(added):
+        candidates = by_sha.get(candidate.sha)
+        if not candidates:
+            continue
+        name = posixpath.basename(candidate.filename)
+        choice = next((i for i in candidates if posixpath.basename(removed[i].filename) == name), candidates[0])
+        candidates.remove(choice)
+        pairs.append((choice, added_index))
+    return pairs
+
+def file_signature(file, marker):
+    if not file.patch:
+        return None
+    features = line_features(patch_content(file.patch, marker))
+    if len(features) < MIN_FINGERPRINT_LINES:
+        return None
+    return minhash_signature(features)
+
+def pair_similar(removed, added):
+    """Return (removed index, added index) pairs whose content is similar, best matches first."""
+    buckets = defaultdict(list)
+    for index, candidate in enumerate(removed):
+        if candidate.signature is not None:
+            for band in signature_bands(candidate.signature):
+                buckets[band].append(index)
+
+    scored = []
+    for added_index, candidate in enumerate(added):
+        signature = candidate.signature
+        if signature is None:
+            continue
+        name = posixpath.basename(candidate.filename)
+        seen = set()
+        for band in signature_bands(signature):
+            bucket = buckets.get(band, ())
+            if len(bucket) > MAX_BAND_BUCKET:
+                continue
+            for removed_index in bucket:
+                if removed_index in seen:
+                    continue
+                seen.add(removed_index)
+                similarity = signature_similarity(signature, removed[removed_index].signature)
+                if similarity >= SIMILARITY_THRESHOLD:
+                    same_name = posixpath.basename(removed[removed_index].filename) == name
+                    scored.append((similarity, same_name, -added_index, -removed_index))
+
+    # Greedily take the most similar pairs, each file in at most one
+    pairs = []
+    taken_removed = set()
+    taken_added = set()
+    for _, _, added_index, removed_index in sorted(scored, reverse=True):
+        added_index, removed_index = -added_index, -removed_index
+        if added_index in taken_added or removed_index in taken_removed:
+            continue
+        taken_added.add(added_index)
+        taken_removed.add(removed_index)
+        pairs.append((removed_index, added_index))
+    return pairs
+
+def find_moves(removed, added):
+    """Return (removed index, added index) pairs of moved files: identical ones, then similar ones."""
+    pairs = pair_identical(removed, added)
+    paired_removed = {r for r, _ in pairs}
+    paired_added = {a for _, a in pairs}
+    rest_removed = [i for i in range(len(removed)) if i not in paired_removed]
+    rest_added = [i for i in range(len(added)) if i not in paired_added]
+    similar = pair_similar([removed[i] for i in rest_removed], [added[i] for i in rest_added])
+    pairs.extend((rest_removed[r], rest_added[a]) for r, a in similar)
+    return pairs
+
+def read_spooled(spool, offset):
+    """Return the file spooled at an offset, leaving the spool where it was."""
+    position = spool.tell()
+    spool.seek(offset)
+    file = pickle.load(spool)
+    spool.seek(position)
+    return file
+
+def pair_moves(files):
+    """Yield the changed files, with removed and added files of the same content joined into moves.
+
+    Files other than removed and added ones are yielded as they come. The
+    removed and added files are spooled and yielded once the stream ends, in
+    stream order, except that a move stands in for its added file and its
+    removed file is left out. Pairing is skipped when there are no removed or
+    no added files to pair.
+    """
+    removed = []
+    added = []
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as spool:
+        count = 0
+        for file in files:
+            if file.status not in ('removed', 'added'):
+                yield file
+                continue
+            file = snapshot_file(file)
+            offset = spool.tell()
+            pickle.dump(file, spool, pickle.HIGHEST_PROTOCOL)
+            count += 1
+            if file.status == 'removed':
+                removed.append(MoveCandidate(offset, file, '-'))
+            else:
+                added.append(MoveCandidate(offset, file, '+'))
+
+        pairs = find_moves(removed, added) if removed and added else []
+        if pairs:
+            identical = sum(1 for r, a in pairs if removed[r].sha is not None and removed[r].sha == added[a].sha)
+            logger.info(f"Detected {len(pairs)} moved files ({identical} unchanged) "
+                        f"among {len(removed)} removed and {len(added)} added files")
+        # Spool offset of an added file -> offset of the removed file it moved from
+        moves = {added[a].offset: removed[r].offset for r, a in pairs}
+        paired_removed = set(moves.values())
+        del removed, added, pairs
+
+        spool.seek(0)
+        for _ in range(count):
+            offset = spool.tell()
+            file = pickle.load(spool)
+            if offset in paired_removed:
+                continue
+            if offset in moves:
+                file = moved_file(read_spooled(spool, moves[offset]), file)
+            yield file
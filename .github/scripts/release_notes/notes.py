@@ -0,0 +1,121 @@
+"""Rendering release notes and writing them to release_note.txt."""
+import sys
+import logging
+from datetime import datetime
+
+from .analysis import (
+    add_file_note_entries,
+    categorize_file_changes,
+    new_note_categories,
+    skipped_file_note_entries,
+    triage_file,
+)
+from .instrumentation import span
+from .patches import parse_patch
+from .rules import get_rule_engine
+from .store import ReleaseNotesStore
+
+logger = logging.getLogger(__name__)
+
+def format_release_notes(commit_info, changes, analysis_summary, version, highlights=None):
+    """Format the release notes in the specified format."""
+    categories = new_note_categories()
+    for file in changes['files']:
+        # Files the path filter skips or a metadata rule settles note nothing of their own
+        if triage_file(file) != (None, None):
+            add_file_note_entries(categories, file.filename, skipped_file_note_entries(file))
+        else:
+            categorize_file_changes(file, parse_patch(getattr(file, 'patch', None)), categories)
+
+    return render_release_notes(commit_info, categories, version, highlights)
+
+def render_release_notes(commit_info, categories, version, highlights=None):
+    """Render categorized release note entries, led by the model's highlights if there are any."""
+    logger.info("Formatting release notes")
+
+    # Get current month and year
+    current_date = datetime.now()
+    month_year = current_date.strftime("%B %Y")
+
+    # Extract version components
+    major, minor, patch = map(int, version.split('.'))
+
+    # Create the release notes
+    notes = []
+
+    # Header with month and version
+    notes.append(f"{month_year} (version {major}.{minor})")
+    notes.append("-" * 69)
+    notes.append("")
+
+    # Add patch updates if there are any
+    if patch > 0:
+        for p in range(1, patch + 1):
+            notes.append(f"Update {major}.{minor}.{p}: The update addresses these issues.")
+            notes.append("")
+
+    # Welcome message
+    notes.append(f"Welcome to the {month_year} release of Your Application. There are many updates in this version that we hope you'll like, some of the key highlights include:")
+    notes.append("")
+
+    # Model-written highlights of the release
+    if highlights:
+        for highlight in highlights:
+            notes.append(f"- {highlight}")
+        notes.append("")
+
+    # Add categorized sections with emojis
+    for key, title in get_rule_engine().sections:
+        if categories.get(key):
+            notes.append(title)
+            for change in categories[key]:
+                notes.append(f"- {change}")
+            notes.append("")
+
+    # Mention the commits a range release covers
+    commits = commit_info.get('commits', [])
+    if len(commits) > 1:
+        authors = sorted({commit['author'] for commit in commits})
+        notes.append(f"This release includes {len(commits)} commits by {', '.join(authors)}.")
+        notes.append("")
+
+    # Add footer with version and date
+    notes.append("-" * 69)
+    notes.append(f"Version: {version} | Date: {commit_info['date']} at {commit_info['time']} | Author: {commit_info['author']}")
+
+    formatted_notes = "\n".join(notes)
+    logger.info("Release notes formatted successfully")
+    return formatted_notes
+
+def update_release_notes(new_content, metadata=None, record=None, store=None):
+    """Record a new release, and optionally its structured data, in the notes store."""
+    store = store or ReleaseNotesStore()
+    logger.info(f"Adding release to notes store: {store.directory.absolute()}")
+
+    try:
+        with span('update_release_notes'):
+            entry = store.append(new_content, metadata, record)
+        logger.info(f"Stored release {entry['seq']} as {entry['fragment']}")
+        return entry
+    except Exception as e:
+        logger.error(f"Failed to update release notes store: {str(e)}")
+        sys.exit(1)
+
+def compose_release_notes(output_path=None, store=None):
+    """Render the combined newest-first release_note.txt from every release in the notes store."""
+    store = store or ReleaseNotesStore()
+    try:
+        with span('compose_release_notes'):
+            file_path = store.compose(output_path)
+        logger.info("Successfully updated release_note.txt")
+
+        # Verify the file was created
+        if file_path.exists():
+            file_size = file_path.stat().st_size
+            logger.info(f"Release notes file exists with size: {file_size} bytes")
+        else:
+            logger.error("Release notes file was not created")
+        return file_path
+    except Exception as e:
+        logger.error(f"Failed to update release notes file: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,129 @@
+"""A local stand-in for the OpenAI chat completions API.
+
+The stub answers POST .../chat/completions with a deterministic bullet list
+built from the prompt: one bullet per "File:" header of an excerpt batch, or
+the prompt's own bullets for a merge request. It reports token usage the way
+the real API does and can add a fixed latency to every response, so the
+summary stage's request count, tokens and wall time can be measured without
+a network or an API key. Point OPENAI_BASE_URL at its base_url to use it.
+
+Faults can be queued to answer the next requests instead, one each: a 429
+rate limit or a 500 error, which the OpenAI client retries, or a 200 whose
+body has no choices, which it does not.
+"""
+import re
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+FILE_HEADER_RE = re.compile(r'^File: (\S+)', re.MULTILINE)
+BULLET_RE = re.compile(r'^- (.+)$', re.MULTILINE)
+
+# Bullets per response, like the prompt asks of a real model
+STUB_MAX_BULLETS = 6
+
+# Fault name -> (status, body) the stub answers a request with instead of a completion
+STUB_FAULTS = {
+    'rate_limit': (429, {'error': {'message': "Rate limit reached", 'type': 'requests', 'code': 'rate_limit_exceeded'}}),
+    'server_error': (500, {'error': {'message': "The server had an error", 'type': 'server_error'}}),
+    'malformed': (200, {'id': 'chatcmpl-stub-malformed', 'object': 'chat.completion', 'choices': []}),
+}
+
+def stub_completion(messages):
+    """Return the response text the stub gives for a conversation."""
+    prompt = messages[-1]['content'] if messages else ""
+    files = FILE_HEADER_RE.findall(prompt)
+    if files:
+        bullets = [f"Updated {name.rsplit('/', 1)[-1]}" for name in files]
+    else:
+        bullets = BULLET_RE.findall(prompt)
+    return "\n".join(f"- {bullet}" for bullet in bullets[:STUB_MAX_BULLETS]) or "- General improvements"
+
+class OpenAIStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'invalid_request_error'}})
+            return
+
+        with self.server.lock:
+            self.server.requests += 1
+            number = self.server.requests
+            fault = self.server.faults.pop(0) if self.server.faults else None
+        if fault is not None:
+            self.send_json(*STUB_FAULTS[fault])
+            return
+
+        request = json.loads(body or b'{}')
+        messages = request.get('messages', [])
+        content = stub_completion(messages)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        prompt_tokens = sum(len(message.get('content') or "") for message in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        self.send_json(200, {
+            'id': f"chatcmpl-stub-{number}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def send_json(self, status, document):
+        payload = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(f"OpenAI stub: {format % args}")
+
+class OpenAIStubServer(ThreadingHTTPServer):
+    """The stub on a local port, answering from a background thread once started.
+
+    `requests` counts every completion request, including those a fault answered.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, faults=()):
+        super().__init__(('127.0.0.1', port), OpenAIStubHandler)
+        self.latency = latency
+        # Names from STUB_FAULTS, answering the next requests in order
+        self.faults = list(faults)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='openai-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,155 @@
+"""Unified diff parsing shared by every analysis stage, split into lines and hunks on first use."""
+import re
+
+# Patterns shared by the analysis stages, compiled once per run
+HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@ ?(.*)$')
+NEW_ROUTE_RE = re.compile(r'\s*Route::(get|post|put|delete|patch)\s*\([\'"]([^\'"]+)[\'"]')
+ENDPOINT_RE = re.compile(r'(?:api|endpoint)[/:]([a-zA-Z0-9_/]+)')
+BUG_DESCRIPTION_RE = re.compile(r'(?:bug|fix)[:\s]+([a-zA-Z0-9_\s]+)')
+TEST_NAME_RE = re.compile(r'test_([a-zA-Z0-9_]+)')
+INPUT_TYPE_RE = re.compile(r'type="([^"]*)"')
+BUTTON_CLASS_RE = re.compile(r'class="([^"]*btn[^"]*)"')
+
+class Hunk:
+    """A single @@ block of a unified diff with its changed lines."""
+    __slots__ = ('old_start', 'old_count', 'new_start', 'new_count', 'context', 'raw', '_lines')
+
+    def __init__(self, old_start, old_count, new_start, new_count, context, raw):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.context = context
+        # The lines of the block as they appear in the patch, each still prefixed by ' ', '+' or '-'
+        self.raw = raw
+        self._lines = None
+
+    @property
+    def lines(self):
+        """Every line of the hunk in order as (' ', '+' or '-', line content without that prefix)."""
+        if self._lines is None:
+            # "\ No newline at end of file" markers are not lines of either side
+            self._lines = [(line[:1] if line[:1] in ('+', '-') else ' ', line[1:])
+                           for line in self.raw if not line.startswith('\\')]
+        return self._lines
+
+    @property
+    def ordered(self):
+        """Whether the lines are in file order, so scopes can be followed through them.
+
+        A hunk of lines gathered from all over a file (see moves.edit_patch)
+        starts at line 0 on both sides while holding lines, which no diff does.
+        """
+        return self.old_start != 0 or self.new_start != 0 or not (self.old_count or self.new_count)
+
+    @property
+    def added(self):
+        """(line number, line content) of every added line."""
+        return self.numbered('+', self.new_start)
+
+    @property
+    def removed(self):
+        """(line number, line content) of every removed line."""
+        return self.numbered('-', self.old_start)
+
+    def numbered(self, side, start):
+        numbered = []
+        number = start
+        for tag, line in self.lines:
+            if tag == side:
+                numbered.append((number, line))
+            if tag != side and tag != ' ':
+                continue
+            number += 1
+        return numbered
+
+class ParsedPatch:
+    """Structured view of a file patch shared by every analysis stage.
+
+    Each view is built on first use and kept, so a stage that only looks for
+    keywords never splits the patch into lines, and the stages that do all
+    share one split.
+    """
+    __slots__ = ('text', 'hits', 'absent', 'symbols', '_lower', '_lines', '_hunks', '_added', '_removed')
+
+    def __init__(self, text):
+        self.text = text
+        # Rule keyword -> whether the patch contains it, filled in by the rule engine as rules look keywords up
+        self.hits = None
+        # Lowered keywords a one-pass scan of the patch ruled out, so their lookups cost nothing
+        self.absent = ()
+        # Symbols the changed lines add, change or remove, filled in by symbols.py on first use
+        self.symbols = None
+        self._lower = None
+        self._lines = None
+        self._hunks = None
+        self._added = None
+        self._removed = None
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def lines(self):
+        """Every line of the patch, headers included."""
+        if self._lines is None:
+            self._lines = self.text.splitlines()
+        return self._lines
+
+    @property
+    def hunks(self):
+        if self._hunks is None:
+            self._hunks = split_hunks(self.lines)
+        return self._hunks
+
+    @property
+    def added(self):
+        """The content of every added line, without the leading +."""
+        if self._added is None:
+            self._added = [line[1:] for line in self.lines if line.startswith('+')]
+        return self._added
+
+    @property
+    def removed(self):
+        """The content of every removed line, without the leading -."""
+        if self._removed is None:
+            self._removed = [line[1:] for line in self.lines if line.startswith('-')]
+        return self._removed
+
+    def find_added(self, pattern):
+        """Return every match of a compiled pattern at the start of an added line."""
+        matches = []
+        for line in self.added:
+            match = pattern.match(line)
+            if match:
+                matches.append(match.group(1) if pattern.groups == 1 else match.groups())
+        return matches
+
+def split_hunks(lines):
+    """Split the lines of a patch into its @@ blocks; lines before the first one belong to none."""
+    headers = []
+    for index in [index for index, line in enumerate(lines) if line.startswith('@@')]:
+        match = HUNK_HEADER_RE.match(lines[index])
+        if match:
+            headers.append((index, match))
+
+    hunks = []
+    for number, (index, match) in enumerate(headers):
+        end = headers[number + 1][0] if number + 1 < len(headers) else len(lines)
+        old_start, old_count, new_start, new_count, context = match.groups()
+        hunks.append(Hunk(
+            int(old_start),
+            int(old_count) if old_count is not None else 1,
+            int(new_start),
+            int(new_count) if new_count is not None else 1,
+            context,
+            lines[index + 1:end]
+        ))
+    return hunks
+
+def parse_patch(patch):
+    """Wrap a unified diff patch for analysis; its hunks and lines are split out when first needed."""
+    return ParsedPatch(patch or "")
@@ -0,0 +1,174 @@
+"""Path classification that keeps lockfiles, vendored, generated and binary files out of the analysis.
+
+Classification needs nothing but a file's path and line counts, so it runs
+before any patch is read. A path is skipped when the repository's
+.gitattributes marks it linguist-generated, linguist-vendored, -diff or
+binary, when it matches the skip_paths globs of the rule table, or when it
+matches RELEASE_NOTES_IGNORE (comma-separated globs). A file whose mode alone
+changed (status "changed", as GitHub and the local git source report it) is
+skipped as a mode change; any other modified file without a single changed
+line is taken to be binary.
+
+Globs follow .gitattributes rules: a pattern without a slash matches the
+file name in any directory, one with a slash matches from the repository
+root, `*` stops at slashes and `**` does not.
+"""
+import os
+import re
+import sys
+import logging
+from pathlib import Path
+
+from .rules import get_rule_engine
+
+logger = logging.getLogger(__name__)
+
+# What each kind of skipped file is called in its one-line summary
+SKIPPED_KINDS = {
+    'lockfile': "Dependency lockfile",
+    'vendored': "Vendored code",
+    'generated': "Generated file",
+    'binary': "Binary file",
+    'mode': "File mode change",
+    'ignored': "Ignored path",
+}
+
+# .gitattributes attributes that mark a path, and the kind each one marks it as
+GITATTRIBUTES_KINDS = (
+    ('linguist-generated', 'generated'),
+    ('linguist-vendored', 'vendored'),
+    ('diff', 'binary'),
+)
+
+_classifier = None
+
+def glob_regex(pattern):
+    """Translate a .gitattributes-style glob into a regular expression over repository paths."""
+    anchored = '/' in pattern.rstrip('/')
+    pattern = pattern.lstrip('/')
+    if pattern.endswith('/'):
+        # A directory matches everything below it
+        pattern += '**'
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    body = ''.join(parts)
+    return body if anchored else f"(?:.*/)?{body}"
+
+def parse_gitattributes(text):
+    """Return (compiled pattern, {attribute: set or unset}) for each line that sets one we use."""
+    names = {name for name, _ in GITATTRIBUTES_KINDS}
+    entries = []
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        states = {}
+        for attribute in fields[1:]:
+            if attribute == 'binary':
+                # The binary macro is -diff -merge -text
+                states['diff'] = False
+            elif attribute[:1] in ('-', '!') and attribute[1:] in names:
+                # -attr unsets an attribute, !attr makes it unspecified again
+                states[attribute[1:]] = False if attribute[0] == '-' else None
+            elif '=' in attribute:
+                name, _, value = attribute.partition('=')
+                if name in names:
+                    states[name] = value.lower() not in ('false', '0')
+            elif attribute in names:
+                states[attribute] = True
+        if states:
+            entries.append((re.compile(f"{glob_regex(fields[0])}$"), states))
+    return entries
+
+class PathClassifier:
+    """Decides from its path alone whether a changed file is worth analyzing."""
+
+    def __init__(self, skip_paths=None, ignore_patterns=(), gitattributes=()):
+        self.gitattributes = list(gitattributes)
+        # One alternation with a group per kind, so each path is matched once
+        groups = []
+        for kind, patterns in [*(skip_paths or {}).items(), ('ignored', list(ignore_patterns))]:
+            if patterns:
+                groups.append(f"(?P<{kind}>{'|'.join(glob_regex(pattern) for pattern in patterns)})")
+        self._matcher = re.compile(f"(?:{'|'.join(groups)})$") if groups else None
+
+    def classify(self, filename):
+        """Return the kind of skipped file a path is, or None if it should be analyzed."""
+        states = {}
+        for pattern, attributes in self.gitattributes:
+            if pattern.match(filename):
+                # Later lines override earlier ones, attribute by attribute
+                states.update(attributes)
+        for attribute, kind in GITATTRIBUTES_KINDS:
+            state = states.get(attribute)
+            # diff is set on almost everything; only turning it off marks a path
+            if (state is False) if attribute == 'diff' else state:
+                return kind
+        if states.get('linguist-generated') is False or states.get('linguist-vendored') is False:
+            # Explicitly marked as hand-written source, whatever the skip lists say
+            return None
+
+        if self._matcher is not None:
+            match = self._matcher.match(filename)
+            if match:
+                return match.lastgroup
+        return None
+
+    def skip_reason(self, file):
+        """Return why a changed file is skipped, or None; reads its counts but never its patch."""
+        kind = self.classify(file.filename)
+        if kind is None and not (file.additions or file.deletions):
+            if file.status == 'changed':
+                kind = 'mode'
+            elif file.status == 'modified':
+                # Git and the API report no changed lines for binary files
+                kind = 'binary'
+        return kind
+
+def read_gitattributes(workspace):
+    """Return the entries of the checkout's root .gitattributes, or [] if there is none."""
+    path = Path(workspace) / '.gitattributes'
+    try:
+        return parse_gitattributes(path.read_text(encoding='utf-8', errors='replace'))
+    except OSError:
+        return []
+
+def get_path_classifier():
+    """Return the path classifier for this run, building it on first use."""
+    global _classifier
+    if _classifier is None:
+        skip_paths = get_rule_engine().skip_paths
+        unknown = [kind for kind in skip_paths if kind not in SKIPPED_KINDS]
+        if unknown:
+            logger.error(f"Unknown skip_paths kinds in the rule table: {', '.join(unknown)} "
+                         f"(available: {', '.join(SKIPPED_KINDS)})")
+            sys.exit(1)
+
+        ignore = os.environ.get('RELEASE_NOTES_IGNORE', '')
+        _classifier = PathClassifier(
+            skip_paths,
+            [pattern.strip() for pattern in ignore.split(',') if pattern.strip()],
+            read_gitattributes(os.environ.get('GITHUB_WORKSPACE', '.'))
+        )
+    return _classifier
+
+def skip_reason(file):
+    """Return why the analysis skips a changed file, or None if it is analyzed."""
+    return get_path_classifier().skip_reason(file)
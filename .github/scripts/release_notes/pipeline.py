@@ -0,0 +1,142 @@
+"""End-to-end release notes generation: analyze a range, then render it."""
+import os
+import sys
+import logging
+
+from .analysis import analyze_change_stream, get_analysis_workers
+from .cache import get_analysis_cache, get_summary_cache
+from .instrumentation import profiled, span, traced_iter
+from .notes import compose_release_notes, render_release_notes, update_release_notes
+from .sources import get_change_source, get_range_commit_info, resolve_release_range
+from .store import ReleaseNotesStore
+from .summarize import summarize_release
+from .versioning import CURRENT_VERSION, increment_version, version_from_ref
+
+logger = logging.getLogger(__name__)
+
+def previous_version(source, base_sha, head_sha, store=None):
+    """Return the version a release range starts from.
+
+    That is the version the base names when it is a version tag, else the
+    version of the newest release in the notes store, else the version of the
+    closest earlier tag, and CURRENT_VERSION when there is none of these.
+    """
+    version = version_from_ref(base_sha)
+    if version:
+        return version
+
+    last = (store or ReleaseNotesStore()).last_entry()
+    if last and last.get('version'):
+        logger.info(f"Base is not a version tag, continuing from the last stored release {last['version']}")
+        return last['version']
+
+    tag = source.find_last_tag(head_sha)
+    version = version_from_ref(tag) if tag else None
+    if version:
+        logger.info(f"Base is not a version tag, continuing from the last tag {tag}")
+        return version
+    return CURRENT_VERSION
+
+def analyze_release(head_sha=None, base_ref=None, source_mode=None, profile_path=None, source=None, executor=None,
+                    store=None):
+    """Analyze a release range and return a JSON-serializable analysis document.
+
+    A source passed in is used instead of the one source_mode picks, and an
+    executor is used as the analysis process pool; both are left open. The
+    notes store, the default one unless given, supplies the version to
+    continue from when the base is not a version tag.
+    """
+    # Get the head of the release range, the pushed commit by default
+    head_sha = head_sha or os.environ.get('RELEASE_NOTES_HEAD') or os.environ.get('GITHUB_SHA')
+    if not head_sha:
+        logger.error("GITHUB_SHA environment variable is not set")
+        sys.exit(1)
+
+    owns_source = source is None
+    if owns_source:
+        source = get_change_source(head_sha, source_mode)
+    try:
+        with span('resolve_release_range', source=source.name):
+            base_sha = resolve_release_range(source, head_sha, base_ref)
+        logger.info(f"Current SHA: {head_sha}, Base SHA: {base_sha}")
+        current_version = previous_version(source, base_sha, head_sha, store)
+
+        # Get changes; the streams are fetched as they are consumed, so fetching is timed per item
+        with span('get_changes', source=source.name):
+            changes = source.get_changes(base_sha, head_sha)
+        changes['files'] = traced_iter('fetch_files', changes['files'])
+        changes['commits'] = traced_iter('fetch_commits', changes['commits'])
+
+        # Get commit information for every commit in the range
+        with span('get_commit_info'):
+            commit_info = get_range_commit_info(source, changes['commits'], head_sha)
+
+        # Classify the commit messages, then analyze, categorize and size up every file in one pass over the stream
+        workers = get_analysis_workers()
+        with span('analyze', workers=workers), profiled(profile_path):
+            results = analyze_change_stream(changes, get_analysis_cache(), workers, executor,
+                                            commit_info.get('commits') or [commit_info])
+    finally:
+        if owns_source:
+            source.close()
+
+    # Have the model write highlights from the most significant excerpts, if it is configured
+    with span('summarize', excerpts=len(results['excerpts'])):
+        highlights = summarize_release(results['excerpts'], get_summary_cache())
+
+    # Determine version increment
+    major_increment, minor_increment, patch_increment = results['version_increment']
+    new_version = increment_version(current_version, major_increment, minor_increment, patch_increment)
+    logger.info(f"Version increment: {current_version} -> {new_version}")
+
+    return {
+        'base': base_sha,
+        'head': head_sha,
+        'commit_info': commit_info,
+        'current_version': current_version,
+        'version': new_version,
+        'version_increment': list(results['version_increment']),
+        'analysis_summary': results['analysis_summary'],
+        'highlights': highlights,
+        'categories': results['categories'],
+        'files': results['files']
+    }
+
+def render_release(analysis):
+    """Render the release notes for an analysis document."""
+    return render_release_notes(analysis['commit_info'], analysis['categories'], analysis['version'],
+                                analysis.get('highlights'))
+
+def release_metadata(analysis):
+    """Return the fields recorded alongside a release in the notes store index."""
+    commit_info = analysis['commit_info']
+    return {
+        'version': analysis['version'],
+        'date': commit_info['date'],
+        'time': commit_info['time'],
+        'author': commit_info['author'],
+        'base': analysis['base'],
+        'head': analysis['head']
+    }
+
+def release_record(analysis):
+    """Return the structured data stored next to a release's rendered notes."""
+    record = release_metadata(analysis)
+    record['sections'] = analysis['categories']
+    record['highlights'] = analysis.get('highlights', [])
+    record['files'] = analysis.get('files', [])
+    record['commits'] = analysis['commit_info'].get('commits', [])
+    return record
+
+def generate_release_notes(head_sha=None, base_ref=None, source_mode=None, compose=False, profile_path=None,
+                           source=None, store=None, executor=None):
+    """Analyze a release range and append its notes to the store, optionally recomposing release_note.txt.
+
+    Appending costs the same however long the history is; composing reads
+    every stored release, so it is left to a separate step unless asked for.
+    """
+    analysis = analyze_release(head_sha, base_ref, source_mode, profile_path, source, executor, store)
+    update_release_notes(render_release(analysis), release_metadata(analysis), release_record(analysis), store)
+    if compose:
+        compose_release_notes(store=store)
+    return analysis
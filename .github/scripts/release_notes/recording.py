@@ -0,0 +1,149 @@
+"""Recording and replay of the GitHub API traffic of a run.
+
+With RELEASE_NOTES_RECORD set to an archive path, every response the
+asyncio GitHub client receives (commits, compare pages, per-commit file
+pages, tags) is kept and written to that archive when the client closes.
+With RELEASE_NOTES_REPLAY set instead, the client answers every request from
+the archive and never opens a connection; a request that was not recorded
+fails the run. Either one makes the run read changes through that client
+whatever RELEASE_NOTES_SOURCE says, and replay needs no GITHUB_TOKEN.
+
+The archive is gzip-compressed JSON lines: a header line, then one line per
+distinct request with its status, the headers the client reads and the body.
+Responses the client retries (429, 5xx, rate-limited 403s) are left out, so
+a replay sees only the answers that counted. An archive names its release
+range through its compare requests, so `benchmark --fixture <archive>` can
+use it as a fixture of real changes.
+"""
+import os
+import json
+import time
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FORMAT = 'release-notes-github-recording'
+RECORDING_VERSION = 1
+
+# Response headers a replayed response needs; the body is stored decoded, so no encoding headers
+RECORDED_HEADERS = ('content-type', 'etag', 'last-modified', 'link', 'retry-after',
+                    'x-ratelimit-limit', 'x-ratelimit-remaining', 'x-ratelimit-reset', 'x-ratelimit-used')
+
+# Responses the client retries instead of using
+RETRIED_STATUSES = (429, 500, 502, 503, 504)
+
+class ReplayMiss(RuntimeError):
+    """Raised for a request the archive has no response to."""
+
+def request_key(request):
+    """Return the key a request is recorded under: its method, path and query string."""
+    return f"{request.method} {request.url.raw_path.decode('ascii')}"
+
+def load_recording(path):
+    """Return (header, {request key: entry}) for an archive, later duplicates replacing earlier ones."""
+    # Only recording and replaying runs need gzip, so importing the package stays cheap
+    import gzip
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != RECORDING_FORMAT or header.get('version') != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_VERSION} GitHub recording")
+        entries = {}
+        for line in f:
+            entry = json.loads(line)
+            entries[entry['request']] = entry
+    return header, entries
+
+def recorded_range(path):
+    """Return (repository, base, head) of the release range an archive's compare requests cover."""
+    _, entries = load_recording(path)
+    for key in entries:
+        # The range itself is read 100 commits a page; tag searches compare a single commit
+        _, _, request_path = key.partition(' ')
+        request_path, _, query = request_path.partition('?')
+        parts = request_path.split('/')
+        if 'compare' in parts and 'page=1' in query.split('&') and 'per_page=1' not in query.split('&'):
+            index = parts.index('compare')
+            base, _, head = parts[index + 1].partition('...')
+            return '/'.join(parts[index - 2:index]), base, head
+    raise ValueError(f"{path} has no recorded comparison")
+
+class RecordingTransport:
+    """httpx transport that passes requests on and keeps every final response for the archive."""
+
+    def __init__(self, path, transport):
+        self.path = Path(path)
+        self.transport = transport
+        self.entries = {}
+
+    async def handle_async_request(self, request):
+        response = await self.transport.handle_async_request(request)
+        # Read the body here so it can be stored; the client then reads it from memory
+        body = await response.aread()
+        retried = response.status_code in RETRIED_STATUSES or (
+            response.status_code == 403 and response.headers.get('x-ratelimit-remaining') == '0'
+        )
+        if not retried:
+            self.entries[request_key(request)] = {
+                'request': request_key(request),
+                'status': response.status_code,
+                'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+                'body': body.decode('utf-8', errors='replace')
+            }
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+        self.save()
+
+    def save(self):
+        import gzip
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = {'format': RECORDING_FORMAT, 'version': RECORDING_VERSION, 'recorded': int(time.time())}
+        with gzip.open(self.path, 'wt', encoding='utf-8', compresslevel=9) as f:
+            f.write(json.dumps(header) + "\n")
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        logger.info(f"Recorded {len(self.entries)} GitHub responses to {self.path} "
+                    f"({self.path.stat().st_size} bytes)")
+
+class ReplayTransport:
+    """httpx transport that answers from an archive without touching the network."""
+
+    def __init__(self, path):
+        self.path = path
+        _, self.entries = load_recording(path)
+
+    async def handle_async_request(self, request):
+        import httpx
+
+        entry = self.entries.get(request_key(request))
+        if entry is None:
+            raise ReplayMiss(f"{self.path} has no response for {request_key(request)}")
+        return httpx.Response(entry['status'], headers=entry['headers'], content=entry['body'].encode('utf-8'),
+                              request=request)
+
+    async def aclose(self):
+        pass
+
+def recording_mode():
+    """Return ('record' or 'replay', archive path) when the run records or replays, else None."""
+    if os.environ.get('RELEASE_NOTES_REPLAY'):
+        return 'replay', os.environ['RELEASE_NOTES_REPLAY']
+    if os.environ.get('RELEASE_NOTES_RECORD'):
+        return 'record', os.environ['RELEASE_NOTES_RECORD']
+    return None
+
+def wrap_transport(transport):
+    """Return the transport the GitHub client should use: recording, replaying or the given one."""
+    mode = recording_mode()
+    if mode is None:
+        return transport
+    kind, path = mode
+    if kind == 'replay':
+        logger.info(f"Replaying GitHub responses from {path}")
+        return ReplayTransport(path)
+    logger.info(f"Recording GitHub responses to {path}")
+    return RecordingTransport(path, transport)
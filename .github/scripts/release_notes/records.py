@@ -0,0 +1,74 @@
+"""Compact per-file analysis records.
+
+Every changed file of a release gets one record: its summary line, line
+counts, version bump, release note entries and patch excerpt. Records are
+what the analysis keeps of a file once its patch is parsed and analyzed, so
+they refer to no patch text; they are slotted, store the change status as a
+small enum and the note entries as (section index, message) pairs, and are
+what the analysis cache stores and worker processes send back.
+"""
+from enum import IntEnum
+
+class FileStatus(IntEnum):
+    """The change status of a file, as GitHub and git report it."""
+    ADDED = 1
+    MODIFIED = 2
+    REMOVED = 3
+    RENAMED = 4
+    COPIED = 5
+    CHANGED = 6
+    UNCHANGED = 7
+
+    @classmethod
+    def parse(cls, status):
+        return cls[status.upper()]
+
+    def __str__(self):
+        return self.name.lower()
+
+class FileRecord:
+    """What the analysis keeps of one changed file."""
+    __slots__ = ('filename', 'previous_filename', 'status', 'changes', 'additions', 'deletions',
+                 'bump', 'notes', 'excerpt')
+
+    def __init__(self, filename, status, changes, additions=0, deletions=0, previous_filename=None):
+        self.filename = filename
+        self.previous_filename = previous_filename
+        self.status = status
+        self.changes = changes
+        self.additions = additions
+        self.deletions = deletions
+        # 'major', 'minor' or None
+        self.bump = None
+        # None if the file contributes no note entries, else (section index, message) pairs
+        self.notes = None
+        # {'score', 'tokens', 'text'} of the file's most significant hunks, or None
+        self.excerpt = None
+
+    @classmethod
+    def from_analysis(cls, analysis):
+        """Build a record from the summary dict analyze_file_changes returns."""
+        return cls(analysis['filename'], FileStatus.parse(analysis['status']), analysis['changes'],
+                   analysis['additions'], analysis['deletions'], analysis.get('previous_filename'))
+
+    def to_json(self):
+        return {
+            'filename': self.filename,
+            'previous_filename': self.previous_filename,
+            'status': int(self.status),
+            'changes': self.changes,
+            'additions': self.additions,
+            'deletions': self.deletions,
+            'bump': self.bump,
+            'notes': self.notes,
+            'excerpt': self.excerpt
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        record = cls(data['filename'], FileStatus(data['status']), data['changes'], data['additions'],
+                     data['deletions'], data['previous_filename'])
+        record.bump = data['bump']
+        record.notes = None if data['notes'] is None else tuple(tuple(entry) for entry in data['notes'])
+        record.excerpt = data['excerpt']
+        return record
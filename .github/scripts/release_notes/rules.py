@@ -0,0 +1,365 @@
+"""Declarative classification rules compiled into a single-scan keyword matcher.
+
+The rule table (rules.json next to this module, or the file named by
+RELEASE_NOTES_RULES) lists, per analysis stage, the keywords a patch must
+contain, the files a rule applies to and the message it produces. Each file
+set's globs are compiled into one regular expression, and the rules that
+apply to a file are worked out once per combination of matching file sets
+and status. A rule's keywords are then looked up lazily, each one searched
+for at most once per patch, so a rule whose first keyword is missing costs
+one substring search. When the rules that apply to a file name more
+keywords than SUBSTRING_SEARCH_LIMIT, the patch is instead scanned once
+with a trie-shaped alternation of all of them, and only the rules whose
+first keywords turned up are looked at, so the cost stays about the same
+however many rules there are.
+
+Rules of the bump stage carry the version bump a file calls for instead of
+a message. Rules of the metadata stage name no keywords: they match a
+file's path, status and line counts, and the first one that matches
+settles the file's summary and version bump without its patch being read.
+The commit_types table maps Conventional Commit types to a release note
+section and bump.
+"""
+import os
+import re
+import sys
+import json
+import logging
+from fnmatch import translate
+from pathlib import Path
+
+from .patches import (
+    BUG_DESCRIPTION_RE,
+    BUTTON_CLASS_RE,
+    ENDPOINT_RE,
+    INPUT_TYPE_RE,
+    NEW_ROUTE_RE,
+    TEST_NAME_RE,
+)
+from .symbols import CLASS, COMPONENT, FUNCTION, symbol_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = Path(__file__).with_name('rules.json')
+
+# Up to this many keywords, one substring search each is cheaper than a regex pass over the patch
+SUBSTRING_SEARCH_LIMIT = 64
+
+# (filename, status) pairs whose applicable rules are remembered before the memo is cleared
+APPLICABLE_CACHE_SIZE = 1024
+
+# Input types that are not form fields a user fills in
+IGNORED_INPUT_TYPES = ('hidden', 'submit', 'button')
+
+# Code extractors a rule can name; each returns the strings its message lists
+EXTRACTORS = {
+    'input_types': lambda parsed, filename: [
+        t for t in INPUT_TYPE_RE.findall(parsed.text) if t not in IGNORED_INPUT_TYPES
+    ],
+    'button_classes': lambda parsed, filename: BUTTON_CLASS_RE.findall(parsed.text),
+    'new_routes': lambda parsed, filename: [
+        f"{method.upper()} {path}" for method, path in parsed.find_added(NEW_ROUTE_RE)
+    ],
+    'endpoints': lambda parsed, filename: ENDPOINT_RE.findall(parsed.text),
+    'bug_descriptions': lambda parsed, filename: BUG_DESCRIPTION_RE.findall(parsed.text),
+    'test_names': lambda parsed, filename: TEST_NAME_RE.findall(parsed.text),
+}
+
+# Symbol extractors, e.g. added_functions or removed_components
+for change in ('added', 'changed', 'removed'):
+    for plural, kind in (('functions', FUNCTION), ('classes', CLASS), ('components', COMPONENT)):
+        EXTRACTORS[f"{change}_{plural}"] = (
+            lambda parsed, filename, change=change, kind=kind: symbol_changes(parsed, filename).names(change, kind)
+        )
+
+_engine = None
+
+def trie_pattern(words):
+    """Build a regular expression matching any of words, factored by common prefixes."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Optional tail: the longest keyword at a position is preferred, shorter ones come from the closure
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+class Rule:
+    """One row of the rule table."""
+    __slots__ = ('stage', 'section', 'group', 'files', 'statuses', 'when', 'extract', 'message', 'otherwise',
+                 'bump', 'max_additions', 'max_deletions')
+
+    def __init__(self, spec, file_sets):
+        self.stage = spec['stage']
+        self.section = spec.get('section')
+        self.group = spec.get('group')
+        # (compiled globs, whether the file name is lowercased before matching), or None for any file
+        self.files = file_sets[spec['files']] if spec.get('files') else None
+        self.statuses = tuple(spec['statuses']) if spec.get('statuses') else None
+        # All of the keyword lists must match, each by any one of its keywords
+        self.when = [tuple(any_of) for any_of in spec.get('when', [])]
+        self.extract = EXTRACTORS[spec['extract']] if spec.get('extract') else None
+        # Bump rules have no message: what they say is their bump
+        self.message = spec.get('message')
+        self.otherwise = spec.get('otherwise')
+        # The bump a matching file calls for ('major' or 'minor'), for metadata and bump rules
+        self.bump = spec.get('bump')
+        # Metadata rules only: the line counts a settled file may not exceed
+        self.max_additions = spec.get('max_additions')
+        self.max_deletions = spec.get('max_deletions')
+
+    def applies_to(self, filename, status):
+        if self.statuses is not None and status not in self.statuses:
+            return False
+        if self.files is not None and filename is not None:
+            matcher, ignore_case = self.files
+            return matcher.match(filename.lower() if ignore_case else filename) is not None
+        return True
+
+    def within(self, additions, deletions):
+        """Tell whether line counts, None if not known yet, are within the rule's limits."""
+        for limit, count in ((self.max_additions, additions), (self.max_deletions, deletions)):
+            if limit is not None and (count is None or count > limit):
+                return False
+        return True
+
+def glob_matcher(patterns):
+    """Compile fnmatch-style globs into one regular expression matching a whole file name."""
+    return re.compile('|'.join(translate(pattern) for pattern in patterns) or '(?!)')
+
+class ApplicableRules:
+    """The rules of each stage that apply to one (filename, status), and how to find their keywords."""
+    __slots__ = ('stages', 'keywords', 'matcher', 'index')
+
+    def __init__(self, stages, keywords, matcher, index):
+        self.stages = stages
+        # Lowered keywords of all these rules, and the alternation that finds them in one pass, if worth it
+        self.keywords = keywords
+        self.matcher = matcher
+        # Per stage, when scanning: positions of the rules without keywords, and of those each first keyword opens
+        self.index = index
+
+class RuleEngine:
+    """The compiled rule table: applicable rules memoized per file, keywords searched for lazily."""
+
+    def __init__(self, config, fingerprint=''):
+        self.fingerprint = fingerprint
+        self.sections = [(section['key'], section['title']) for section in config['sections']]
+        # Globs of files that are never analyzed, by kind; applied by paths.py before any patch is read
+        self.skip_paths = {kind: list(patterns) for kind, patterns in config.get('skip_paths', {}).items()}
+        # Conventional Commit type -> {'section', 'bump'}, both optional
+        self.commit_types = {name: dict(spec) for name, spec in config.get('commit_types', {}).items()}
+
+        file_sets = {}
+        for name, spec in config.get('file_sets', {}).items():
+            if isinstance(spec, dict):
+                ignore_case = spec.get('ignore_case', False)
+                patterns = [p.lower() if ignore_case else p for p in spec['patterns']]
+            else:
+                ignore_case, patterns = False, spec
+            file_sets[name] = (glob_matcher(patterns), ignore_case)
+
+        # Each distinct set once, so which of them a file name matches is worked out once per file
+        self._file_sets = list(dict.fromkeys(file_sets.values()))
+
+        self.rules = {}
+        for spec in config['rules']:
+            rule = Rule(spec, file_sets)
+            self.rules.setdefault(rule.stage, []).append(rule)
+
+        case_sensitive = set(config.get('case_sensitive_keywords', []))
+        keywords = {
+            keyword for rules in self.rules.values() for rule in rules for any_of in rule.when for keyword in any_of
+        }
+
+        # Keywords are searched for in the lowercased patch; case-sensitive ones are confirmed in the original
+        self._keywords = {keyword: (keyword.lower(), keyword in case_sensitive) for keyword in keywords}
+        self._keywords_by_lower = {}
+        for keyword, (lower, _) in self._keywords.items():
+            self._keywords_by_lower.setdefault(lower, []).append(keyword)
+        lowered = sorted(self._keywords_by_lower)
+        # A hit on a keyword is also a hit on every keyword it contains
+        self._closure = {word: [other for other in lowered if other in word] for word in lowered}
+        self._applicable = {}
+        # (file sets matched, status) -> ApplicableRules, shared by every file with the same profile
+        self._profiles = {}
+        self._matchers = {}
+
+    def applicable(self, filename, status):
+        """Return the ApplicableRules of a file, working them out once per (filename, status)."""
+        key = (filename, status)
+        applicable = self._applicable.get(key)
+        if applicable is None:
+            if filename is None:
+                matched = None
+            else:
+                matched = tuple(files for files in self._file_sets
+                                if files[0].match(filename.lower() if files[1] else filename) is not None)
+            applicable = self._profiles.get((matched, status))
+            if applicable is None:
+                applicable = self._profiles[(matched, status)] = self.compile_applicable(matched, status)
+            if len(self._applicable) >= APPLICABLE_CACHE_SIZE:
+                self._applicable.clear()
+            self._applicable[key] = applicable
+        return applicable
+
+    def compile_applicable(self, matched, status):
+        """Build the ApplicableRules of files matching the file sets in matched, or any file if None."""
+        stages = {
+            stage: [rule for rule in rules
+                    if (rule.statuses is None or status in rule.statuses)
+                    and (rule.files is None or matched is None or rule.files in matched)]
+            for stage, rules in self.rules.items()
+        }
+        keywords = frozenset(self._keywords[keyword][0] for rules in stages.values() for rule in rules
+                             for any_of in rule.when for keyword in any_of)
+        if len(keywords) <= SUBSTRING_SEARCH_LIMIT:
+            return ApplicableRules(stages, keywords, None, None)
+
+        matcher = self._matchers.get(keywords)
+        if matcher is None:
+            matcher = self._matchers[keywords] = re.compile(trie_pattern(sorted(keywords)))
+        index = {}
+        for stage, rules in stages.items():
+            always, opened_by = [], {}
+            for position, rule in enumerate(rules):
+                if not rule.when:
+                    always.append(position)
+                    continue
+                for keyword in rule.when[0]:
+                    opened_by.setdefault(self._keywords[keyword][0], []).append(position)
+            index[stage] = (always, opened_by)
+        return ApplicableRules(stages, keywords, matcher, index)
+
+    def scan(self, parsed, applicable):
+        """Record in one pass which of many keywords the patch contains."""
+        found = set()
+        search = applicable.matcher.search
+        text = parsed.lower
+        match = search(text)
+        while match is not None:
+            found.update(self._closure[match.group()])
+            # Resume just past the start of the match, so keywords overlapping it are found too
+            match = search(text, match.start() + 1)
+        for word in found:
+            for keyword in self._keywords_by_lower[word]:
+                # Case-sensitive ones are still to be confirmed in the original text
+                if not self._keywords[keyword][1]:
+                    parsed.hits[keyword] = True
+        parsed.absent = applicable.keywords - found
+
+    def has(self, parsed, keyword):
+        """Tell whether the patch contains a rule keyword, searching for it at most once per patch."""
+        found = parsed.hits.get(keyword)
+        if found is None:
+            lower, case_sensitive = self._keywords[keyword]
+            if lower in parsed.absent:
+                return False
+            found = lower in parsed.lower and (not case_sensitive or keyword in parsed.text)
+            parsed.hits[keyword] = found
+        return found
+
+    def settle(self, filename, status, additions=None, deletions=None):
+        """Return the first metadata rule that settles a file from its path, status and counts, or None."""
+        for rule in self.rules.get('metadata', ()):
+            if rule.applies_to(filename, status) and rule.within(additions, deletions):
+                return rule
+        return None
+
+    def fired(self, stage, parsed, filename=None, status=None, until=None):
+        """Yield (rule, message) for every rule of a stage that fires, in table order.
+
+        With until, only the rules up to the last one calling for that bump are looked at.
+        """
+        applicable = self.applicable(filename, status)
+        if parsed.hits is None:
+            parsed.hits = {}
+            if applicable.matcher is not None and parsed.lower:
+                self.scan(parsed, applicable)
+        rules = applicable.stages.get(stage, ())
+        cutoff = len(rules)
+        if until is not None:
+            cutoff = max((position + 1 for position, rule in enumerate(rules) if rule.bump == until), default=0)
+        if applicable.index is not None and parsed.absent and rules:
+            # Only the rules whose first keywords the scan did not rule out can fire
+            always, opened_by = applicable.index[stage]
+            positions = set(always)
+            for word in applicable.keywords - parsed.absent:
+                positions.update(opened_by.get(word, ()))
+            rules = [rules[position] for position in sorted(positions) if position < cutoff]
+        else:
+            rules = rules[:cutoff]
+        has = self.has
+        settled_groups = set()
+        for rule in rules:
+            if rule.group is not None and rule.group in settled_groups:
+                continue
+            if not all(any(has(parsed, keyword) for keyword in any_of) for any_of in rule.when):
+                continue
+
+            if rule.extract is not None:
+                matches = rule.extract(parsed, filename)
+                if matches:
+                    message = rule.message
+                elif rule.otherwise is not None:
+                    message = rule.otherwise
+                else:
+                    continue
+            else:
+                matches = []
+                message = rule.message
+
+            if message is not None:
+                message = message.format(
+                    matches=', '.join(matches),
+                    filename=filename,
+                    basename=os.path.basename(filename) if filename else filename,
+                )
+            yield rule, message
+            if rule.group is not None:
+                settled_groups.add(rule.group)
+
+    def evaluate(self, stage, parsed, filename=None, status=None):
+        """Return (section, message) for every rule of a stage that fires, in table order."""
+        return [(rule.section, message) for rule, message in self.fired(stage, parsed, filename, status)]
+
+    def bump(self, parsed, filename=None, status=None, until=None):
+        """Return the bump of the first bump-stage rule that fires, or None.
+
+        With until, only the rules up to the last one calling for that bump
+        are looked at, e.g. to check for a major change alone.
+        """
+        for rule, _ in self.fired('bump', parsed, filename, status, until):
+            return rule.bump
+        return None
+
+def load_rule_engine(path=None):
+    """Compile the rule table at path, exiting the run if it cannot be read."""
+    # Only needed once the table is compiled, so importing the package stays cheap
+    import hashlib
+
+    path = Path(path or os.environ.get('RELEASE_NOTES_RULES') or DEFAULT_RULES_PATH)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        engine = RuleEngine(json.loads(content), hashlib.sha256(content).hexdigest()[:16])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.error(f"Failed to load classification rules from {path}: {str(e)}")
+        sys.exit(1)
+    return engine
+
+def get_rule_engine():
+    """Return the compiled rule table, compiling it on first use in this process."""
+    global _engine
+    if _engine is None:
+        _engine = load_rule_engine()
+    return _engine
@@ -0,0 +1,365 @@
+"""Webhook server mode: generate release notes for pushes as they arrive.
+
+Instead of a fresh runner per push, one long-running process accepts GitHub
+push webhooks on POST /webhook and keeps its change source, HTTP connection
+pool, compiled rules and path classifier warm between pushes. Pushes to the
+release branches (RELEASE_NOTES_BRANCHES, default main and master) are
+queued per branch and held for RELEASE_NOTES_COALESCE_SECONDS; pushes that
+arrive for a branch before its generation starts extend the queued range, so
+a burst of pushes becomes one generation from the first push's `before` to
+the last push's `after`. A single worker runs the generations one at a
+time, so they never race on the notes store, and runs
+RELEASE_NOTES_PUBLISH_COMMAND, e.g. a git commit, pull --rebase and push,
+after each one. Pushes whose head commit carries "[skip ci]", such as that
+commit, are ignored. With the git source the working directory's checkout
+fetches each pushed branch before reading it.
+
+Deliveries are checked against RELEASE_NOTES_WEBHOOK_SECRET when it is set.
+GET /status reports the queue and the latest generations, and
+`python -m release_notes post-webhook` posts recorded payloads to a server
+so it can be exercised locally.
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .instrumentation import scoped_tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_PORT = 8080
+DEFAULT_COALESCE_SECONDS = 2.0
+DEFAULT_RELEASE_BRANCHES = 'main,master'
+
+# Marks the notes commit itself, which must not start another generation
+SKIP_CI_MARKER = '[skip ci]'
+
+# Generations kept for GET /status
+RECENT_GENERATIONS = 20
+
+def webhook_signature(secret, body):
+    """Return the X-Hub-Signature-256 value GitHub sends for a payload."""
+    return f"sha256={hmac.new(secret.encode(), body, 'sha256').hexdigest()}"
+
+def push_range(payload, branches):
+    """Return (branch, before, after) for a push that needs notes, or (None, reason it is ignored).
+
+    before is None for a push that created the branch, which GitHub sends
+    with an all-zero before; its generation falls back to the configured base.
+    """
+    ref = payload.get('ref', '')
+    if not ref.startswith('refs/heads/'):
+        return None, f"{ref or 'no ref'} is not a branch"
+    branch = ref[len('refs/heads/'):]
+    if branch not in branches:
+        return None, f"{branch} is not a release branch"
+    if payload.get('deleted') or not payload.get('after', '').strip('0'):
+        return None, f"{branch} was deleted"
+    head_commit = payload.get('head_commit') or {}
+    if SKIP_CI_MARKER in head_commit.get('message', ''):
+        return None, f"head commit of {branch} is marked {SKIP_CI_MARKER}"
+    before = payload.get('before') or ''
+    return (branch, before if before.strip('0') else None, payload['after']), None
+
+class PushCoalescer:
+    """Queued release ranges per branch; a push for a branch that is already queued extends its range."""
+
+    def __init__(self, delay=DEFAULT_COALESCE_SECONDS):
+        self.delay = delay
+        self.pending = {}
+        # The range being generated until done(), so a taken range never drops out of the status
+        self.running = None
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    def add(self, branch, before, after):
+        """Queue a push and return the number of pushes its branch's generation now covers."""
+        now = time.monotonic()
+        with self.condition:
+            queued = self.pending.get(branch)
+            if queued is None:
+                queued = self.pending[branch] = {
+                    'branch': branch, 'base': before, 'head': after, 'pushes': 0, 'first_push': time.time()
+                }
+            queued['head'] = after
+            queued['pushes'] += 1
+            # Wait for the burst to end before starting
+            queued['due'] = now + self.delay
+            self.condition.notify_all()
+            return queued['pushes']
+
+    def take(self):
+        """Block until a queued range is due and return it, or return None once stopped."""
+        with self.condition:
+            while not self.stopped:
+                now = time.monotonic()
+                due = [queued for queued in self.pending.values() if queued['due'] <= now]
+                if due:
+                    queued = min(due, key=lambda entry: entry['due'])
+                    self.running = self.pending.pop(queued['branch'])
+                    return self.running
+                wait = min((queued['due'] for queued in self.pending.values()), default=now + 60) - now
+                self.condition.wait(wait)
+            return None
+
+    def done(self):
+        with self.condition:
+            self.running = None
+
+    def snapshot(self):
+        """Return (pending ranges, running range) as of one moment."""
+        with self.condition:
+            return [{key: value for key, value in queued.items() if key != 'due'}
+                    for queued in self.pending.values()], self.running
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+class ReleaseNotesService:
+    """Runs queued generations one at a time over a change source that stays open between them."""
+
+    def __init__(self, repository=None, source_mode=None, coalesce_seconds=None, publish_command=None):
+        self.repository = repository or os.environ.get('GITHUB_REPOSITORY')
+        self.source_mode = (source_mode or os.environ.get('RELEASE_NOTES_SOURCE', 'github-async')).lower()
+        if coalesce_seconds is None:
+            coalesce_seconds = float(os.environ.get('RELEASE_NOTES_COALESCE_SECONDS', DEFAULT_COALESCE_SECONDS))
+        self.publish_command = publish_command or os.environ.get('RELEASE_NOTES_PUBLISH_COMMAND')
+        self.branches = {branch.strip() for branch in
+                         os.environ.get('RELEASE_NOTES_BRANCHES', DEFAULT_RELEASE_BRANCHES).split(',') if branch.strip()}
+        self.coalescer = PushCoalescer(coalesce_seconds)
+        self.generations = []
+        self.completed = 0
+        self.source = None
+        self.shared_loop = None
+        self._thread = None
+
+    def warm_up(self):
+        """Compile the rules and path filters and open the change source before the first push."""
+        from .paths import get_path_classifier
+        from .rules import get_rule_engine
+
+        get_rule_engine()
+        get_path_classifier()
+        self.source = self._open_source()
+        logger.info(f"Release notes service ready: {self.source.name} source, branches {', '.join(sorted(self.branches))}, "
+                    f"{self.coalescer.delay:g}s coalescing window")
+
+    def _open_source(self):
+        if self.source_mode == 'git':
+            from .local_git import LocalGitChangeSource
+            return LocalGitChangeSource(os.environ.get('GITHUB_WORKSPACE', '.'))
+        if self.source_mode == 'github':
+            from .github_source import GitHubChangeSource
+            return GitHubChangeSource()
+
+        try:
+            from .github_async import DEFAULT_HTTP_CONCURRENCY, AsyncGitHubChangeSource, AsyncGitHubClient, SharedEventLoop
+            import httpx  # noqa: F401
+        except ImportError:
+            logger.info("httpx is not installed, using the synchronous GitHub client")
+            from .github_source import GitHubChangeSource
+            return GitHubChangeSource()
+
+        if not self.repository:
+            logger.error("GITHUB_REPOSITORY environment variable is not set")
+            sys.exit(1)
+        from .clients import get_github_token
+
+        concurrency = int(os.environ.get('RELEASE_NOTES_HTTP_CONCURRENCY', DEFAULT_HTTP_CONCURRENCY))
+        # The client's connection pool lives on this loop for as long as the server runs
+        self.shared_loop = SharedEventLoop()
+        client = AsyncGitHubClient(get_github_token(), concurrency=concurrency)
+        return AsyncGitHubChangeSource(self.repository, client, self.shared_loop)
+
+    def accept(self, payload):
+        """Queue a push payload; return (accepted, message)."""
+        repository = (payload.get('repository') or {}).get('full_name')
+        if self.repository and repository and repository != self.repository:
+            return False, f"{repository} is not {self.repository}"
+        push, reason = push_range(payload, self.branches)
+        if push is None:
+            return False, reason
+        branch, before, after = push
+        pushes = self.coalescer.add(branch, before, after)
+        return True, f"queued {after[:12]} on {branch} ({pushes} pushes in this generation)"
+
+    def generate(self, queued):
+        """Generate and publish the notes for one coalesced range and return how it went."""
+        from .pipeline import generate_release_notes
+
+        result = {key: queued[key] for key in ('branch', 'base', 'head', 'pushes')}
+        started = time.perf_counter()
+        with scoped_tracer('generation', attach=False, branch=queued['branch']) as tracer:
+            try:
+                if self.source.name == 'git':
+                    # The pushed commits only reach the checkout once it is fetched
+                    self.source.fetch(queued['branch'])
+                analysis = generate_release_notes(queued['head'], queued['base'], source=self.source)
+                result.update(status='ok', version=analysis['version'])
+                if self.publish_command:
+                    result['published'] = self.publish()
+            except SystemExit:
+                # The stage that failed has logged why before exiting
+                result.update(status='failed', error="stopped by an error logged above")
+            except Exception as e:
+                result.update(status='failed', error=str(e))
+
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        result['seconds_since_push'] = round(time.time() - queued['first_push'], 3)
+        result['http_requests'] = tracer.root.counters['http_requests']
+        if result['status'] == 'ok':
+            logger.info(f"Release notes {result['version']} for {queued['pushes']} pushes to {queued['branch']} "
+                        f"took {result['seconds']:.2f}s, {result['seconds_since_push']:.2f}s after the first push")
+        else:
+            logger.error(f"Release notes for {queued['branch']} at {queued['head']} failed: {result['error']}")
+        return result
+
+    def publish(self):
+        """Run the publish command in the working directory, returning whether it succeeded."""
+        import subprocess
+
+        completed = subprocess.run(self.publish_command, shell=True, capture_output=True, text=True)
+        if completed.returncode != 0:
+            logger.error(f"Publish command failed with status {completed.returncode}: {completed.stderr.strip()}")
+        return completed.returncode == 0
+
+    def _work(self):
+        while True:
+            queued = self.coalescer.take()
+            if queued is None:
+                return
+            result = self.generate(queued)
+            self.completed += 1
+            self.generations = [*self.generations[-(RECENT_GENERATIONS - 1):], result]
+            self.coalescer.done()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._work, name='release-notes-worker', daemon=True)
+        self._thread.start()
+        return self
+
+    def status(self):
+        pending, running = self.coalescer.snapshot()
+        return {
+            'pending': pending,
+            'running': {key: running[key] for key in ('branch', 'base', 'head', 'pushes')} if running else None,
+            'completed': self.completed,
+            'generations': self.generations
+        }
+
+    def stop(self):
+        """Finish the generation in progress, drop the queue and close the change source."""
+        self.coalescer.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.shared_loop is not None:
+            self.shared_loop.close(self.source.client)
+            self.shared_loop = None
+        elif self.source is not None:
+            self.source.close()
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.rstrip('/') != '/webhook':
+            self.send_json(404, {'message': f"Unknown path {self.path}"})
+            return
+
+        secret = self.server.secret
+        if secret and not hmac.compare_digest(self.headers.get('X-Hub-Signature-256', ''),
+                                              webhook_signature(secret, body)):
+            self.send_json(401, {'message': "Signature does not match"})
+            return
+
+        event = self.headers.get('X-GitHub-Event', '')
+        if event == 'ping':
+            self.send_json(200, {'message': "pong"})
+            return
+        if event != 'push':
+            self.send_json(202, {'message': f"Ignored {event or 'unnamed'} event"})
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_json(400, {'message': "Payload is not JSON"})
+            return
+        if not isinstance(payload, dict):
+            self.send_json(400, {'message': "Payload is not a push event"})
+            return
+        accepted, message = self.server.service.accept(payload)
+        logger.info(f"Push delivery {self.headers.get('X-GitHub-Delivery', 'without id')}: {message}")
+        self.send_json(202, {'accepted': accepted, 'message': message})
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/status':
+            self.send_json(200, self.server.service.status())
+        else:
+            self.send_json(404, {'message': f"Unknown path {self.path}"})
+
+    def send_json(self, status, document):
+        payload = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Webhook server: {format % args}")
+
+class WebhookServer(ThreadingHTTPServer):
+    """Receives webhook deliveries and hands pushes to a ReleaseNotesService."""
+    daemon_threads = True
+
+    def __init__(self, service, port=DEFAULT_SERVER_PORT, host='127.0.0.1', secret=None):
+        super().__init__((host, port), WebhookHandler)
+        self.service = service
+        self.secret = secret if secret is not None else os.environ.get('RELEASE_NOTES_WEBHOOK_SECRET')
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def post_webhook(url, payload_bytes, event='push', secret=None):
+    """Post one recorded payload to a webhook server the way GitHub would; return (status, response)."""
+    import uuid
+    import urllib.error
+    import urllib.request
+
+    headers = {
+        'Content-Type': 'application/json',
+        'X-GitHub-Event': event,
+        'X-GitHub-Delivery': str(uuid.uuid4())
+    }
+    if secret:
+        headers['X-Hub-Signature-256'] = webhook_signature(secret, payload_bytes)
+    request = urllib.request.Request(f"{url.rstrip('/')}/webhook", data=payload_bytes, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+def wait_until_idle(url, timeout=300.0, interval=0.2):
+    """Poll a server's status until nothing is queued or running, and return the last status."""
+    import urllib.request
+
+    deadline = time.monotonic() + timeout
+    while True:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/status") as response:
+            status = json.loads(response.read())
+        if (not status['pending'] and status['running'] is None) or time.monotonic() > deadline:
+            return status
+        time.sleep(interval)
@@ -0,0 +1,176 @@
+"""Selecting a change source and resolving the release range it covers."""
+import os
+import sys
+import logging
+
+from .clients import get_github_token
+from .models import commit_info_from_commit, snapshot_file
+from .recording import recording_mode
+
+logger = logging.getLogger(__name__)
+
+# The compare endpoint lists at most this many changed files
+COMPARE_FILE_LIMIT = 300
+
+# Commits per page when paging through a comparison
+COMPARE_PAGE_SIZE = 100
+
+# How many of the newest tags the API sources consider when looking for the last release
+TAG_SEARCH_LIMIT = 30
+
+def exit_on_stream_error(iterable, description):
+    """Yield from a lazily fetched stream, exiting the run if it fails part way."""
+    try:
+        yield from iterable
+    except Exception as e:
+        logger.error(f"Failed to get {description}: {str(e)}")
+        sys.exit(1)
+
+def merge_commit_files(files):
+    """Net the files of a range read commit by commit into one file per path.
+
+    A file several commits change is listed once, where it was first changed,
+    with their line counts summed and their patches joined; a file added and
+    removed again within the range is left out, a rename carries the changes
+    made under the old path along, and a renamed file that is then removed is
+    reported removed under its original name. Nothing is yielded before every
+    commit's files have been read, which is why this is only the fallback for
+    compares too large to list their own net files.
+    """
+    # Path as of the latest commit read -> key of its merged file; keys keep the order files were first changed in
+    paths = {}
+    merged = {}
+    for number, file in enumerate(files):
+        file = snapshot_file(file)
+        key = paths.pop(file.previous_filename if file.status == 'renamed' else file.filename, None)
+        if key is None:
+            merged[number] = file
+            paths[file.filename] = number
+            continue
+
+        earlier = merged[key]
+        if earlier.status == 'added':
+            if file.status == 'removed':
+                del merged[key]
+                continue
+            file.status = 'added'
+            file.previous_filename = None
+        elif file.status == 'renamed':
+            original = earlier.previous_filename if earlier.status == 'renamed' else earlier.filename
+            if original == file.filename:
+                file.status = 'modified'
+                file.previous_filename = None
+            else:
+                file.previous_filename = original
+        elif file.status == 'added':
+            # Removed and added back again
+            file.status = 'modified'
+        elif earlier.status == 'renamed':
+            if file.status == 'removed':
+                # What is gone is the file the range started with
+                file.filename = earlier.previous_filename
+            else:
+                file.status = 'renamed'
+                file.previous_filename = earlier.previous_filename
+
+        file.additions += earlier.additions
+        file.deletions += earlier.deletions
+        file.changes += earlier.changes
+        if earlier.patch is not None:
+            file.patch = earlier.patch if file.patch is None else f"{earlier.patch}\n{file.patch}"
+        merged[key] = file
+        paths[file.filename] = key
+    yield from merged.values()
+
+def get_change_source(head_sha, mode=None):
+    """Pick the change source for this run, preferring a local checkout.
+
+    The mode (RELEASE_NOTES_SOURCE by default) may be "git", "github",
+    "github-async" or "auto". In auto mode the local checkout is used when it
+    contains head_sha, and the GitHub API is used otherwise, e.g. for shallow
+    clones. Each source module is only imported once it is chosen. Recording
+    or replaying GitHub traffic always reads through the concurrent API source.
+    """
+    mode = (mode or os.environ.get('RELEASE_NOTES_SOURCE', 'auto')).lower()
+    if recording_mode() is not None:
+        return get_async_change_source()
+    if mode == 'github':
+        from .github_source import GitHubChangeSource
+        return GitHubChangeSource()
+    if mode == 'github-async':
+        return get_async_change_source()
+
+    from .local_git import LocalGitChangeSource
+    local = LocalGitChangeSource(os.environ.get('GITHUB_WORKSPACE', '.'))
+    if mode == 'git' or local.has_commit(head_sha):
+        logger.info("Using local git checkout as change source")
+        return local
+
+    logger.info("Commit not available locally, falling back to the GitHub API")
+    return get_async_change_source()
+
+def get_async_change_source():
+    """Create the concurrent API change source, or the PyGithub one if httpx is missing."""
+    try:
+        from .github_async import DEFAULT_HTTP_CONCURRENCY, AsyncGitHubChangeSource, AsyncGitHubClient
+        import httpx  # noqa: F401
+    except ImportError:
+        if recording_mode() is not None:
+            logger.error("Recording or replaying GitHub traffic needs httpx")
+            sys.exit(1)
+        logger.info("httpx is not installed, using the synchronous GitHub client")
+        from .github_source import GitHubChangeSource
+        return GitHubChangeSource()
+
+    mode = recording_mode()
+    replaying = mode is not None and mode[0] == 'replay'
+    github_repository = os.environ.get('GITHUB_REPOSITORY')
+    if not github_repository and replaying:
+        from .recording import recorded_range
+        github_repository = recorded_range(mode[1])[0]
+    if not github_repository:
+        logger.error("GITHUB_REPOSITORY environment variable is not set")
+        sys.exit(1)
+
+    # A replay never reaches GitHub, so it needs no token
+    token = os.environ.get('GITHUB_TOKEN') if replaying else get_github_token()
+    concurrency = int(os.environ.get('RELEASE_NOTES_HTTP_CONCURRENCY', DEFAULT_HTTP_CONCURRENCY))
+    return AsyncGitHubChangeSource(github_repository, AsyncGitHubClient(token, concurrency=concurrency))
+
+def resolve_release_range(source, head_sha, base_ref=None):
+    """Work out the base ref of the release range ending at head_sha.
+
+    The base ref (RELEASE_NOTES_BASE by default) may name any commit-ish, or
+    "last-tag" to start from the closest earlier tag. Without it, or when it is
+    the all-zero SHA GitHub sends for a new branch, only the head commit itself
+    is covered.
+    """
+    base_ref = (base_ref or os.environ.get('RELEASE_NOTES_BASE', '')).strip()
+    if base_ref and base_ref.strip('0') and base_ref != 'last-tag':
+        return base_ref
+
+    if base_ref == 'last-tag':
+        tag = source.find_last_tag(head_sha)
+        if tag:
+            logger.info(f"Last release tag: {tag}")
+            return tag
+        logger.info("No earlier release tag found")
+
+    return f"{head_sha}^"  # Previous commit
+
+def get_range_commit_info(source, commits, head_sha):
+    """Collect commit info for the whole range from the batched commit stream.
+
+    The compare response and `git log` already carry author, date and message
+    for every commit, so the head commit's info is taken from that list along
+    with the rest instead of being requested on its own.
+    """
+    commit_infos = [commit_info_from_commit(commit) for commit in commits]
+    if not commit_infos:
+        return source.get_commit_info(head_sha)
+
+    # Both sources list the range oldest first, so the head commit comes last
+    commit_info = dict(commit_infos[-1])
+    commit_info['commits'] = commit_infos
+    logger.info(f"Collected info for {len(commit_infos)} commits in the release range")
+    return commit_info
@@ -0,0 +1,150 @@
+"""Append-only, segmented store of release notes.
+
+Every release is written to its own fragment file and recorded with one line
+in an append-only JSON-lines index, so adding a release costs the same no
+matter how long the history is. The combined newest-first release_note.txt is
+a derived document that nothing rewrites on append: compose() streams it from
+every fragment on demand, as a separate build step.
+Releases can also carry a JSON record of their structured data, which the
+query index in history.py is built from.
+"""
+import os
+import json
+import shutil
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Where the store lives, relative to the working directory, unless RELEASE_NOTES_STORE is set
+DEFAULT_STORE_DIR = 'release-notes'
+
+# The combined document readers see; before the store existed it was the only copy
+COMBINED_NOTES_PATH = 'release_note.txt'
+
+# Separator the combined document has always used between releases
+RELEASE_SEPARATOR = "\n\n"
+
+def atomic_write(path, content):
+    """Write a file through a temporary sibling and a rename so readers never see half of it."""
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temp_path, 'w') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class ReleaseNotesStore:
+    """Release note fragments plus an append-only index, guarded by a file lock."""
+
+    def __init__(self, directory=None, combined_path=COMBINED_NOTES_PATH):
+        self.directory = Path(directory or os.environ.get('RELEASE_NOTES_STORE', DEFAULT_STORE_DIR))
+        self.combined_path = Path(combined_path)
+        self.fragments_dir = self.directory / 'fragments'
+        self.index_path = self.directory / 'index.jsonl'
+        # History written before the store existed, kept verbatim below the fragments
+        self.legacy_path = self.directory / 'legacy.txt'
+        self.lock_path = self.directory / '.lock'
+
+    @contextmanager
+    def lock(self):
+        """Hold an exclusive lock on the store so concurrent runs cannot interleave writes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'w') as lock_file:
+            try:
+                import fcntl
+            except ImportError:
+                # No advisory locks on this platform; runs are serialized by the workflow instead
+                yield
+                return
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _initialize(self):
+        """Create the store, adopting an existing combined document as legacy history."""
+        if self.index_path.exists():
+            return
+        self.fragments_dir.mkdir(parents=True, exist_ok=True)
+        if self.combined_path.exists() and not self.legacy_path.exists():
+            logger.info(f"Importing existing {self.combined_path} as legacy release history")
+            shutil.copyfile(self.combined_path, self.legacy_path)
+        self.index_path.touch()
+
+    def last_entry(self):
+        """Return the newest index entry by reading only the tail of the index."""
+        if not self.index_path.exists():
+            return None
+        with open(self.index_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b''
+            while position > 0 and tail.count(b'\n') < 2:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+        lines = tail.strip().splitlines()
+        return json.loads(lines[-1]) if lines else None
+
+    def append(self, content, metadata=None, record=None):
+        """Add one release, with optional structured data, and return its index entry."""
+        with self.lock():
+            self._initialize()
+            last = self.last_entry()
+            sequence = (last['seq'] + 1) if last else 1
+            fragment_name = f"{sequence:06d}.txt"
+            atomic_write(self.fragments_dir / fragment_name, content)
+
+            entry = {'seq': sequence, 'fragment': f"fragments/{fragment_name}"}
+            if record is not None:
+                record_name = f"{sequence:06d}.json"
+                atomic_write(self.fragments_dir / record_name, json.dumps(record, indent=2))
+                entry['record'] = f"fragments/{record_name}"
+            entry.update(metadata or {})
+            # The fragment is already in place, so a reader never sees an entry without one
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return entry
+
+    def read_fragment(self, entry):
+        """Return the rendered notes of an index entry."""
+        with open(self.directory / entry['fragment'], 'r') as f:
+            return f.read()
+
+    def read_record(self, entry):
+        """Return the structured data of an index entry, or None if it has none."""
+        if not entry.get('record'):
+            return None
+        with open(self.directory / entry['record'], 'r') as f:
+            return json.load(f)
+
+    def entries(self):
+        """Return every index entry, oldest first."""
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def compose(self, output_path=None):
+        """Stream the combined newest-first document to output_path, atomically."""
+        output_path = Path(output_path or self.combined_path)
+        with self.lock():
+            self._initialize()
+            temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+            with open(temp_path, 'w') as out:
+                for entry in reversed(self.entries()):
+                    with open(self.directory / entry['fragment'], 'r') as fragment:
+                        shutil.copyfileobj(fragment, out)
+                    out.write(RELEASE_SEPARATOR)
+                if self.legacy_path.exists():
+                    with open(self.legacy_path, 'r') as legacy:
+                        shutil.copyfileobj(legacy, out)
+            os.replace(temp_path, output_path)
+        return output_path
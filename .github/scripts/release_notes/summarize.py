@@ -0,0 +1,335 @@
+"""Model-written release highlights from token-budgeted patch excerpts.
+
+Every changed file contributes at most one excerpt: its few most significant
+hunks, scored by a cheap pass over the changed lines that ignores blank,
+comment-only and whitespace-only changes and weighs declarations up. The
+stream keeps only the best excerpts that fit in the release's token budget,
+packs them into batches that each fit in one request, and sends the batches
+concurrently, a limited number at a time. When there is more than one batch,
+a final request condenses their bullets into one list.
+
+Responses are cached by a hash of the model and the prompt, so an unchanged
+release costs nothing to summarize again. OPENAI_BASE_URL points the client at
+any server that speaks the OpenAI API, such as the stub in openai_stub.py.
+"""
+import os
+import json
+import heapq
+import logging
+
+from .clients import new_openai_client
+from .instrumentation import get_tracer
+from .symbols import language_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUMMARY_MODEL = 'gpt-3.5-turbo'
+DEFAULT_SUMMARY_CONCURRENCY = 4
+
+# Prompt tokens of excerpts per request, and across every request of a release
+DEFAULT_BATCH_TOKENS = 3000
+DEFAULT_RELEASE_TOKENS = 24000
+
+# Completion tokens allowed per request, and bullets asked for
+MAX_COMPLETION_TOKENS = 400
+MAX_HIGHLIGHTS = 6
+
+# Most significant hunks kept per file, lines kept per hunk and characters kept per line
+EXCERPT_HUNKS = 3
+EXCERPT_HUNK_LINES = 30
+EXCERPT_LINE_CHARS = 200
+
+# A changed line that declares a function or class counts this much more than any other
+DECLARATION_WEIGHT = 5
+
+# Rough size of a token in source code and English, close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+COMMENT_PREFIXES = ('//', '#', '/*', '*', '*/', '<!--', '--', '{{--')
+
+SYSTEM_PROMPT = (
+    "You write release notes for the users of a web application. Summarize the user-visible "
+    f"changes in the code excerpts below as at most {MAX_HIGHLIGHTS} short bullet points, one per line, "
+    "each starting with '- '. Leave out refactoring, tests and tooling, and do not mention file names."
+)
+
+MERGE_PROMPT = (
+    "You write release notes for the users of a web application. Merge the bullet points below, "
+    f"which describe parts of one release, into at most {MAX_HIGHLIGHTS} bullet points, one per line, "
+    "each starting with '- '. Keep the most important changes first."
+)
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def get_summary_settings():
+    """Return the summarization settings from the environment, or None when it is turned off.
+
+    Summaries need OPENAI_API_KEY; RELEASE_NOTES_SUMMARY=off skips them even when
+    it is set. RELEASE_NOTES_SUMMARY_MODEL, RELEASE_NOTES_SUMMARY_CONCURRENCY and
+    RELEASE_NOTES_SUMMARY_TOKENS (the release's prompt budget) tune the stage.
+    """
+    if os.environ.get('RELEASE_NOTES_SUMMARY', '').lower() in ('off', 'false', '0', 'no'):
+        return None
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        return None
+    return {
+        'api_key': api_key,
+        'base_url': os.environ.get('OPENAI_BASE_URL'),
+        'model': os.environ.get('RELEASE_NOTES_SUMMARY_MODEL', DEFAULT_SUMMARY_MODEL),
+        'concurrency': max(1, int(os.environ.get('RELEASE_NOTES_SUMMARY_CONCURRENCY', DEFAULT_SUMMARY_CONCURRENCY))),
+        'batch_tokens': DEFAULT_BATCH_TOKENS,
+    }
+
+def hunk_significance(language, hunk):
+    """Score a hunk by its meaningful changed lines; reindented or comment-only hunks score nothing."""
+    added = []
+    removed = []
+    for line in hunk.raw:
+        tag = line[:1]
+        if tag != '+' and tag != '-':
+            continue
+        stripped = line[1:].strip()
+        if stripped and not stripped.startswith(COMMENT_PREFIXES):
+            (added if tag == '+' else removed).append(stripped)
+
+    # The same lines went out and came back in with different indentation or trailing space
+    if len(added) == len(removed) and sorted(added) == sorted(removed):
+        return 0
+
+    score = len(added) + len(removed)
+    if language.declarations is not None:
+        declaration = language.declaration
+        score += DECLARATION_WEIGHT * sum(1 for lines in (added, removed) for line in lines if declaration(line))
+    return score
+
+def hunk_excerpt(hunk):
+    """Render the changed lines of a hunk, cut down to the excerpt limits."""
+    lines = [f"@@ {hunk.context}".rstrip()]
+    changed = [(tag, line) for tag, line in hunk.lines if tag != ' ' and line.strip()]
+    for tag, line in changed[:EXCERPT_HUNK_LINES]:
+        lines.append(f"{tag}{line.strip()[:EXCERPT_LINE_CHARS]}")
+    if len(changed) > EXCERPT_HUNK_LINES:
+        lines.append(f"... {len(changed) - EXCERPT_HUNK_LINES} more changed lines")
+    return "\n".join(lines)
+
+def file_excerpt(file, parsed):
+    """Return {'score', 'tokens', 'text'} for a file's most significant hunks, or None if none matter."""
+    language = language_for(file.filename)
+    scored = []
+    for index, hunk in enumerate(parsed.hunks):
+        score = hunk_significance(language, hunk)
+        if score:
+            scored.append((score, index))
+    if not scored:
+        return None
+
+    best = sorted(index for _, index in heapq.nlargest(EXCERPT_HUNKS, scored))
+    header = f"File: {file.filename} ({file.status}, +{file.additions}/-{file.deletions})"
+    text = "\n".join([header, *(hunk_excerpt(parsed.hunks[index]) for index in best)])
+    return {
+        'score': sum(score for score, index in scored if index in best),
+        'tokens': estimate_tokens(text),
+        'text': text
+    }
+
+class ExcerptSelector:
+    """The most significant excerpts seen so far that fit in the release's token budget.
+
+    Excerpts are kept in a min-heap by score, so adding one past the budget
+    drops the least significant ones, and memory stays bounded by the budget
+    however many files the release has.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget or int(os.environ.get('RELEASE_NOTES_SUMMARY_TOKENS', DEFAULT_RELEASE_TOKENS))
+        self.tokens = 0
+        self.dropped = 0
+        self._heap = []
+        self._count = 0
+
+    def add(self, filename, excerpt):
+        if excerpt is None:
+            return
+        # Among equal scores, files later in the stream are dropped first
+        heapq.heappush(self._heap, (excerpt['score'], -self._count, filename, excerpt))
+        self._count += 1
+        self.tokens += excerpt['tokens']
+        while self.tokens > self.budget and self._heap:
+            _, _, _, dropped = heapq.heappop(self._heap)
+            self.tokens -= dropped['tokens']
+            self.dropped += 1
+
+    def selected(self):
+        """Return the kept [filename, excerpt text] pairs in stream order."""
+        return [[filename, excerpt['text']] for _, _, filename, excerpt in sorted(self._heap, key=lambda item: -item[1])]
+
+def pack_batches(excerpts, batch_tokens):
+    """Group excerpt texts into batches of at most batch_tokens each, keeping their order."""
+    batches = []
+    batch = []
+    size = 0
+    limit = batch_tokens * CHARS_PER_TOKEN
+    for _, text in excerpts:
+        text = text[:limit]
+        tokens = estimate_tokens(text)
+        if batch and size + tokens > batch_tokens:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(text)
+        size += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def parse_bullets(content):
+    """Return the bullet points of a model response without their markers."""
+    bullets = []
+    for line in (content or "").splitlines():
+        line = line.strip()
+        if line[:2] in ('- ', '* ', '• '):
+            line = line[2:].strip()
+        elif not line:
+            continue
+        if line and line not in bullets:
+            bullets.append(line)
+    return bullets
+
+def prompt_key(settings, messages):
+    """Hash everything a response depends on into a cache key."""
+    # Only needed when there is something to summarize, so importing the package stays cheap
+    import hashlib
+
+    content = json.dumps([settings['model'], MAX_COMPLETION_TOKENS, messages], separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+class SummaryClient:
+    """Answers prompts from the cache, or from the model at most `concurrency` at a time.
+
+    The OpenAI client, and the openai import behind it, is only created for
+    the first prompt the cache cannot answer, so a fully cached release never
+    pays for it.
+    """
+
+    def __init__(self, settings, cache=None):
+        self.settings = settings
+        self.cache = cache
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        import asyncio
+
+        if self._client is None:
+            self._client = new_openai_client(self.settings['api_key'], self.settings['base_url'])
+            self._semaphore = asyncio.Semaphore(self.settings['concurrency'])
+        return self._client
+
+    def _cached(self, messages):
+        """Return (cache key, cached bullets or None) for a prompt."""
+        if self.cache is None:
+            return None, None
+        key = prompt_key(self.settings, messages)
+        record = self.cache.get(key)
+        if record is None:
+            return key, None
+        get_tracer().count('llm_cache_hits')
+        return key, record['bullets']
+
+    async def request(self, messages):
+        """Send one chat completion and return its bullets."""
+        client = self._ensure_client()
+        async with self._semaphore:
+            response = await client.chat.completions.create(
+                model=self.settings['model'],
+                messages=messages,
+                max_tokens=MAX_COMPLETION_TOKENS,
+                temperature=0.2
+            )
+        tracer = get_tracer()
+        tracer.count('llm_requests')
+        if response.usage is not None:
+            tracer.count('llm_prompt_tokens', response.usage.prompt_tokens)
+            tracer.count('llm_completion_tokens', response.usage.completion_tokens)
+        return parse_bullets(response.choices[0].message.content)
+
+    async def complete_all(self, prompts):
+        """Return the bullets for every prompt, None where the request failed."""
+        import asyncio
+
+        results = [None] * len(prompts)
+        keys = [None] * len(prompts)
+        pending = []
+        for index, messages in enumerate(prompts):
+            keys[index], results[index] = self._cached(messages)
+            if results[index] is None:
+                pending.append(index)
+
+        responses = await asyncio.gather(*(self.request(prompts[index]) for index in pending),
+                                         return_exceptions=True)
+        for index, response in zip(pending, responses):
+            if isinstance(response, Exception):
+                logger.warning(f"Summary request failed: {str(response)}")
+                continue
+            results[index] = response
+            if self.cache is not None:
+                self.cache.put(keys[index], {'bullets': response})
+        return results
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+async def summarize_batches(client, batches):
+    """Summarize every batch, then merge the batch summaries when there is more than one."""
+    try:
+        prompts = [
+            [{'role': 'system', 'content': SYSTEM_PROMPT}, {'role': 'user', 'content': "\n\n".join(batch)}]
+            for batch in batches
+        ]
+        partial = [bullets for bullets in await client.complete_all(prompts) if bullets]
+        if len(partial) <= 1:
+            return partial[0] if partial else []
+
+        listed = "\n".join(f"- {bullet}" for bullets in partial for bullet in bullets)
+        merge = [{'role': 'system', 'content': MERGE_PROMPT}, {'role': 'user', 'content': listed}]
+        merged = (await client.complete_all([merge]))[0]
+        # If the merge failed, the batch bullets are still better than nothing
+        return merged or [bullet for bullets in partial for bullet in bullets]
+    finally:
+        await client.aclose()
+
+def summarize_release(excerpts, cache=None, settings=None):
+    """Return model-written highlights for a release's excerpts, or [] if there are none to be had."""
+    settings = settings or get_summary_settings()
+    if settings is None:
+        logger.info("Skipping change summary: OPENAI_API_KEY is not set or RELEASE_NOTES_SUMMARY is off")
+        return []
+    if not excerpts:
+        logger.info("Skipping change summary: no significant hunks")
+        return []
+
+    # asyncio only matters once there is something to send, so importing the package stays cheap
+    import asyncio
+
+    batches = pack_batches(excerpts, settings['batch_tokens'])
+    tokens = sum(estimate_tokens(text) for batch in batches for text in batch)
+    logger.info(f"Summarizing {len(excerpts)} file excerpts (~{tokens} tokens) in {len(batches)} batches "
+                f"with {settings['model']}")
+    counters = get_tracer().root.counters
+    before = dict(counters)
+    try:
+        highlights = asyncio.run(summarize_batches(SummaryClient(settings, cache), batches))
+    except Exception as e:
+        logger.warning(f"Failed to summarize changes: {str(e)}")
+        return []
+
+    if cache is not None:
+        cache.evict()
+    used = {name: counters[name] - before[name] for name in counters}
+    logger.info(f"Change summary: {len(highlights)} highlights, {used['llm_requests']} requests, "
+                f"{used['llm_cache_hits']} cached, {used['llm_prompt_tokens']} prompt and "
+                f"{used['llm_completion_tokens']} completion tokens")
+    return highlights[:MAX_HIGHLIGHTS]
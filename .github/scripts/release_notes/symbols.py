@@ -0,0 +1,419 @@
+"""Language-aware extraction of the symbols a patch adds, changes or removes.
+
+Only the hunks are read. Each side of a hunk (the context and removed lines of
+the old file, the context and added lines of the new one) goes through a line
+tokenizer that recognizes declarations and tracks the enclosing scope by brace
+depth or, for Python, indentation. The function context git writes after the
+@@ header seeds the scope of a hunk that starts inside a declaration, so the
+result is accurate without ever fetching whole files. A patch whose lines are
+out of order, such as the edits of a moved file, has no scopes to track: only
+the declarations on its changed lines are read.
+
+In braced languages the tokenizer is incremental within a patch: each
+distinct line is tokenized once, however many hunks and sides read it, only
+lines with a declaration keyword in them go through the declaration
+patterns, and only lines with a brace in them are stripped of strings and
+comments. What the walk of a side finds depends on the shape of its lines
+(changed or not, the kind of symbol they declare, their braces) but not on
+the names declared, so hunks of a patch alike in all but their names are
+only walked once. Nothing is kept between patches. Python hunks are walked
+line by line, as any line can end a scope there. Blade templates are read
+as PHP, for the declarations of their PHP blocks, and for the components
+they use.
+"""
+import re
+
+FUNCTION = 'function'
+CLASS = 'class'
+COMPONENT = 'component'
+
+# Strings and comments are blanked out before braces are counted
+CODE_NOISE_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|/\*.*?\*/|//.*$')
+HASH_COMMENT_RE = re.compile(r'#(?!\[).*$')
+BRACE_RE = re.compile(r'[{}]')
+
+# tokenize() results of the lines that neither declare anything nor hold a brace
+BLANK_LINE = 'blank'
+PLAIN_LINE = 'plain'
+# The shape of a changed line that is not blank but only changes the scopes it sits in
+CHANGED_LINE = (True, None, (), False)
+
+PHP_DECLARATIONS = (
+    (FUNCTION, r'^\s*(?:(?:public|protected|private|static|abstract|final)\s+)*function\s+&?\s*([A-Za-z_]\w*)\s*\('),
+    (CLASS, r'^\s*(?:(?:abstract|final|readonly)\s+)*(?:class|interface|trait|enum)\s+([A-Za-z_]\w*)'),
+    # Closures and arrow functions assigned to a variable
+    (FUNCTION, r'^\s*\$([A-Za-z_]\w*)\s*=\s*(?:static\s+)?(?:function|fn)\s*\('),
+)
+# A word each declaration above contains
+PHP_HINTS = r'fn|function|class|interface|trait|enum'
+
+PYTHON_DECLARATIONS = (
+    (FUNCTION, r'^\s*(?:async\s+)?def\s+([A-Za-z_]\w*)\s*\('),
+    (CLASS, r'^\s*class\s+([A-Za-z_]\w*)'),
+    (FUNCTION, r'^\s*([A-Za-z_]\w*)\s*=\s*lambda\b'),
+)
+PYTHON_HINTS = r'def|class|lambda'
+
+JS_DECLARATIONS = (
+    (FUNCTION, r'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)\s*[(<]'),
+    (CLASS, r'^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:class|interface)\s+([A-Za-z_$][\w$]*)'),
+    # Function expressions and arrow functions bound to a name
+    (FUNCTION, (
+        r'^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?'
+        r'(?:function\b|(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*(?::\s*[^=]+)?=>)'
+    )),
+    # Class and object methods
+    (FUNCTION, (
+        r'^\s*(?:(?:public|private|protected|static|async|readonly|override|get|set)\s+)*\*?\s*'
+        r'(?!(?:if|for|while|switch|catch|function|return|else|do|with)\b)([A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*'
+        r'\([^;]*\)\s*(?::\s*[^;{]+)?\{\s*$'
+    )),
+)
+# Methods are only told apart by the brace they end in
+JS_HINTS = r'function|class|interface|=>|\{'
+
+GENERIC_DECLARATIONS = (
+    (FUNCTION, r'^\s*(?:\w+\s+)*?(?:function|def|func|fn|sub)\s+([A-Za-z_]\w*)'),
+    (CLASS, r'^\s*(?:\w+\s+)*?(?:class|struct|interface|trait)\s+([A-Za-z_]\w*)'),
+)
+GENERIC_HINTS = r'def|func|fn|sub|class|struct|interface|trait'
+
+BLADE_COMPONENTS = (
+    re.compile(r'<x-([\w.:-]+)'),
+    re.compile(r'<livewire:([\w.:-]+)'),
+    re.compile(r'@livewire\(\s*[\'"]([\w.:-]+)[\'"]'),
+    re.compile(r'@(?:component|include|extends)\(\s*[\'"]([\w.:-]+)[\'"]'),
+)
+
+class Language:
+    """How declarations look in one language and how its scopes are delimited."""
+    __slots__ = ('name', 'declarations', 'hint', 'kinds', 'indented', 'hash_comments', 'components')
+
+    def __init__(self, name, declarations=(), hints=None, indented=False, hash_comments=False, components=()):
+        self.name = name
+        # One anchored alternation, so each line is matched once however many forms there are
+        self.declarations = None
+        self.hint = None
+        if declarations:
+            self.declarations = re.compile('|'.join(f"(?:{pattern})" for _, pattern in declarations))
+            # Looks for a word every declaration contains, far cheaper than trying the patterns themselves
+            self.hint = re.compile(hints).search
+        self.kinds = [kind for kind, _ in declarations]
+        self.indented = indented
+        self.hash_comments = hash_comments
+        self.components = components
+
+    def declaration(self, line):
+        """Return (kind, name) if the line declares a function or class."""
+        if self.hint(line) is None:
+            return None
+        match = self.declarations.match(line)
+        if match is None:
+            return None
+        return self.kinds[match.lastindex - 1], match.group(match.lastindex)
+
+    def braces(self, line):
+        """Return the braces of a line that are code, not strings or comments."""
+        if '{' not in line and '}' not in line:
+            return ()
+        code = CODE_NOISE_RE.sub('', line)
+        if self.hash_comments:
+            code = HASH_COMMENT_RE.sub('', code)
+        return tuple(BRACE_RE.findall(code))
+
+    def tokenize(self, line):
+        """Return (declaration, braces, ends_statement) of a line of a braced language, or BLANK_LINE or PLAIN_LINE."""
+        stripped = line.strip()
+        if not stripped:
+            return BLANK_LINE
+        declaration = self.declaration(line)
+        if stripped == '{' or stripped == '}':
+            braces = (stripped,)
+        elif '{' in stripped or '}' in stripped:
+            braces = self.braces(stripped)
+        elif declaration is None:
+            return PLAIN_LINE
+        else:
+            braces = ()
+        return declaration, braces, declaration is not None and stripped.endswith(';')
+
+PHP = Language('php', PHP_DECLARATIONS, PHP_HINTS, hash_comments=True)
+# PHP blocks in templates declare functions and classes like any PHP file
+BLADE = Language('blade', PHP_DECLARATIONS, PHP_HINTS, hash_comments=True, components=BLADE_COMPONENTS)
+PYTHON = Language('python', PYTHON_DECLARATIONS, PYTHON_HINTS, indented=True)
+JAVASCRIPT = Language('javascript', JS_DECLARATIONS, JS_HINTS)
+GENERIC = Language('generic', GENERIC_DECLARATIONS, GENERIC_HINTS, hash_comments=True)
+
+LANGUAGES_BY_SUFFIX = (
+    ('.blade.php', BLADE),
+    ('.php', PHP),
+    ('.py', PYTHON),
+    ('.pyi', PYTHON),
+    ('.js', JAVASCRIPT),
+    ('.jsx', JAVASCRIPT),
+    ('.mjs', JAVASCRIPT),
+    ('.cjs', JAVASCRIPT),
+    ('.ts', JAVASCRIPT),
+    ('.tsx', JAVASCRIPT),
+    ('.vue', JAVASCRIPT),
+)
+
+def language_for(filename):
+    """Return the Language used to read a file, falling back to a generic one."""
+    for suffix, language in LANGUAGES_BY_SUFFIX:
+        if filename.endswith(suffix):
+            return language
+    return GENERIC
+
+class Scope:
+    """A declaration whose body the tokenizer is currently inside.
+
+    walk_side() keeps the position of the declaring line in name, the names
+    themselves being filled in afterwards.
+    """
+    __slots__ = ('kind', 'name', 'level', 'opened')
+
+    def __init__(self, kind, name, level, opened):
+        self.kind = kind
+        self.name = name
+        # Brace depth (or indentation) of the declaration itself
+        self.level = level
+        self.opened = opened
+
+class SymbolChanges:
+    """Names of the symbols a patch added, changed and removed, by kind, in patch order."""
+    __slots__ = ('added', 'changed', 'removed')
+
+    def __init__(self):
+        self.added = {}
+        self.changed = {}
+        self.removed = {}
+
+    def names(self, change, kind):
+        return getattr(self, change).get(kind, [])
+
+def indentation(line):
+    return len(line) - len(line.lstrip())
+
+class LineTokens:
+    """The tokens of the distinct lines of one patch, each tokenized the first time a hunk reads it.
+
+    declarations maps a line, prefix included, to the (kind, name) it declares.
+    old and new map each line that declares something, holds a brace or, being
+    a changed line, is not blank, to its shape on that side: (changed, kind
+    declared, braces, ends_statement). Lines in neither map do not matter.
+    """
+    __slots__ = ('language', 'seen', 'declarations', 'old', 'new')
+
+    def __init__(self, language):
+        self.language = language
+        self.seen = set()
+        self.declarations = {}
+        self.old = {}
+        self.new = {}
+
+    def add(self, lines):
+        """Tokenize the lines not seen yet into the maps."""
+        tokenize = self.language.tokenize
+        seen = self.seen
+        for line in lines:
+            if line in seen:
+                continue
+            seen.add(line)
+            tag = line[:1]
+            if tag == '\\':
+                continue
+            token = tokenize(line[1:])
+            if token is BLANK_LINE:
+                continue
+            if token is PLAIN_LINE:
+                shape = CHANGED_LINE if tag == '+' or tag == '-' else None
+            else:
+                declaration, braces, ends_statement = token
+                if declaration is not None:
+                    self.declarations[line] = declaration
+                shape = (tag == '+' or tag == '-', declaration and declaration[0], braces, ends_statement)
+            if shape is None:
+                continue
+            if tag == '+':
+                self.new[line] = shape
+            elif tag == '-':
+                self.old[line] = shape
+            else:
+                self.old[line] = self.new[line] = shape
+
+def walk_side(header, shapes):
+    """Walk the line shapes of one side of a hunk, None for the lines that do not matter.
+
+    header is the kind the function context of the hunk declares, if any.
+    Returns the positions of the changed lines that declare something, and
+    those of the declarations changes fall in (-1 for the function context),
+    in the order they are first changed.
+    """
+    declared = []
+    touched = []
+    stack = []
+    depth = 0
+    if header:
+        stack.append(Scope(header, -1, -1, True))
+    # Whether a scope opened since the last changed line, which has yet to be marked as touched
+    unmarked = bool(stack)
+
+    for position, shape in enumerate(shapes):
+        if shape is None:
+            continue
+        changed, kind, braces, ends_statement = shape
+        if kind == FUNCTION:
+            for scope in stack:
+                if scope.opened and scope.kind == FUNCTION:
+                    # Closures and helpers inside a function body are part of that function
+                    kind = None
+                    break
+
+        if changed:
+            if kind:
+                declared.append(position)
+            if unmarked:
+                # A changed line changes every declaration it sits in
+                touched.extend(scope.name for scope in stack if scope.opened and scope.name not in touched)
+                unmarked = False
+
+        if kind:
+            # A declaration that never opened a body (a one-line arrow function, say) ends at the next one
+            while stack and not stack[-1].opened and stack[-1].level >= depth:
+                stack.pop()
+            if not ends_statement:
+                stack.append(Scope(kind, position, depth, False))
+
+        for brace in braces:
+            if brace == '{':
+                depth += 1
+                if stack and depth > stack[-1].level and not stack[-1].opened:
+                    stack[-1].opened = True
+                    unmarked = True
+            else:
+                depth -= 1
+                while stack and stack[-1].opened and depth <= stack[-1].level:
+                    stack.pop()
+    return declared, touched
+
+def scan_side(hunk, header, shapes, declarations, declared, touched, walks):
+    """Record the declarations on one side's changed lines of a hunk, and the scopes changes fall in.
+
+    header is what the function context of the hunk declares, if anything;
+    walks holds what the walks of the patch's earlier hunks found, by shape.
+    """
+    key = (header and header[0], tuple(map(shapes.get, hunk.raw)))
+    walked = walks.get(key)
+    if walked is None:
+        walked = walks[key] = walk_side(key[0], key[1])
+    declared_at, touched_at = walked
+    for position in declared_at:
+        kind, name = declarations[hunk.raw[position]]
+        declared.setdefault(kind, {})[name] = True
+    for position in touched_at:
+        kind, name = header if position < 0 else declarations[hunk.raw[position]]
+        touched.setdefault(kind, {})[name] = True
+
+def scan_indented(language, hunk, side, declared, touched):
+    """Walk one side of a hunk of a language whose scopes end with their indentation."""
+    stack = []
+    header = language.declaration(hunk.context or '')
+    if header:
+        stack.append(Scope(header[0], header[1], indentation(hunk.context), True))
+
+    for tag, line in hunk.lines:
+        if tag != ' ' and tag != side:
+            continue
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if not stripped.startswith('#'):
+            indent = indentation(line)
+            while stack and indent <= stack[-1].level:
+                stack.pop()
+
+        declaration = language.declaration(line)
+        if declaration and declaration[0] == FUNCTION and any(s.kind == FUNCTION for s in stack):
+            # Closures and helpers inside a function body are part of that function
+            declaration = None
+
+        if tag == side:
+            if declaration:
+                declared.setdefault(declaration[0], {})[declaration[1]] = True
+            # A changed line changes every declaration it sits in
+            for scope in stack:
+                touched.setdefault(scope.kind, {})[scope.name] = True
+
+        if declaration:
+            stack.append(Scope(declaration[0], declaration[1], indent, True))
+
+def scan_unordered(language, hunk, old_declared, new_declared):
+    """Record the declarations on the changed lines of a hunk whose lines are out of order; it has no scopes."""
+    for tag, line in hunk.lines:
+        if tag == ' ':
+            continue
+        declaration = language.declaration(line)
+        if declaration:
+            declared = new_declared if tag == '+' else old_declared
+            declared.setdefault(declaration[0], {})[declaration[1]] = True
+
+def scan_components(language, parsed, side):
+    """Return the components used on one side's changed lines."""
+    components = {}
+    lines = parsed.added if side == '+' else parsed.removed
+    for line in lines:
+        for pattern in language.components:
+            for name in pattern.findall(line):
+                components[name] = True
+    return components
+
+def extract_symbols(parsed, filename):
+    """Work out which symbols the patch adds, changes and removes."""
+    language = language_for(filename)
+    result = SymbolChanges()
+    old_declared, new_declared, old_touched, new_touched = {}, {}, {}, {}
+
+    if language.declarations is not None and not all(hunk.ordered for hunk in parsed.hunks):
+        for hunk in parsed.hunks:
+            scan_unordered(language, hunk, old_declared, new_declared)
+    elif language.indented:
+        for hunk in parsed.hunks:
+            scan_indented(language, hunk, '-', old_declared, old_touched)
+            scan_indented(language, hunk, '+', new_declared, new_touched)
+    elif language.declarations is not None:
+        tokens = LineTokens(language)
+        walks = {}
+        for hunk in parsed.hunks:
+            tokens.add(hunk.raw)
+            header = language.declaration(hunk.context or '')
+            scan_side(hunk, header, tokens.old, tokens.declarations, old_declared, old_touched, walks)
+            scan_side(hunk, header, tokens.new, tokens.declarations, new_declared, new_touched, walks)
+
+    if language.components:
+        old_declared[COMPONENT] = scan_components(language, parsed, '-')
+        new_declared[COMPONENT] = scan_components(language, parsed, '+')
+
+    for kind in (FUNCTION, CLASS, COMPONENT):
+        old = old_declared.get(kind, {})
+        new = new_declared.get(kind, {})
+        added = [name for name in new if name not in old]
+        removed = [name for name in old if name not in new]
+        changed = {}
+        for name in (*new, *new_touched.get(kind, {}), *old_touched.get(kind, {})):
+            if name not in changed and (name in old) == (name in new):
+                changed[name] = True
+        if added:
+            result.added[kind] = added
+        if removed:
+            result.removed[kind] = removed
+        if changed:
+            result.changed[kind] = list(changed)
+    return result
+
+def symbol_changes(parsed, filename):
+    """Return the SymbolChanges of a parsed patch, extracting them only on first use."""
+    if parsed.symbols is None:
+        parsed.symbols = extract_symbols(parsed, filename)
+    return parsed.symbols
@@ -0,0 +1,112 @@
+"""First-tier classification from commit and file metadata, before any patch is read.
+
+A release is first classified from what costs nothing extra to know:
+
+- the messages of its commits, which are collected for the release anyway:
+  a Conventional Commit prefix (`feat:`, `fix(api):`) gives a release note
+  entry and bump through the commit_types of the rule table, and a `!` after
+  the type or a `BREAKING CHANGE:` footer calls for a major release;
+- each changed file's path, status and line counts, which the metadata rules
+  of the rule table match: documentation, tests and CI files, new database
+  migrations and route files that only lose lines are settled there.
+
+Only the files no metadata rule settles have their patch scanned, and the
+local git source does not even keep the patch text of files settled by
+path. The run report counts the patch fetches and scans this saved, along
+with those the path filter saves. RELEASE_NOTES_TIERED=0 turns the first
+tier off, so every file that is not skipped is scanned.
+"""
+import os
+import re
+import logging
+
+from .rules import get_rule_engine
+
+logger = logging.getLogger(__name__)
+
+# type(scope)!: description
+CONVENTIONAL_COMMIT_RE = re.compile(
+    r'(?P<type>[A-Za-z]+)(?:\((?P<scope>[^()\r\n]*)\))?(?P<breaking>!)?: *(?P<description>\S[^\r\n]*)'
+)
+
+# A footer announcing a breaking change, anywhere after the subject
+BREAKING_FOOTER_RE = re.compile(r'^BREAKING[ -]CHANGE: *(?P<description>\S.*)$', re.MULTILINE)
+
+BUMP_ORDER = {None: 0, 'minor': 1, 'major': 2}
+
+def tiering_enabled():
+    """Return whether files are classified from metadata first; RELEASE_NOTES_TIERED=0 turns it off."""
+    return os.environ.get('RELEASE_NOTES_TIERED', '1') != '0'
+
+def higher_bump(left, right):
+    return left if BUMP_ORDER[left] >= BUMP_ORDER[right] else right
+
+def parse_commit_message(message):
+    """Return {'type', 'scope', 'breaking', 'description'} of a Conventional Commit message, or None."""
+    subject, _, body = (message or '').strip().partition('\n')
+    match = CONVENTIONAL_COMMIT_RE.fullmatch(subject.strip())
+    if match is None:
+        return None
+    footer = BREAKING_FOOTER_RE.search(body)
+    return {
+        'type': match.group('type').lower(),
+        'scope': match.group('scope') or None,
+        'breaking': bool(match.group('breaking') or footer),
+        'description': match.group('description').strip()
+    }
+
+def classify_commits(commits):
+    """Return the bump and release note entries the commit messages of a release call for.
+
+    commits are the info dicts of get_range_commit_info. The result is
+    {'bump', 'entries': {section: [messages]}, 'conventional': count}; commits
+    without a Conventional Commit subject still count when they carry a
+    BREAKING CHANGE footer.
+    """
+    commit_types = get_rule_engine().commit_types
+    bump = None
+    entries = {}
+    seen = set()
+    conventional = 0
+    for commit in commits:
+        message = commit.get('message') or ''
+        parsed = parse_commit_message(message)
+        if parsed is None:
+            if BREAKING_FOOTER_RE.search(message):
+                bump = 'major'
+            continue
+
+        conventional += 1
+        spec = commit_types.get(parsed['type'], {})
+        bump = higher_bump(bump, 'major' if parsed['breaking'] else spec.get('bump'))
+        section = spec.get('section')
+        if section is None:
+            continue
+        entry = parsed['description'][:1].upper() + parsed['description'][1:]
+        if parsed['scope']:
+            entry = f"{parsed['scope']}: {entry}"
+        if parsed['breaking']:
+            entry = f"Breaking: {entry}"
+        # Cherry-picked and reverted-then-reapplied commits repeat their subject
+        if (section, entry) not in seen:
+            seen.add((section, entry))
+            entries.setdefault(section, []).append(entry)
+
+    if conventional:
+        logger.info(f"Classified {conventional} of {len(commits)} commits from their Conventional Commit subject"
+                    f"{f', calling for a {bump} release' if bump else ''}")
+    return {'bump': bump, 'entries': entries, 'conventional': conventional}
+
+def settling_rule(file):
+    """Return the metadata rule that settles a changed file without its patch, or None to scan it."""
+    if not tiering_enabled():
+        return None
+    return get_rule_engine().settle(file.filename, file.status, file.additions, file.deletions)
+
+def patch_needed(filename, status):
+    """Tell a source, once a file's name and status are known, whether its patch text is worth keeping.
+
+    Line counts are not known yet at that point, so only rules that set no
+    count limit can tell a patch is not needed.
+    """
+    return not tiering_enabled() or get_rule_engine().settle(filename, status) is None
@@ -0,0 +1,28 @@
+"""Semantic version bookkeeping for release notes."""
+import re
+
+# Version used when neither the base of the range, the notes store nor an earlier tag names one
+CURRENT_VERSION = "1.0.0"
+
+VERSION_TAG_RE = re.compile(r'^v?(\d+)\.(\d+)\.(\d+)$')
+
+def version_from_ref(ref):
+    """Return the version a ref such as "v1.4.2" names, or None."""
+    match = VERSION_TAG_RE.match(ref)
+    return ".".join(match.groups()) if match else None
+
+def increment_version(version, major_increment, minor_increment, patch_increment):
+    """Increment the version number based on the type of changes."""
+    major, minor, patch = map(int, version.split('.'))
+
+    if major_increment:
+        major += 1
+        minor = 0
+        patch = 0
+    elif minor_increment:
+        minor += 1
+        patch = 0
+    elif patch_increment:
+        patch += 1
+
+    return f"{major}.{minor}.{patch}"
@@ -0,0 +1,37 @@
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+API_URL = 'https://api.example.test'
+
+@pytest.fixture
+def pygithub(monkeypatch):
+    """Return a factory for a PyGithub client whose requests a handler answers instead of GitHub.
+
+    The handler is called with the path and query of every request and
+    returns its status, JSON body and extra headers.
+    """
+    github = pytest.importorskip('github')
+    requests = pytest.importorskip('requests')
+
+    def connect(handler):
+        def send(adapter, request, **kwargs):
+            url = urlsplit(request.url)
+            status, body, headers = handler(url.path, dict(parse_qsl(url.query)))
+            response = requests.Response()
+            response.status_code = status
+            response.headers = requests.structures.CaseInsensitiveDict(
+                {'Content-Type': 'application/json', **headers})
+            response._content = json.dumps(body).encode('utf-8')
+            response.encoding = 'utf-8'
+            response.url = request.url
+            response.request = request
+            return response
+
+        # Every PyGithub session sends through an HTTPAdapter, the response cache's included
+        monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', send)
+        return github.Github(auth=github.Auth.Token('token'), base_url=API_URL, retry=None,
+                             seconds_between_requests=0)
+
+    return connect
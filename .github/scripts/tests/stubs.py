@@ -0,0 +1,92 @@
+"""Stand-ins for the change sources and the GitHub API, answering from canned data."""
+from datetime import datetime
+
+from release_notes.models import ChangedCommit, ChangedFile, commit_info_from_commit
+
+PATCH = "@@ -1 +1,2 @@\n $total = 0;\n+$total = 1;"
+
+def changed_file(filename, patch=PATCH, status='modified'):
+    file = ChangedFile(filename, status)
+    file.patch = patch
+    file.additions = sum(1 for line in patch.splitlines() if line.startswith('+'))
+    file.deletions = sum(1 for line in patch.splitlines() if line.startswith('-'))
+    file.changes = file.additions + file.deletions
+    return file
+
+def stub_commit(sha, message=None):
+    return ChangedCommit(sha, "Dev", 'dev@example.com', datetime(2026, 1, 2, 3, 4, 5), message or f"Commit {sha}",
+                         login='dev')
+
+class StubChangeSource:
+    """Change source that lists the same changed files for every range and records the ranges asked for."""
+    name = 'stub'
+
+    def __init__(self, filenames=('app/Users.php',), tag=None):
+        self.filenames = filenames
+        self.tag = tag
+        self.ranges = []
+
+    def get_changes(self, base_sha, head_sha):
+        self.ranges.append((base_sha, head_sha))
+        return {
+            'files': iter([changed_file(filename) for filename in self.filenames]),
+            'commits': iter([stub_commit(head_sha)])
+        }
+
+    def get_commit_info(self, commit_sha):
+        return commit_info_from_commit(stub_commit(commit_sha))
+
+    def find_last_tag(self, head_sha):
+        return self.tag
+
+    def close(self):
+        pass
+
+REPOSITORY = 'acme/app'
+
+def commit_json(sha, parents=1):
+    return {
+        'sha': sha,
+        'author': {'login': 'dev'},
+        'parents': [{'sha': f"{sha}-parent{number}"} for number in range(parents)],
+        'commit': {
+            'author': {'name': "Dev", 'email': 'dev@example.com', 'date': '2026-01-02T03:04:05Z'},
+            'message': f"Commit {sha}",
+        },
+    }
+
+def file_json(filename, status='modified', additions=1, patch=None):
+    return {'filename': filename, 'status': status, 'additions': additions, 'deletions': 0,
+            'changes': additions, 'patch': patch, 'sha': f"blob-{filename}"}
+
+class FakeGitHub:
+    """httpx MockTransport handler answering the compare and commit endpoints from canned pages.
+
+    Every request is recorded in requests as (path, query parameters).
+    """
+
+    def __init__(self, commits, compare_files, commit_files):
+        self.commits = commits
+        self.compare_files = compare_files
+        self.commit_files = commit_files
+        self.requests = []
+
+    def __call__(self, request):
+        import httpx
+
+        self.requests.append((request.url.path, dict(request.url.params)))
+        page = int(request.url.params.get('page', 1))
+        per_page = int(request.url.params.get('per_page', 30))
+        window = slice((page - 1) * per_page, page * per_page)
+        prefix = f"/repos/{REPOSITORY}/"
+        path = request.url.path[len(prefix):]
+        if path.startswith('compare/'):
+            return httpx.Response(200, json={
+                'total_commits': len(self.commits),
+                'commits': self.commits[window],
+                'files': self.compare_files if page == 1 else [],
+            })
+        if path.startswith('commits/'):
+            sha = path[len('commits/'):]
+            return httpx.Response(200, json={**commit_json(sha), 'files': self.commit_files.get(sha, [])[window]})
+        return httpx.Response(404, json={'message': "Not Found"})
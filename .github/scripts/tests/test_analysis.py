@@ -0,0 +1,22 @@
+from release_notes.analysis import determine_version_increment
+from release_notes.models import ChangedFile
+
+def changed_file(filename, patch, status='modified'):
+    file = ChangedFile(filename, status)
+    file.patch = patch
+    file.additions = sum(1 for line in patch.splitlines() if line.startswith('+'))
+    file.deletions = sum(1 for line in patch.splitlines() if line.startswith('-'))
+    return file
+
+FEATURE = changed_file('app/Service.php', "@@ -1,2 +1,5 @@ class Service\n {\n+    public function export()\n+    {\n+    }\n }")
+BREAKING = changed_file('app/Api.php', "@@ -1,2 +1 @@\n-Route::delete('/api/users', 'remove');\n keep")
+PLAIN = changed_file('app/plain.php', "@@ -1 +1 @@\n-$a = 1;\n+$a = 2;")
+
+def test_new_function_calls_for_minor():
+    assert determine_version_increment({'files': [PLAIN, FEATURE]}) == (False, True, False)
+
+def test_breaking_change_after_a_feature_calls_for_major():
+    assert determine_version_increment({'files': [FEATURE, PLAIN, BREAKING]}) == (True, False, False)
+
+def test_plain_changes_call_for_patch():
+    assert determine_version_increment({'files': [PLAIN]}) == (False, False, True)
@@ -0,0 +1,93 @@
+import shutil
+import subprocess
+
+import pytest
+
+from release_notes import backfill as backfill_module
+from release_notes.backfill import Backfill
+from release_notes.store import ReleaseNotesStore
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+RELEASES = 6
+
+def git(path, *args):
+    return subprocess.run(['git', '-C', str(path), *args], check=True, capture_output=True, text=True).stdout.strip()
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_CACHE_DIR', raising=False)
+    monkeypatch.setenv('RELEASE_NOTES_WORKERS', '1')
+    workspace = tmp_path / 'workspace'
+    workspace.mkdir()
+    git(workspace, 'init', '-q')
+    for number in range(RELEASES + 1):
+        (workspace / f"feature{number}.php").write_text(f"<?php\nfunction feature{number}() {{\n}}\n")
+        git(workspace, 'add', '-A')
+        git(workspace, '-c', 'user.name=Dev', '-c', 'user.email=dev@example.com', 'commit', '-q',
+            '-m', f"fix: step {number}")
+    return workspace, ReleaseNotesStore(tmp_path / 'store', tmp_path / 'release_note.txt')
+
+def stored(store):
+    return [(entry['head'], entry['version']) for entry in store.entries()]
+
+def expected(workspace):
+    # Each commit adds a function, which calls for a minor release
+    heads = git(workspace, 'rev-list', '--first-parent', '--reverse', 'HEAD').split()[1:]
+    return [(head, f"1.{number}.0") for number, head in enumerate(heads, 1)]
+
+def test_a_backfill_stopped_in_the_store_resumes_from_the_last_stored_release(history, monkeypatch):
+    workspace, store = history
+    append = ReleaseNotesStore.append
+    calls = []
+
+    def failing_append(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise OSError("disk full")
+        return append(self, *args, **kwargs)
+
+    monkeypatch.setattr(ReleaseNotesStore, 'append', failing_append)
+    first = Backfill(workspace, store)
+    with pytest.raises(SystemExit):
+        first.run(first.plan(None, 'HEAD', 'commits'), workers=1)
+    assert len(store.entries()) == 2
+
+    monkeypatch.setattr(ReleaseNotesStore, 'append', append)
+    second = Backfill(workspace, store)
+    checkpoint = second.plan(None, 'HEAD', 'commits')
+    assert checkpoint['done'] == 2
+    second.run(checkpoint, workers=1)
+    assert stored(store) == expected(workspace)
+
+def test_a_release_stored_before_its_checkpoint_is_not_stored_again(history, monkeypatch):
+    workspace, store = history
+    save_checkpoint = Backfill.save_checkpoint
+
+    def interrupted_save(self, checkpoint):
+        if checkpoint['done'] == 4:
+            raise KeyboardInterrupt
+        save_checkpoint(self, checkpoint)
+
+    monkeypatch.setattr(Backfill, 'save_checkpoint', interrupted_save)
+    first = Backfill(workspace, store)
+    with pytest.raises(KeyboardInterrupt):
+        first.run(first.plan(None, 'HEAD', 'commits'), workers=1)
+    assert len(store.entries()) == 4
+    assert first.load_checkpoint()['done'] == 3
+
+    monkeypatch.setattr(Backfill, 'save_checkpoint', save_checkpoint)
+    second = Backfill(workspace, store)
+    checkpoint = second.plan(None, 'HEAD', 'commits')
+    assert checkpoint['done'] == 4
+    second.run(checkpoint, workers=1)
+    assert stored(store) == expected(workspace)
+    assert len(expected(workspace)) == RELEASES
+
+def test_a_checkpoint_of_another_range_is_not_resumed(history):
+    workspace, store = history
+    Backfill(workspace, store).plan(None, 'HEAD', 'commits')
+    with pytest.raises(SystemExit):
+        Backfill(workspace, store).plan(None, 'HEAD', 'tags')
+    assert backfill_module.CHECKPOINT_NAME in {path.name for path in store.directory.iterdir()}
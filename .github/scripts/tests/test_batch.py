@@ -0,0 +1,98 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from release_notes import batch
+from release_notes.batch import BATCH_REPORT_NAME, load_manifest, run_batch
+
+from .stubs import StubChangeSource
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_CACHE_DIR', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_BATCH_REQUEST_BUDGET', raising=False)
+    monkeypatch.setenv('RELEASE_NOTES_WORKERS', '1')
+
+class BrokenSource(StubChangeSource):
+    def get_changes(self, base_sha, head_sha):
+        raise RuntimeError("comparison failed")
+
+class CountingSource(StubChangeSource):
+    """Stub source that spends one request of the batch's client per range."""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def get_changes(self, base_sha, head_sha):
+        self.client.request_count += 1
+        return super().get_changes(base_sha, head_sha)
+
+@pytest.fixture
+def stub_sources(monkeypatch):
+    def ensure_client(runner):
+        if runner.client is None:
+            runner.client = SimpleNamespace(request_count=0)
+        return runner.client
+
+    def source_for(runner, entry):
+        if entry['repository'].endswith('broken'):
+            return BrokenSource()
+        return StubChangeSource() if entry.get('path') else CountingSource(ensure_client(runner))
+
+    monkeypatch.setattr(batch.BatchRunner, '_ensure_client', ensure_client)
+    monkeypatch.setattr(batch.BatchRunner, 'source_for', source_for)
+
+def write_manifest(tmp_path, repositories, defaults=None):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps({'defaults': defaults or {'base': 'v1.0.0'}, 'repositories': repositories}))
+    return path
+
+def report(output):
+    with open(output / BATCH_REPORT_NAME) as f:
+        document = json.load(f)
+    return document, {entry['repository']: entry['status'] for entry in document['repositories']}
+
+def test_a_failing_repository_does_not_stop_the_others(tmp_path, stub_sources):
+    manifest = write_manifest(tmp_path, [
+        {'repository': 'acme/api', 'head': 'a' * 40},
+        {'repository': 'acme/broken', 'head': 'b' * 40},
+        {'repository': 'acme/web', 'head': 'c' * 40},
+    ])
+    outcomes = run_batch(manifest, tmp_path / 'out', concurrency=2)
+
+    document, statuses = report(tmp_path / 'out')
+    assert statuses == {'acme/api': 'ok', 'acme/broken': 'failed', 'acme/web': 'ok'}
+    assert (document['ok'], document['failed'], document['skipped']) == (2, 1, 0)
+    assert outcomes[1]['error'] == "comparison failed"
+    for name in ('api', 'web'):
+        with open(tmp_path / 'out' / 'acme' / name / 'analysis.json') as f:
+            assert json.load(f)['version'] == "1.0.1"
+    assert not (tmp_path / 'out' / 'acme' / 'broken' / 'analysis.json').exists()
+
+def test_repositories_not_started_once_the_budget_is_spent_are_skipped(tmp_path, stub_sources):
+    manifest = write_manifest(tmp_path, [
+        {'repository': 'acme/api', 'head': 'a' * 40},
+        {'repository': 'acme/web', 'head': 'b' * 40},
+        {'repository': 'acme/local', 'head': 'c' * 40, 'path': str(tmp_path)},
+        {'repository': 'acme/cli', 'head': 'd' * 40},
+    ])
+    run_batch(manifest, tmp_path / 'out', concurrency=1, request_budget=1)
+
+    document, statuses = report(tmp_path / 'out')
+    # Local checkouts need no requests, so they still run
+    assert statuses == {'acme/api': 'ok', 'acme/web': 'skipped', 'acme/local': 'ok', 'acme/cli': 'skipped'}
+    assert document['skipped'] == 2
+
+def test_manifest_entries_with_unknown_fields_are_refused(tmp_path):
+    manifest = write_manifest(tmp_path, [{'repository': 'acme/api', 'head': 'main', 'branch': 'main'}])
+    with pytest.raises(SystemExit):
+        load_manifest(manifest)
+
+def test_manifest_defaults_fill_in_entries(tmp_path):
+    manifest = write_manifest(tmp_path, [{'repository': 'acme/api', 'head': 'main'},
+                                         {'repository': 'acme/web', 'head': 'main', 'base': 'v2.0.0'}],
+                              defaults={'base': 'last-tag'})
+    assert [entry['base'] for entry in load_manifest(manifest)] == ['last-tag', 'v2.0.0']
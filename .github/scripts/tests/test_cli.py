@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+from release_notes import cli
+
+# Libraries the CLI only imports once a command needs them
+LAZY_DEPENDENCIES = ('github', 'openai', 'httpx', 'requests', 'dotenv')
+
+def test_cli_import_leaves_clients_unloaded():
+    scripts = os.path.dirname(os.path.dirname(os.path.abspath(cli.__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [scripts, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run(
+        [sys.executable, '-c', "import sys, release_notes.cli; print('\\n'.join(sys.modules))"],
+        capture_output=True, text=True, env=env, check=True
+    )
+    loaded = {name.split('.')[0] for name in result.stdout.split()}
+    assert loaded.isdisjoint(LAZY_DEPENDENCIES)
+
+def test_import_time_is_within_budget():
+    # The best of several fresh imports, so one slow start on a busy runner does not fail the check
+    assert 0 < min(cli.measure_import_time() for _ in range(5)) <= cli.IMPORT_TIME_BUDGET_MS
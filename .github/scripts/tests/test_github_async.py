@@ -0,0 +1,64 @@
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from release_notes import github_async  # noqa: E402
+from release_notes.github_async import AsyncGitHubChangeSource, AsyncGitHubClient  # noqa: E402
+
+from .stubs import REPOSITORY, FakeGitHub, commit_json, file_json  # noqa: E402
+
+def source_for(github):
+    client = AsyncGitHubClient('token', base_url='https://api.example.test', transport=httpx.MockTransport(github))
+    return AsyncGitHubChangeSource(REPOSITORY, client)
+
+def test_compare_pages_are_all_fetched(monkeypatch):
+    monkeypatch.setattr(github_async, 'COMPARE_PAGE_SIZE', 2)
+    github = FakeGitHub([commit_json(f"c{number}") for number in range(5)], [file_json('a.py')], {})
+    source = source_for(github)
+    try:
+        changes = source.get_changes('base', 'head')
+        assert [commit.sha for commit in changes['commits']] == ['c0', 'c1', 'c2', 'c3', 'c4']
+        assert [file.filename for file in changes['files']] == ['a.py']
+    finally:
+        source.close()
+    assert sorted(int(params['page']) for path, params in github.requests) == [1, 2, 3]
+
+def test_truncated_compare_is_netted_from_paginated_commit_files(monkeypatch):
+    monkeypatch.setattr(github_async, 'COMPARE_FILE_LIMIT', 2)
+    monkeypatch.setattr(github_async, 'COMMIT_FILES_PAGE_SIZE', 2)
+    github = FakeGitHub(
+        [commit_json('one'), commit_json('merge', parents=2), commit_json('two')],
+        [file_json('a.py'), file_json('b.py')],
+        {
+            'one': [file_json('a.py', additions=2, patch="+a"), file_json('b.py'), file_json('tmp.py', 'added')],
+            'merge': [file_json('a.py', additions=2)],
+            'two': [file_json('a.py', additions=3, patch="+b"), file_json('tmp.py', 'removed')],
+        },
+    )
+    source = source_for(github)
+    try:
+        files = list(source.get_changes('base', 'head')['files'])
+    finally:
+        source.close()
+
+    assert [(file.filename, file.status, file.additions, file.patch) for file in files] == [
+        ('a.py', 'modified', 5, "+a\n+b"),
+        ('b.py', 'modified', 1, None),
+    ]
+    commit_pages = sorted((path.rsplit('/', 1)[1], params['page']) for path, params in github.requests
+                          if '/commits/' in path)
+    # Merge commits are skipped, and a full page of files asks for the next one
+    assert commit_pages == [('one', '1'), ('one', '2'), ('two', '1'), ('two', '2')]
+
+def test_request_budget():
+    github = FakeGitHub([commit_json('c0')], [], {})
+    client = AsyncGitHubClient('token', base_url='https://api.example.test', request_budget=1,
+                               transport=httpx.MockTransport(github))
+    source = AsyncGitHubChangeSource(REPOSITORY, client)
+    try:
+        source._run(client.get_json(source._path('commits/c0')))
+        with pytest.raises(github_async.RequestBudgetExceeded):
+            source._run(client.get_json(source._path('commits/c0')))
+    finally:
+        source.close()
+    assert len(github.requests) == 1
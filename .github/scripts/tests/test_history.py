@@ -0,0 +1,75 @@
+import pytest
+
+from release_notes.history import ReleaseIndex
+from release_notes.store import ReleaseNotesStore
+
+def release(store, version, files, author='dev', committers=()):
+    record = {
+        'files': [{'filename': filename, 'status': 'modified', 'additions': 1, 'deletions': 0} for filename in files],
+        'commits': [{'author': committer} for committer in committers],
+        'sections': {'features': [f"Added {version}"]},
+    }
+    return store.append(f"Notes for {version}", {'version': version, 'author': author}, record)
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReleaseNotesStore(tmp_path / 'release-notes', tmp_path / 'release_note.txt')
+    release(store, "1.0.0", ['app/Users.php', 'README.md'], committers=['alice'])
+    release(store, "1.0.1", ['app/Http/Kernel.php', 'app.php'])
+    release(store, "1.0.2", ['application/Users.php', 'app0.php'])
+    return store
+
+@pytest.fixture
+def index(store, monkeypatch):
+    index = ReleaseIndex(store)
+    read = []
+    original = store.read_record
+    monkeypatch.setattr(store, 'read_record', lambda entry: read.append(entry['seq']) or original(entry))
+    index.records_read = read
+    yield index
+    index.close()
+
+def versions(releases):
+    return [release['version'] for release in releases]
+
+def test_sync_reads_only_releases_appended_since_the_last_one(store, index):
+    assert index.sync() == 3
+    assert index.sync() == 0
+    release(store, "1.1.0", ['app/Users.php'])
+    assert index.sync() == 1
+    assert index.records_read == [1, 2, 3, 4]
+    assert versions(index.by_version("1.1.0")) == ["1.1.0"]
+
+def test_a_release_being_appended_is_left_for_the_next_sync(store, index):
+    index.sync()
+    entry = release(store, "1.1.0", ['app/Users.php'])
+    line = store.index_path.read_bytes().splitlines(keepends=True)[-1]
+    store.index_path.write_bytes(store.index_path.read_bytes()[:-len(line)] + line[:-1])
+    assert index.sync() == 0
+    store.index_path.write_bytes(store.index_path.read_bytes() + b"\n")
+    assert index.sync() == 1
+    assert index.records_read == [1, 2, 3, entry['seq']]
+
+def test_an_index_ahead_of_the_store_is_rebuilt(store, index, tmp_path):
+    index.sync()
+    store.index_path.write_bytes(store.index_path.read_bytes().splitlines(keepends=True)[0])
+    assert index.sync() == 1
+    assert versions(index.by_version("1.0.1")) == []
+
+def test_files_and_directories(index):
+    assert versions(index.touching('app/Users.php')) == ["1.0.0"]
+    assert versions(index.touching('app/')) == ["1.0.1", "1.0.0"]
+    assert versions(index.touching('app/Http/')) == ["1.0.1"]
+    # Neighbouring names that share the prefix are not under the directory
+    assert versions(index.touching('app.php')) == ["1.0.1"]
+    assert versions(index.touching('application/')) == ["1.0.2"]
+    assert index.touching('ap/') == [] and index.touching('app') == []
+
+def test_authors_include_every_committer(index):
+    assert versions(index.by_author('ALICE')) == ["1.0.0"]
+    assert versions(index.by_author('dev')) == ["1.0.2", "1.0.1", "1.0.0"]
+
+def test_releases_carry_their_sections_and_notes(index):
+    [found] = index.by_version("1.0.0")
+    assert found['sections'] == {'features': ["Added 1.0.0"]}
+    assert index.notes(found) == "Notes for 1.0.0"
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from release_notes import http_cache  # noqa: E402
+from release_notes.github_async import AsyncGitHubClient  # noqa: E402
+from release_notes.http_cache import CachingTransport, HttpResponseCache, is_immutable  # noqa: E402
+from release_notes.instrumentation import CACHE_STATUS_HEADER, scoped_tracer  # noqa: E402
+
+from .conftest import API_URL  # noqa: E402
+
+SHA = 'a' * 40
+OTHER_SHA = 'b' * 40
+
+class FakeGitHub:
+    """Answers with an ETag per path, and 304 when a request already has the current one."""
+
+    def __init__(self):
+        self.version = 1
+        self.requests = []
+
+    def __call__(self, request):
+        etag = f'"{request.url.path}-{self.version}"'
+        self.requests.append((request.url.path, request.headers.get('If-None-Match')))
+        if request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag, 'X-RateLimit-Remaining': '4999'})
+        return httpx.Response(200, headers={'ETag': etag, 'X-RateLimit-Remaining': '4998'},
+                              json={'path': request.url.path, 'version': self.version})
+
+def run_client(tmp_path, github, path, times=1):
+    """GET a path through a fresh client per run, as separate workflow runs would, sharing one cache directory."""
+    cache = HttpResponseCache(tmp_path / 'http', 10 * 1024 * 1024)
+    client = AsyncGitHubClient(None, base_url='https://api.example.test',
+                               transport=CachingTransport(cache, httpx.MockTransport(github)))
+
+    async def fetch():
+        try:
+            return [await client.get_json(path) for _ in range(times)]
+        finally:
+            await client.aclose()
+
+    return asyncio.run(fetch()), client, cache
+
+def test_immutable_paths():
+    assert is_immutable(f"/repos/acme/app/commits/{SHA}")
+    assert is_immutable(f"/repos/acme/app/compare/{SHA}...{OTHER_SHA}")
+    assert is_immutable(f"/repos/acme/app/git/trees/{SHA}")
+    assert not is_immutable("/repos/acme/app/commits/main")
+    assert not is_immutable(f"/repos/acme/app/compare/v1.0...{SHA}")
+    assert not is_immutable("/repos/acme/app/tags")
+
+def test_sha_paths_are_served_without_a_request(tmp_path):
+    github = FakeGitHub()
+    path = f"/repos/acme/app/commits/{SHA}"
+    first, _, _ = run_client(tmp_path, github, path)
+    github.version = 2
+    second, client, cache = run_client(tmp_path, github, path, times=2)
+
+    assert first == second[:1] and second[0] == second[1] == {'path': path, 'version': 1}
+    assert github.requests == [(path, None)]
+    # Responses the cache serves are not charged to the request budget
+    assert client.request_count == 0
+    assert cache.served == 2
+
+def test_other_paths_are_revalidated(tmp_path):
+    github = FakeGitHub()
+    path = "/repos/acme/app/tags"
+    run_client(tmp_path, github, path)
+    revalidated, client, cache = run_client(tmp_path, github, path)
+
+    assert revalidated == [{'path': path, 'version': 1}]
+    assert github.requests == [(path, None), (path, f'"{path}-1"')]
+    assert cache.revalidated == 1 and cache.served == 0
+    # The 304's rate-limit headers are the ones the client sees
+    assert client.rate_limit_remaining == 4999
+
+def test_changed_responses_replace_the_cached_one(tmp_path):
+    github = FakeGitHub()
+    path = "/repos/acme/app/tags"
+    run_client(tmp_path, github, path)
+    github.version = 2
+    changed, _, cache = run_client(tmp_path, github, path)
+    again, _, _ = run_client(tmp_path, github, path)
+
+    assert changed == again == [{'path': path, 'version': 2}]
+    assert cache.fetched == 1
+    assert github.requests[-1] == (path, f'"{path}-2"')
+
+def test_answers_from_the_cache_are_marked(tmp_path):
+    github = FakeGitHub()
+    sha_path = f"/repos/acme/app/commits/{SHA}"
+    run_client(tmp_path, github, sha_path)
+    run_client(tmp_path, github, "/repos/acme/app/tags")
+    transport = CachingTransport(HttpResponseCache(tmp_path / 'http', 10 * 1024 * 1024), httpx.MockTransport(github))
+
+    def status(path):
+        # Entries are keyed by the Accept header the client sends along with the URL
+        request = httpx.Request('GET', f"https://api.example.test{path}",
+                                headers={'Accept': 'application/vnd.github+json'})
+        return asyncio.run(transport.handle_async_request(request)).headers.get(CACHE_STATUS_HEADER)
+
+    assert status(sha_path) == 'hit'
+    assert status("/repos/acme/app/tags") == 'revalidated'
+    assert status("/repos/acme/app/branches") is None
+
+@pytest.fixture
+def pygithub_adapter(monkeypatch):
+    requester = pytest.importorskip('github.Requester').Requester
+    monkeypatch.setattr(http_cache, '_pygithub_adapter_installed', False)
+    yield http_cache.install_pygithub_adapter
+    requester.resetConnectionClasses()
+
+def pygithub_api(path, params):
+    headers = {'X-RateLimit-Remaining': '4321', 'X-RateLimit-Reset': '1700000000'}
+    if path == '/repos/acme/app':
+        return 200, {'full_name': 'acme/app', 'url': f"{API_URL}/repos/acme/app"}, headers
+    return 200, {'sha': SHA, 'url': f"{API_URL}{path}", 'commit': {'message': "Commit"}}, headers
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_pygithub_requests_are_counted_by_the_adapter(pygithub, pygithub_adapter, monkeypatch, tmp_path, cached):
+    if cached:
+        monkeypatch.setenv('RELEASE_NOTES_CACHE_DIR', str(tmp_path))
+    else:
+        monkeypatch.delenv('RELEASE_NOTES_CACHE_DIR', raising=False)
+    pygithub_adapter()
+    github = pygithub(pygithub_api)
+
+    with scoped_tracer('pygithub', attach=False) as tracer:
+        repository = github.get_repo('acme/app')
+        repository.get_commit(SHA)
+        repository.get_commit(SHA)
+
+    counters = tracer.root.counters
+    # With the cache, the second lookup of a commit by SHA is served without a request
+    assert (counters['http_requests'], counters['http_cache_hits']) == ((2, 1) if cached else (3, 0))
+    assert tracer.rate_limit[0] == 4321
@@ -0,0 +1,108 @@
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from release_notes.local_git import LocalGitChangeSource, parse_diff_header_paths, unquote_git_path
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+def git(path, *args):
+    subprocess.run(['git', '-C', str(path), *args], check=True, capture_output=True)
+
+def commit(path, message):
+    git(path, 'add', '-A')
+    git(path, '-c', 'user.name=Dev', '-c', 'user.email=dev@example.com', 'commit', '-q', '-m', message)
+    return subprocess.run(['git', '-C', str(path), 'rev-parse', 'HEAD'], check=True, capture_output=True,
+                          text=True).stdout.strip()
+
+@pytest.fixture
+def repository(tmp_path):
+    git(tmp_path, 'init', '-q')
+    module = "".join(f"line {number}\n" for number in range(20))
+    (tmp_path / 'app').mkdir()
+    (tmp_path / 'app' / 'Users.php').write_text("<?php\n$a = 1;\n")
+    (tmp_path / 'app' / 'Old.php').write_text(module)
+    (tmp_path / 'app' / 'Gone.php').write_text("<?php\nreturn 'gone';\n")
+    base = commit(tmp_path, "Initial commit")
+
+    (tmp_path / 'app' / 'Users.php').write_text("<?php\n$a = 2;\n$b = 3;\n")
+    (tmp_path / 'app' / 'Old.php').rename(tmp_path / 'app' / 'New.php')
+    (tmp_path / 'app' / 'Gone.php').unlink()
+    (tmp_path / 'README.md').write_text("# App\n")
+    (tmp_path / 'composer.lock').write_text("{}\n")
+    (tmp_path / 'app' / 'Café.php').write_text("<?php\nreturn 'café';\n")
+    first = commit(tmp_path, "feat: add users\n\nWith a body")
+    (tmp_path / 'README.md').write_text("# App\n\nDocs\n")
+    head = commit(tmp_path, "docs: more docs")
+    return LocalGitChangeSource(tmp_path), base, first, head
+
+def test_files_of_a_range(repository):
+    source, base, _, head = repository
+    files = {file.filename: file for file in source.iter_files(base, head)}
+    assert {name: (file.status, file.previous_filename, file.additions, file.deletions)
+            for name, file in files.items()} == {
+        'README.md': ('added', None, 3, 0),
+        'app/Café.php': ('added', None, 2, 0),
+        'app/Gone.php': ('removed', None, 0, 2),
+        'app/New.php': ('renamed', 'app/Old.php', 0, 0),
+        'app/Users.php': ('modified', None, 2, 1),
+        'composer.lock': ('added', None, 1, 0),
+    }
+    assert files['app/Users.php'].patch.splitlines()[1:] == [" <?php", "-$a = 1;", "+$a = 2;", "+$b = 3;"]
+    assert len(files['app/Users.php'].sha) == 40
+
+def test_patches_of_skipped_and_settled_files_are_not_kept(repository):
+    source, base, _, head = repository
+    files = {file.filename: file for file in source.iter_files(base, head)}
+    # A lockfile is skipped by path, documentation is settled by a metadata rule
+    assert files['composer.lock'].patch is None
+    assert files['README.md'].patch is None
+    assert files['app/Café.php'].patch is not None
+
+def test_commits_of_a_range(repository):
+    source, base, first, head = repository
+    commits = list(source.get_changes(base, head)['commits'])
+    assert [(commit.sha, commit.commit.message, commit.author.login) for commit in commits] == [
+        (first, "feat: add users\n\nWith a body", "Dev"),
+        (head, "docs: more docs", "Dev"),
+    ]
+    assert source.get_commit_info(head)['message'] == "docs: more docs"
+
+def test_commits_are_looked_up_locally(repository):
+    source, base, _, head = repository
+    assert source.has_commit(head)
+    assert not source.has_commit('0' * 40)
+    assert source.resolve('HEAD') == head
+    assert source.first_parent_commits(base, head)[-1] == head
+
+def test_mode_changes_and_binary_files(repository):
+    source, _, _, head = repository
+    (source.path / 'app' / 'Users.php').chmod(0o755)
+    (source.path / 'logo.bin').write_bytes(b"\x00\x01")
+    after = commit(source.path, "chore: make executable")
+    files = {file.filename: file for file in source.iter_files(head, after)}
+    assert {name: (file.status, file.additions, file.deletions) for name, file in files.items()} == {
+        'app/Users.php': ('changed', 0, 0),
+        'logo.bin': ('added', 0, 0),
+    }
+    (source.path / 'logo.bin').write_bytes(b"\x00\x02")
+    binary = commit(source.path, "chore: new logo")
+    assert [(file.filename, file.status) for file in source.iter_files(after, binary)] == [('logo.bin', 'modified')]
+
+def test_quoted_paths():
+    assert unquote_git_path('"caf\\303\\251 \\"x\\".php"') == 'café "x".php'
+    assert unquote_git_path('plain.php') == 'plain.php'
+    assert parse_diff_header_paths('diff --git a/old name.php b/new name.php') == ('old name.php', 'new name.php')
+    assert parse_diff_header_paths('diff --git "a/tab\\there" "b/tab\\there"') == ('tab\there', 'tab\there')
+
+def test_a_noisy_command_does_not_block_on_stderr(repository):
+    source = repository[0]
+    # Far more warnings than a pipe buffer holds, written before any output
+    noisy = "alias.noisy=!head -c 300000 /dev/zero | tr '\\0' w >&2; echo done"
+    lines = []
+    reader = threading.Thread(target=lambda: lines.extend(source._stream('-c', noisy, 'noisy')), daemon=True)
+    reader.start()
+    reader.join(timeout=30)
+    assert lines == ["done\n"]
@@ -0,0 +1,91 @@
+import pytest
+
+from release_notes import moves
+from release_notes.models import ChangedFile
+from release_notes.moves import edit_patch, pair_moves
+from release_notes.patches import parse_patch
+from release_notes.symbols import FUNCTION, extract_symbols
+
+BODY = [f"line {number} of the module" for number in range(20)]
+
+def changed(filename, status, lines=(), sha=None):
+    file = ChangedFile(filename, status)
+    marker = '-' if status == 'removed' else '+'
+    file.patch = "\n".join([f"@@ -1,{len(lines)} +1,{len(lines)} @@", *(f"{marker}{line}" for line in lines)])
+    file.additions = len(lines) if status != 'removed' else 0
+    file.deletions = len(lines) if status == 'removed' else 0
+    file.sha = sha
+    return file
+
+def summary(files):
+    return [(file.filename, file.status, file.previous_filename, file.additions, file.deletions) for file in files]
+
+@pytest.fixture(params=[moves.SPOOL_MEMORY_BYTES, 1], ids=['memory', 'disk'])
+def spool_size(request, monkeypatch):
+    monkeypatch.setattr(moves, 'SPOOL_MEMORY_BYTES', request.param)
+
+def test_moves_keep_the_place_of_their_added_file_after_the_rest(spool_size):
+    files = [
+        changed('README.md', 'modified', ["docs"]),
+        changed('old/a.php', 'removed', BODY, sha='1' * 40),
+        changed('src/b.php', 'modified', ["code"]),
+        changed('new/a.php', 'added', BODY, sha='1' * 40),
+        changed('old/c.php', 'removed', BODY[:10] + ["gone"]),
+        changed('new/c.php', 'added', BODY[:10] + ["new"]),
+        changed('tmp.txt', 'removed', ["scratch"]),
+        changed('app.js', 'added', ["console.log(1)"]),
+        changed('routes/web.php', 'modified', ["route"]),
+    ]
+    assert summary(pair_moves(files)) == [
+        ('README.md', 'modified', None, 1, 0),
+        ('src/b.php', 'modified', None, 1, 0),
+        ('routes/web.php', 'modified', None, 1, 0),
+        ('new/a.php', 'renamed', 'old/a.php', 0, 0),
+        ('new/c.php', 'renamed', 'old/c.php', 1, 1),
+        ('tmp.txt', 'removed', None, 0, 1),
+        ('app.js', 'added', None, 1, 0),
+    ]
+
+def test_moves_carry_only_the_edits():
+    [move] = pair_moves([
+        changed('old/c.php', 'removed', BODY[:10] + ["gone"]),
+        changed('new/c.php', 'added', BODY[:10] + ["new"]),
+    ])
+    assert move.patch == "@@ -0,1 +0,1 @@\n-gone\n+new"
+
+def test_only_removed_and_added_files_are_held_back():
+    first = changed('a.php', 'modified', ["a"])
+    later = changed('c.php', 'renamed', ["c"])
+    moved = pair_moves(iter([first, changed('b.php', 'added', ["b"]), later]))
+    assert next(moved) is first
+    assert next(moved) is later
+    assert summary(moved) == [('b.php', 'added', None, 1, 0)]
+
+def test_one_sided_streams_are_not_paired(monkeypatch):
+    monkeypatch.setattr(moves, 'find_moves', lambda removed, added: pytest.fail("nothing to pair"))
+    files = [changed('a.php', 'added', BODY), changed('c.php', 'added', BODY), changed('b.php', 'modified', ["b"])]
+    assert summary(pair_moves(files)) == summary([files[2], files[0], files[1]])
+
+def test_candidates_keep_no_patch_text():
+    candidate = moves.MoveCandidate(0, changed('a.php', 'added', BODY), '+')
+    assert not hasattr(candidate, 'patch')
+    assert candidate.signature is not None and candidate.sha is None
+
+def test_small_files_only_pair_when_identical():
+    files = [changed('old.php', 'removed', ["a", "b"]), changed('new.php', 'added', ["a", "b"])]
+    assert [file.status for file in pair_moves(files)] == ['removed', 'added']
+
+def test_edit_patch_matches_lines_as_a_multiset():
+    assert edit_patch(["a", "b", "a"], ["b", "a", "c"]) == ("@@ -0,1 +0,1 @@\n-a\n+c", 1, 1)
+    assert edit_patch(["a"], ["a"]) == (None, 0, 0)
+
+def test_the_edits_of_a_move_are_read_without_scopes():
+    old = ["<?php", "class Invoice {", "    public function total() {", "        return 1;", "    }",
+           "    public function tax() {", "        return 0;", "    }", "}"]
+    new = [line.replace("return 0;", "return 0.2;") for line in old]
+    new.insert(5, "    public function sum() {}")
+    [move] = pair_moves([changed('old/Invoice.php', 'removed', old), changed('app/Invoice.php', 'added', new)])
+    changes = extract_symbols(parse_patch(move.patch), move.filename)
+    # The lines are out of order, so no enclosing function or class is taken to have changed
+    assert changes.added == {FUNCTION: ['sum']}
+    assert not changes.removed and not changes.changed
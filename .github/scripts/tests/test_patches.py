@@ -0,0 +1,66 @@
+from release_notes.patches import parse_patch
+
+PATCH = "\n".join([
+    "diff --git a/app.py b/app.py",
+    "+++ b/app.py",
+    "@@ -10,4 +10,5 @@ class Service:",
+    "     def load(self, key):",
+    "-        return self.cache[key]",
+    "+        return self.cache.get(key)",
+    "+        # fallback",
+    "@@ not a header",
+    "     pass",
+    "@@ -40 +41,2 @@",
+    "-old",
+    "+new",
+    "+newer",
+    "\\ No newline at end of file",
+])
+
+def test_hunks_are_split_at_headers():
+    hunks = parse_patch(PATCH).hunks
+    assert [(h.old_start, h.old_count, h.new_start, h.new_count, h.context) for h in hunks] == [
+        (10, 4, 10, 5, "class Service:"),
+        (40, 1, 41, 2, ""),
+    ]
+    assert hunks[0].lines == [
+        (' ', "    def load(self, key):"),
+        ('-', "        return self.cache[key]"),
+        ('+', "        return self.cache.get(key)"),
+        ('+', "        # fallback"),
+        # A line starting @@ that is no header is a context line of the hunk it is in
+        (' ', "@ not a header"),
+        (' ', "    pass"),
+    ]
+
+def test_no_newline_markers_are_not_lines():
+    hunk = parse_patch(PATCH).hunks[1]
+    assert hunk.lines == [('-', "old"), ('+', "new"), ('+', "newer")]
+    assert hunk.raw[-1] == "\\ No newline at end of file"
+
+def test_changed_lines_are_numbered_per_side():
+    first, second = parse_patch(PATCH).hunks
+    assert first.added == [(11, "        return self.cache.get(key)"), (12, "        # fallback")]
+    assert first.removed == [(11, "        return self.cache[key]")]
+    assert second.added == [(41, "new"), (42, "newer")]
+    assert second.removed == [(40, "old")]
+
+def test_added_and_removed_cover_the_whole_patch():
+    parsed = parse_patch(PATCH)
+    assert parsed.added == ["++ b/app.py", "        return self.cache.get(key)", "        # fallback", "new", "newer"]
+    assert parsed.removed == ["        return self.cache[key]", "old"]
+
+def test_line_endings_follow_splitlines():
+    parsed = parse_patch("@@ -1 +1 @@\r\n-a\r\n+b\r\n")
+    assert parsed.hunks[0].lines == [('-', "a"), ('+', "b")]
+    assert parsed.lower == "@@ -1 +1 @@\r\n-a\r\n+b\r\n"
+
+def test_find_added_matches_at_the_start_of_added_lines():
+    import re
+
+    parsed = parse_patch("@@ -1 +1,2 @@\n+Route::get('/a')\n+ // Route::post('/b')\n-Route::put('/c')")
+    assert parsed.find_added(re.compile(r"\s*Route::(\w+)")) == ["get"]
+
+def test_missing_patch_parses_empty():
+    parsed = parse_patch(None)
+    assert parsed.text == "" and parsed.hunks == [] and parsed.added == []
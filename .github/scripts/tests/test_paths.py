@@ -0,0 +1,50 @@
+import pytest
+
+from release_notes.models import ChangedFile
+from release_notes.paths import PathClassifier, parse_gitattributes, skip_reason
+
+def changed(filename, status='added', additions=1):
+    file = ChangedFile(filename, status)
+    file.additions = additions
+    return file
+
+@pytest.mark.parametrize('filename, reason', [
+    ('composer.lock', 'lockfile'),
+    ('packages/web/yarn.lock', 'lockfile'),
+    ('vendor/acme/lib/Api.php', 'vendored'),
+    ('src/node_modules/left-pad/index.js', 'vendored'),
+    ('public/build/app.js', 'generated'),
+    ('themes/public/build/app.js', None),
+    ('dist/app.min.js', 'generated'),
+    ('release_note.txt', 'generated'),
+    ('img/logo.png', 'binary'),
+    ('app/Http/Controllers/UserController.php', None),
+])
+def test_skip_lists(filename, reason):
+    assert skip_reason(changed(filename)) == reason
+
+def test_files_without_changed_lines_are_binary_unless_only_their_mode_changed():
+    assert skip_reason(changed('app/logo.bin', 'modified', additions=0)) == 'binary'
+    assert skip_reason(changed('bin/deploy', 'changed', additions=0)) == 'mode'
+    assert skip_reason(changed('app/Empty.php', 'renamed', additions=0)) is None
+
+def test_gitattributes_override_the_skip_lists():
+    classifier = PathClassifier(
+        {'vendored': ['vendor/']},
+        ignore_patterns=['*.snap'],
+        gitattributes=parse_gitattributes("\n".join([
+            "# comments are ignored",
+            "resources/js/generated/* linguist-generated",
+            "vendor/acme/* linguist-vendored=false",
+            "*.bin binary",
+            "docs/* linguist-generated",
+            "docs/guide.md !linguist-generated",
+        ])),
+    )
+    assert classifier.classify('resources/js/generated/api.ts') == 'generated'
+    assert classifier.classify('vendor/acme/Api.php') is None
+    assert classifier.classify('vendor/other/Api.php') == 'vendored'
+    assert classifier.classify('assets/model.bin') == 'binary'
+    assert classifier.classify('tests/__snapshots__/view.snap') == 'ignored'
+    assert classifier.classify('docs/index.md') == 'generated'
+    assert classifier.classify('docs/guide.md') is None
@@ -0,0 +1,35 @@
+import pytest
+
+from release_notes.pipeline import analyze_release, generate_release_notes
+from release_notes.store import ReleaseNotesStore
+
+from .stubs import StubChangeSource
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_CACHE_DIR', raising=False)
+    monkeypatch.setenv('RELEASE_NOTES_WORKERS', '1')
+
+def make_store(tmp_path):
+    return ReleaseNotesStore(tmp_path / 'store', tmp_path / 'release_note.txt')
+
+def test_a_version_tag_base_names_the_current_version(tmp_path):
+    analysis = analyze_release('head', 'v2.3.4', source=StubChangeSource(tag='v9.0.0'), store=make_store(tmp_path))
+    assert (analysis['current_version'], analysis['version']) == ("2.3.4", "2.3.5")
+
+def test_other_bases_continue_from_the_last_stored_release(tmp_path):
+    store = make_store(tmp_path)
+    source = StubChangeSource(tag='v9.0.0')
+    first = generate_release_notes('one', 'main', source=source, store=store, compose=False)
+    second = analyze_release('two', 'one', source=source, store=store)
+    assert first['version'] == store.last_entry()['version'] == second['current_version']
+    assert second['version'] == "9.0.2"
+
+def test_without_stored_releases_the_last_tag_is_used(tmp_path):
+    analysis = analyze_release('head', 'main', source=StubChangeSource(tag='v1.4.0'), store=make_store(tmp_path))
+    assert analysis['current_version'] == "1.4.0"
+
+def test_without_any_version_the_default_is_used(tmp_path):
+    analysis = analyze_release('head', 'main', source=StubChangeSource(tag='nightly'), store=make_store(tmp_path))
+    assert analysis['current_version'] == "1.0.0"
@@ -0,0 +1,67 @@
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from release_notes import github_async  # noqa: E402
+from release_notes.github_async import AsyncGitHubChangeSource, AsyncGitHubClient  # noqa: E402
+from release_notes.recording import load_recording, recorded_range  # noqa: E402
+
+from .stubs import REPOSITORY, FakeGitHub, commit_json, file_json  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.delenv('RELEASE_NOTES_CACHE_DIR', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_RECORD', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_REPLAY', raising=False)
+    monkeypatch.setattr(github_async, 'COMPARE_PAGE_SIZE', 2)
+
+def use_network(monkeypatch, handler):
+    """Stand handler in for the connection pool the client opens when it has no transport of its own."""
+    mock = httpx.MockTransport(handler)
+
+    async def handle_async_request(transport, request):
+        return await mock.handle_async_request(request)
+
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, 'handle_async_request', handle_async_request)
+
+def read_release(base, head):
+    source = AsyncGitHubChangeSource(REPOSITORY, AsyncGitHubClient('token', base_url='https://api.example.test'))
+    try:
+        changes = source.get_changes(base, head)
+        files = [(file.filename, file.status, file.additions, file.patch) for file in changes['files']]
+        commits = [(commit.sha, commit.commit.message) for commit in changes['commits']]
+        return files, commits, source.get_commit_info(head)
+    finally:
+        source.close()
+
+def test_a_replay_reads_back_what_was_recorded(tmp_path, monkeypatch):
+    archive = tmp_path / 'release.jsonl.gz'
+    github = FakeGitHub([commit_json(f"c{number}") for number in range(5)],
+                        [file_json('app/Users.php', patch="@@ -1 +1 @@\n-a\n+b"), file_json('README.md', 'added')], {})
+    use_network(monkeypatch, github)
+    monkeypatch.setenv('RELEASE_NOTES_RECORD', str(archive))
+    recorded = read_release('base', 'c4')
+    # Three compare pages of two commits, and the head commit
+    assert len(github.requests) == 4
+
+    def offline(request):
+        raise AssertionError(f"replay requested {request.url} from the network")
+
+    use_network(monkeypatch, offline)
+    monkeypatch.delenv('RELEASE_NOTES_RECORD')
+    monkeypatch.setenv('RELEASE_NOTES_REPLAY', str(archive))
+    assert read_release('base', 'c4') == recorded
+    assert [sha for sha, _ in recorded[1]] == ['c0', 'c1', 'c2', 'c3', 'c4']
+    assert recorded_range(archive) == (REPOSITORY, 'base', 'c4')
+    assert len(load_recording(archive)[1]) == 4
+
+def test_a_replay_fails_on_requests_it_has_no_answer_to(tmp_path, monkeypatch):
+    archive = tmp_path / 'release.jsonl.gz'
+    use_network(monkeypatch, FakeGitHub([commit_json('c0')], [], {}))
+    monkeypatch.setenv('RELEASE_NOTES_RECORD', str(archive))
+    read_release('base', 'c0')
+
+    monkeypatch.delenv('RELEASE_NOTES_RECORD')
+    monkeypatch.setenv('RELEASE_NOTES_REPLAY', str(archive))
+    with pytest.raises(SystemExit):
+        read_release('base', 'other')
@@ -0,0 +1,169 @@
+import json
+
+import pytest
+
+from release_notes import rules
+from release_notes.patches import parse_patch
+from release_notes.rules import RuleEngine
+
+CONFIG = {
+    'sections': [{'key': 'api', 'title': "API"}, {'key': 'bugs', 'title': "Bugs"}, {'key': 'other', 'title': "Other"}],
+    'file_sets': {
+        'php': ['*.php'],
+        'migrations': {'patterns': ['*Migration*'], 'ignore_case': True},
+        'routes': ['routes/*'],
+    },
+    'case_sensitive_keywords': ['@livewire'],
+    'rules': [
+        {'stage': 'metadata', 'files': 'routes', 'statuses': ['modified'], 'max_additions': 0, 'bump': 'major',
+         'message': "Removed routes"},
+        {'stage': 'bump', 'when': [['route::delete', 'dropcolumn']], 'bump': 'major'},
+        {'stage': 'bump', 'when': [['route::']], 'statuses': ['modified'], 'bump': 'minor'},
+        {'stage': 'notes', 'section': 'api', 'files': 'php', 'group': 'api', 'when': [['api'], ['response']],
+         'message': "Improved API responses in {basename}"},
+        {'stage': 'notes', 'section': 'api', 'files': 'php', 'group': 'api', 'when': [['api']],
+         'message': "Modified API in {basename}"},
+        {'stage': 'notes', 'section': 'bugs', 'when': [['fix', 'bug']], 'message': "Fixed issues in {filename}"},
+        {'stage': 'notes', 'section': 'other', 'files': 'migrations', 'when': [['schema']],
+         'message': "Schema change in {filename}"},
+        {'stage': 'ui', 'section': 'other', 'when': [['@livewire']], 'message': "Livewire components"},
+        {'stage': 'ui', 'section': 'other', 'when': [], 'message': "Always"},
+    ],
+}
+
+PATCH = "\n".join([
+    "@@ -1,3 +1,4 @@ class UserController",
+    " public function index()",
+    "-    return Api::get('/users');",
+    "+    return Api::get('/users')->Response(); // fix",
+    "+    @Livewire('table')",
+])
+
+def messages(engine, stage, patch, filename, status=None):
+    return [message for _, message in engine.evaluate(stage, parse_patch(patch), filename, status)]
+
+def bumps(engine, patch, filename, status=None):
+    return [rule.bump for rule, _ in engine.fired('bump', parse_patch(patch), filename, status)]
+
+@pytest.fixture(params=['substring', 'scan'])
+def engine(request, monkeypatch):
+    """The engine both with lazy substring lookups and with the one-pass keyword scan."""
+    if request.param == 'scan':
+        monkeypatch.setattr(rules, 'SUBSTRING_SEARCH_LIMIT', 0)
+    return RuleEngine(CONFIG)
+
+def test_rules_fire_in_table_order_and_settle_groups(engine):
+    assert messages(engine, 'notes', PATCH, 'app/UserController.php', 'modified') == [
+        "Improved API responses in UserController.php",
+        "Fixed issues in app/UserController.php",
+    ]
+
+def test_file_globs_limit_rules(engine):
+    assert messages(engine, 'notes', PATCH, 'app/user.js', 'modified') == ["Fixed issues in app/user.js"]
+
+def test_ignore_case_globs_match_any_case(engine):
+    patch = "@@ -1 +1 @@\n+Schema::create('users')"
+    assert messages(engine, 'notes', patch, 'database/2024_CreateUsersMIGRATION.php', 'added') == [
+        "Schema change in database/2024_CreateUsersMIGRATION.php"
+    ]
+    assert messages(engine, 'notes', patch, 'database/create_users.js', 'added') == []
+
+def test_statuses_limit_rules(engine):
+    patch = "@@ -1 +1 @@\n+Route::get('/users')"
+    assert bumps(engine, patch, 'routes/web.php', 'modified') == ['minor']
+    assert bumps(engine, patch, 'routes/web.php', 'added') == []
+
+def test_keywords_are_matched_case_insensitively_unless_listed(engine):
+    assert messages(engine, 'ui', PATCH, 'resources/view.blade.php') == ["Always"]
+    assert messages(engine, 'ui', "@@ -1 +1 @@\n+@livewire('table')", 'resources/view.blade.php') == [
+        "Livewire components", "Always"
+    ]
+
+def test_contained_keywords_are_found(engine):
+    patch = "@@ -1 +1 @@\n+Route::delete('/users');"
+    assert bumps(engine, patch, 'routes/api.php', 'modified') == ['major', 'minor']
+
+def test_the_first_bump_that_fires_wins(engine):
+    patch = "@@ -1 +1 @@\n+Route::delete('/users');"
+    assert engine.bump(parse_patch(patch), 'routes/api.php', 'modified') == 'major'
+    assert engine.bump(parse_patch("@@ -1 +1 @@\n+Route::get('/');"), 'routes/api.php', 'modified') == 'minor'
+    # Only the rules that can call for a major bump are looked at
+    assert engine.bump(parse_patch("@@ -1 +1 @@\n+Route::get('/');"), 'routes/api.php', 'modified',
+                       until='major') is None
+
+def test_overlapping_keywords_are_found(monkeypatch):
+    monkeypatch.setattr(rules, 'SUBSTRING_SEARCH_LIMIT', 0)
+    engine = RuleEngine({
+        'sections': [{'key': 'other', 'title': "Other"}],
+        'rules': [
+            {'stage': 'notes', 'section': 'other', 'when': [['api']], 'message': "api"},
+            {'stage': 'notes', 'section': 'other', 'when': [['pipeline']], 'message': "pipeline"},
+        ],
+    })
+    # 'pipeline' starts inside the 'api' match, where a plain non-overlapping pass would step over it
+    assert messages(engine, 'notes', "@@ -1 +1 @@\n+apipeline", 'ci.yml') == ["api", "pipeline"]
+
+def test_keywords_are_searched_once_per_patch(engine):
+    parsed = parse_patch(PATCH)
+    engine.evaluate('notes', parsed, 'app/UserController.php', 'modified')
+    assert parsed.hits['api'] is True
+    parsed.hits['fix'] = False
+    parsed.hits['bug'] = False
+    assert engine.evaluate('notes', parsed, 'app/UserController.php', 'modified') == [
+        ('api', "Improved API responses in UserController.php")
+    ]
+
+def test_applicable_rules_are_shared_by_files_with_the_same_profile(engine):
+    first = engine.applicable('app/A.php', 'modified')
+    assert engine.applicable('app/B.php', 'modified') is first
+    assert engine.applicable('app/A.php', 'added') is not first
+    assert engine.applicable('app/a.js', 'modified') is not first
+
+def test_settle_matches_path_status_and_counts(engine):
+    assert engine.settle('routes/web.php', 'modified', 0, 5).message == "Removed routes"
+    assert engine.settle('routes/web.php', 'modified', 1, 5) is None
+    assert engine.settle('routes/web.php', 'modified') is None
+    assert engine.settle('app/web.php', 'modified', 0, 5) is None
+
+def test_trie_pattern_prefers_the_longest_keyword():
+    import re
+
+    pattern = re.compile(rules.trie_pattern(['route', 'route::', 'router']))
+    assert pattern.findall("route:: router route") == ['route::', 'router', 'route']
+
+def test_default_rule_table_compiles():
+    engine = rules.load_rule_engine()
+    assert [key for key, _ in engine.sections][-1] == 'other'
+    assert engine.rules['metadata']
+
+def test_default_bump_rules_carry_a_bump_and_no_message():
+    engine = rules.load_rule_engine()
+    assert {rule.bump for rule in engine.rules['bump']} == {'major', 'minor'}
+    assert all(rule.message is None for rule in engine.rules['bump'])
+
+def test_the_scan_finds_what_substring_lookups_find(monkeypatch):
+    """Both keyword paths give the same results for the shipped rule table over the benchmark patches."""
+    from release_notes.analysis import rule_status
+    from release_notes.benchmark import build_fixture
+
+    files = build_fixture('100-files')['files']
+    config = json.loads(rules.DEFAULT_RULES_PATH.read_text())
+
+    def results(limit):
+        monkeypatch.setattr(rules, 'SUBSTRING_SEARCH_LIMIT', limit)
+        engine = RuleEngine(config)
+        outcomes = []
+        for file in files:
+            parsed = parse_patch(file.patch)
+            status = rule_status(file)
+            outcomes.append([engine.evaluate(stage, parsed, file.filename, status)
+                             for stage in ('ui', 'summary', 'notes')])
+            outcomes.append(engine.bump(parse_patch(file.patch), file.filename, status))
+            outcomes.append(engine.bump(parse_patch(file.patch), file.filename, status, until='major'))
+        return outcomes, engine.applicable(files[0].filename, rule_status(files[0])).matcher
+
+    substring, no_matcher = results(rules.SUBSTRING_SEARCH_LIMIT)
+    scanned, matcher = results(0)
+    assert no_matcher is None and matcher is not None
+    assert scanned == substring
+    assert any(any(outcome) for outcome in substring[::3])
@@ -0,0 +1,69 @@
+import json
+import threading
+
+import pytest
+
+from release_notes.server import ReleaseNotesService, WebhookServer, post_webhook, push_range, wait_until_idle
+
+from .stubs import StubChangeSource
+
+SECRET = 'webhook-secret'
+ZERO_SHA = '0' * 40
+
+def push(before, after, branch='main', message="feat: add users"):
+    return json.dumps({
+        'ref': f"refs/heads/{branch}",
+        'before': before,
+        'after': after,
+        'repository': {'full_name': 'acme/app'},
+        'head_commit': {'id': after, 'message': message},
+    }).encode()
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_CACHE_DIR', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_BASE', raising=False)
+    monkeypatch.delenv('RELEASE_NOTES_BRANCHES', raising=False)
+    monkeypatch.setenv('RELEASE_NOTES_WORKERS', '1')
+    monkeypatch.setenv('RELEASE_NOTES_STORE', str(tmp_path / 'release-notes'))
+
+    service = ReleaseNotesService('acme/app', coalesce_seconds=0.5)
+    service.source = StubChangeSource()
+    service.start()
+    server = WebhookServer(service, port=0, secret=SECRET)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.stop()
+
+def test_a_burst_of_pushes_becomes_one_generation(server):
+    shas = [str(number) * 40 for number in range(1, 5)]
+    for before, after in zip(shas, shas[1:]):
+        status, response = post_webhook(server.url, push(before, after), secret=SECRET)
+        assert status == 202 and response['accepted']
+
+    status = wait_until_idle(server.url, timeout=30)
+    assert [(generation['status'], generation['base'], generation['head'], generation['pushes'])
+            for generation in status['generations']] == [('ok', shas[0], shas[-1], 3)]
+    assert server.service.source.ranges == [(shas[0], shas[-1])]
+
+def test_skip_ci_and_other_branches_are_not_queued(server):
+    _, skipped = post_webhook(server.url, push('1' * 40, '2' * 40, message="Update release notes [skip ci]"),
+                              secret=SECRET)
+    _, feature = post_webhook(server.url, push('1' * 40, '2' * 40, branch='feature'), secret=SECRET)
+    assert not skipped['accepted'] and "[skip ci]" in skipped['message']
+    assert not feature['accepted'] and "not a release branch" in feature['message']
+    assert wait_until_idle(server.url, timeout=5)['completed'] == 0
+
+def test_deliveries_with_a_bad_signature_are_refused(server):
+    status, _ = post_webhook(server.url, push('1' * 40, '2' * 40), secret='wrong')
+    assert status == 401
+    assert server.service.status()['pending'] == []
+
+def test_a_branch_creation_push_has_no_base():
+    assert push_range(json.loads(push(ZERO_SHA, '2' * 40)), {'main'}) == (('main', None, '2' * 40), None)
+    assert push_range(json.loads(push('1' * 40, ZERO_SHA)), {'main'}) == (None, "main was deleted")
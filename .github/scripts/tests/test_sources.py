@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+from release_notes import github_source
+from release_notes.models import ChangedFile
+from release_notes.sources import merge_commit_files
+
+from .conftest import API_URL
+
+def changed(filename, status='modified', additions=1, deletions=0, patch=None, previous_filename=None):
+    file = ChangedFile(filename, status, previous_filename)
+    file.additions = additions
+    file.deletions = deletions
+    file.changes = additions + deletions
+    file.patch = patch
+    file.sha = f"{filename}-{status}-{additions}"
+    return file
+
+def summary(files):
+    return [(file.filename, file.status, file.previous_filename, file.additions, file.deletions, file.patch)
+            for file in files]
+
+def test_files_changed_by_several_commits_are_listed_once():
+    files = merge_commit_files([
+        changed('a.py', additions=2, patch="+a"),
+        changed('b.py'),
+        changed('a.py', additions=3, deletions=1, patch="+b"),
+    ])
+    assert summary(files) == [
+        ('a.py', 'modified', None, 5, 1, "+a\n+b"),
+        ('b.py', 'modified', None, 1, 0, None),
+    ]
+
+def test_added_then_removed_files_are_left_out():
+    files = merge_commit_files([
+        changed('tmp.py', 'added'),
+        changed('a.py'),
+        changed('tmp.py', 'modified'),
+        changed('tmp.py', 'removed'),
+    ])
+    assert summary(files) == [('a.py', 'modified', None, 1, 0, None)]
+
+def test_net_status():
+    files = merge_commit_files([
+        changed('new.py', 'added'),
+        changed('new.py', 'modified'),
+        changed('gone.py', 'modified'),
+        changed('gone.py', 'removed'),
+        changed('back.py', 'removed'),
+        changed('back.py', 'added'),
+    ])
+    assert [(file.filename, file.status) for file in files] == [
+        ('new.py', 'added'), ('gone.py', 'removed'), ('back.py', 'modified'),
+    ]
+
+def test_renames_carry_earlier_changes_along():
+    files = merge_commit_files([
+        changed('old.py', additions=1),
+        changed('mid.py', 'renamed', additions=2, previous_filename='old.py'),
+        changed('new.py', 'renamed', additions=0, previous_filename='mid.py'),
+        changed('new.py', additions=4),
+        changed('made.py', 'added'),
+        changed('kept.py', 'renamed', previous_filename='made.py'),
+        changed('back.py', 'renamed', previous_filename='start.py'),
+        changed('start.py', 'renamed', previous_filename='back.py'),
+    ])
+    assert summary(files) == [
+        ('new.py', 'renamed', 'old.py', 7, 0, None),
+        ('kept.py', 'added', None, 2, 0, None),
+        ('start.py', 'modified', None, 2, 0, None),
+    ]
+
+def test_truncated_comparisons_are_netted_from_their_commits(monkeypatch):
+    monkeypatch.setattr(github_source, 'COMPARE_FILE_LIMIT', 2)
+    commit_files = {
+        'one': [changed('a.py', additions=2), changed('b.py')],
+        'merge': [changed('a.py', additions=2)],
+        'two': [changed('a.py', additions=3)],
+    }
+    repo = SimpleNamespace(get_commit=lambda sha: SimpleNamespace(files=commit_files[sha]))
+    comparison = SimpleNamespace(
+        files=[changed('a.py'), changed('b.py')],
+        commits=[
+            SimpleNamespace(sha='one', parents=['base']),
+            SimpleNamespace(sha='merge', parents=['one', 'side']),
+            SimpleNamespace(sha='two', parents=['merge']),
+        ],
+    )
+    files = github_source.iter_compare_files(repo, comparison, comparison.commits)
+    assert [(file.filename, file.additions) for file in files] == [('a.py', 5), ('b.py', 1)]
+
+def test_untruncated_comparisons_are_listed_as_they_are():
+    files = [changed('a.py'), changed('a.py')]
+    comparison = SimpleNamespace(files=files, commits=[])
+    assert list(github_source.iter_compare_files(None, comparison, [])) == files
+
+def test_a_renamed_then_removed_file_is_removed_under_its_original_name():
+    files = merge_commit_files([
+        changed('old.py', additions=1),
+        changed('new.py', 'renamed', previous_filename='old.py'),
+        changed('new.py', 'removed', additions=0, deletions=3),
+        changed('old.py', 'added'),
+    ])
+    assert [(file.filename, file.status, file.previous_filename) for file in files] == [
+        ('old.py', 'modified', None),
+    ]
+    [removed] = merge_commit_files([
+        changed('a.py', 'renamed', previous_filename='start.py'),
+        changed('b.py', 'renamed', previous_filename='a.py'),
+        changed('b.py', 'removed'),
+    ])
+    assert (removed.filename, removed.status, removed.previous_filename) == ('start.py', 'removed', None)
+
+def commit_json(sha):
+    return {'sha': sha, 'parents': [{'sha': f"{sha}-parent"}], 'commit': {'message': f"Commit {sha}"}}
+
+def test_commits_past_the_unpaginated_compare_are_paged_through(monkeypatch, pygithub):
+    monkeypatch.setattr(github_source, 'COMPARE_PAGE_SIZE', 2)
+    commits = [commit_json(f"c{number}") for number in range(5)]
+    requests = []
+
+    def github(path, params):
+        requests.append((path, params))
+        if path == '/repos/acme/app':
+            return 200, {'url': f"{API_URL}/repos/acme/app", 'full_name': 'acme/app'}, {}
+        # Unpaginated, the compare endpoint lists only the first commits of a long range
+        if 'per_page' not in params:
+            return 200, {'total_commits': 5, 'commits': commits[:3], 'files': []}, {}
+        page, per_page = int(params.get('page', 1)), int(params['per_page'])
+        headers = {}
+        if page * per_page < len(commits):
+            headers['Link'] = f'<{API_URL}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+        return 200, {'total_commits': 5, 'commits': commits[(page - 1) * per_page:page * per_page]}, headers
+
+    repo = pygithub(github).get_repo('acme/app')
+    changes = github_source.get_changes(repo, 'base', 'head')
+    assert [commit.sha for commit in changes['commits']] == ['c0', 'c1', 'c2', 'c3', 'c4']
+    assert list(changes['files']) == []
+    assert [params.get('page') for path, params in requests if '/compare/' in path] == [None, None, '2', '3']
@@ -0,0 +1,95 @@
+import builtins
+import os
+
+from release_notes import store as store_module
+from release_notes.store import RELEASE_SEPARATOR, ReleaseNotesStore
+
+def make_store(tmp_path):
+    return ReleaseNotesStore(tmp_path / 'release-notes', combined_path=tmp_path / 'release_note.txt')
+
+def test_releases_are_numbered_in_order(tmp_path):
+    store = make_store(tmp_path)
+    first = store.append("one", {'version': "1.0.0"}, record={'sections': {}})
+    second = store.append("two")
+    assert (first['seq'], second['seq']) == (1, 2)
+    assert store.last_entry() == second
+    assert [entry['seq'] for entry in store.entries()] == [1, 2]
+    assert store.read_fragment(second) == "two"
+    assert store.read_record(first) == {'sections': {}}
+    assert store.read_record(second) is None
+
+def test_compose_writes_newest_first_above_legacy_history(tmp_path):
+    (tmp_path / 'release_note.txt').write_text("legacy")
+    store = make_store(tmp_path)
+    store.append("one")
+    store.append("two")
+    store.compose()
+    assert (tmp_path / 'release_note.txt').read_text() == RELEASE_SEPARATOR.join(["two", "one", "legacy"])
+
+def test_compose_leaves_the_store_untouched(tmp_path):
+    store = make_store(tmp_path)
+    store.append("one")
+    store.compose(tmp_path / 'copy.txt')
+    assert (tmp_path / 'copy.txt').read_text() == "one" + RELEASE_SEPARATOR
+    assert not (tmp_path / 'release_note.txt').exists()
+    assert store.last_entry()['seq'] == 1
+
+class CountingFile:
+    """A file that adds the bytes read from and written to it to shared counts."""
+
+    def __init__(self, file, counts):
+        self._file = file
+        self._counts = counts
+
+    def read(self, *args):
+        data = self._file.read(*args)
+        self._counts['read'] += len(data)
+        return data
+
+    def write(self, data):
+        self._counts['written'] += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._file.__exit__(*exc_info)
+
+def append_cost(tmp_path, monkeypatch, history):
+    """Return the files one append opens and the bytes it moves, over a history of that many releases."""
+    tmp_path.mkdir()
+    (tmp_path / 'release_note.txt').write_text("legacy\n" * history)
+    store = make_store(tmp_path)
+    store.append("first")
+    with open(store.index_path, 'a') as index:
+        for sequence in range(2, history + 1):
+            index.write(f'{{"seq":{sequence},"fragment":"fragments/{sequence:06d}.txt","version":"1.0.{sequence}"}}\n')
+
+    counts = {'read': 0, 'written': 0, 'opened': 0}
+    opened = []
+
+    def counting_open(path, *args, **kwargs):
+        counts['opened'] += 1
+        opened.append(os.path.relpath(path, tmp_path))
+        return CountingFile(builtins.open(path, *args, **kwargs), counts)
+
+    monkeypatch.setattr(store_module, 'open', counting_open, raising=False)
+    entry = store.append("notes " * 100, {'version': "2.0.0"}, record={'sections': {}})
+    monkeypatch.delattr(store_module, 'open')
+    # Besides the lock and the index, only the new release's own files are written
+    assert [path for path in opened if f"{entry['seq']:06d}" not in path] == [
+        'release-notes/.lock', 'release-notes/index.jsonl', 'release-notes/index.jsonl'
+    ]
+    return entry, counts
+
+def test_append_cost_does_not_depend_on_history_size(tmp_path, monkeypatch):
+    short_entry, short = append_cost(tmp_path / 'short', monkeypatch, 1000)
+    long_entry, long = append_cost(tmp_path / 'long', monkeypatch, 9000)
+    assert (short_entry['seq'], long_entry['seq']) == (1001, 9001)
+    assert short == long
+    # Only the tail of the index is read
+    assert short['read'] <= 4096
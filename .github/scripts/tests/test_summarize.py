@@ -0,0 +1,116 @@
+import pytest
+
+pytest.importorskip('openai')
+
+from release_notes.cache import AnalysisCache  # noqa: E402
+from release_notes.models import ChangedFile  # noqa: E402
+from release_notes.openai_stub import OpenAIStubServer  # noqa: E402
+from release_notes.patches import parse_patch  # noqa: E402
+from release_notes.summarize import ExcerptSelector, file_excerpt, summarize_release  # noqa: E402
+
+PATCH = "\n".join([
+    "@@ -1,3 +1,4 @@ class Invoice",
+    " {",
+    "+    public function total() {",
+    "+        return $this->sum;",
+    "     }",
+])
+
+def excerpts_for(*filenames):
+    selector = ExcerptSelector(budget=100000)
+    for filename in filenames:
+        selector.add(filename, file_excerpt(ChangedFile(filename), parse_patch(PATCH)))
+    return selector.selected()
+
+@pytest.fixture(scope='module')
+def stub_server():
+    server = OpenAIStubServer().start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def stub(stub_server):
+    stub_server.requests = 0
+    stub_server.faults = []
+    return stub_server
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    """Retry at once rather than after the OpenAI client's backoff."""
+    from openai._base_client import BaseClient
+
+    monkeypatch.setattr(BaseClient, '_calculate_retry_timeout', lambda *args, **kwargs: 0)
+
+def settings_for(stub, batch_tokens=3000):
+    return {'api_key': 'test', 'base_url': stub.base_url, 'model': 'stub', 'concurrency': 2,
+            'batch_tokens': batch_tokens}
+
+def test_excerpts_name_the_file_and_keep_declarations():
+    [[filename, text]] = excerpts_for('app/Invoice.php')
+    assert filename == 'app/Invoice.php'
+    assert text.splitlines()[:3] == [
+        "File: app/Invoice.php (modified, +0/-0)",
+        "@@ class Invoice",
+        "+public function total() {",
+    ]
+
+def test_selector_drops_the_least_significant_past_the_budget():
+    selector = ExcerptSelector(budget=20)
+    selector.add('small.php', {'score': 1, 'tokens': 10, 'text': "small"})
+    selector.add('big.php', {'score': 9, 'tokens': 10, 'text': "big"})
+    selector.add('mid.php', {'score': 5, 'tokens': 10, 'text': "mid"})
+    assert selector.selected() == [['big.php', "big"], ['mid.php', "mid"]]
+    assert selector.dropped == 1
+
+def test_one_batch_is_summarized_in_one_request(stub):
+    highlights = summarize_release(excerpts_for('app/Invoice.php', 'app/Order.php'), settings=settings_for(stub))
+    assert highlights == ["Updated Invoice.php", "Updated Order.php"]
+    assert stub.requests == 1
+
+def test_batches_are_merged_by_a_final_request(stub):
+    # Every excerpt fills a batch of its own
+    highlights = summarize_release(excerpts_for('app/Invoice.php', 'app/Order.php'),
+                                   settings=settings_for(stub, batch_tokens=20))
+    assert highlights == ["Updated Invoice.php", "Updated Order.php"]
+    assert stub.requests == 3
+
+def test_cached_responses_are_not_requested_again(stub, tmp_path):
+    excerpts = excerpts_for('app/Invoice.php')
+    cache = AnalysisCache(tmp_path, 1024 * 1024)
+    first = summarize_release(excerpts, cache=cache, settings=settings_for(stub))
+    second = summarize_release(excerpts, cache=cache, settings=settings_for(stub))
+    assert first == second == ["Updated Invoice.php"]
+    assert stub.requests == 1
+
+def test_rate_limits_are_retried(stub, no_retry_delay):
+    stub.faults = ['rate_limit', 'server_error']
+    highlights = summarize_release(excerpts_for('app/Invoice.php'), settings=settings_for(stub))
+    assert highlights == ["Updated Invoice.php"]
+    assert stub.requests == 3
+
+def test_exhausted_retries_leave_no_highlights(stub, no_retry_delay):
+    stub.faults = ['rate_limit'] * 3
+    assert summarize_release(excerpts_for('app/Invoice.php'), settings=settings_for(stub)) == []
+    assert stub.requests == 3
+
+def test_malformed_responses_leave_no_highlights(stub, tmp_path):
+    stub.faults = ['malformed']
+    cache = AnalysisCache(tmp_path, 1024 * 1024)
+    assert summarize_release(excerpts_for('app/Invoice.php'), cache=cache, settings=settings_for(stub)) == []
+    # Nothing was cached for the failed prompt, so the next run asks again
+    assert summarize_release(excerpts_for('app/Invoice.php'), cache=cache, settings=settings_for(stub)) == [
+        "Updated Invoice.php"
+    ]
+    assert stub.requests == 2
+
+def test_a_malformed_batch_does_not_lose_the_others(stub):
+    stub.faults = ['malformed']
+    highlights = summarize_release(excerpts_for('app/Invoice.php', 'app/Order.php'),
+                                   settings=settings_for(stub, batch_tokens=20))
+    # One batch summary is left, so there is nothing to merge
+    assert len(highlights) == 1 and highlights[0] in ("Updated Invoice.php", "Updated Order.php")
+    assert stub.requests == 2
+
+def test_summaries_are_skipped_without_settings(monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    assert summarize_release(excerpts_for('app/Invoice.php')) == []
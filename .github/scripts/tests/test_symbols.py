@@ -0,0 +1,94 @@
+from release_notes.patches import parse_patch
+from release_notes.symbols import CLASS, COMPONENT, FUNCTION, extract_symbols
+
+def patch(*lines, context="", start=1):
+    return parse_patch("\n".join([f"@@ -{start},9 +{start},9 @@ {context}".rstrip(), *lines]))
+
+def test_php_added_changed_and_removed():
+    changes = extract_symbols(patch(
+        " class Invoice {",
+        "-    public function total() {",
+        "-        return 1;",
+        "-    }",
+        "+    public function sum() {",
+        "+        return 2;",
+        "+    }",
+        "     private function tax() {",
+        "-        return 0;",
+        "+        return 0.2;",
+        "     }",
+        " }",
+    ), "app/Invoice.php")
+    assert changes.added == {FUNCTION: ['sum']}
+    assert changes.removed == {FUNCTION: ['total']}
+    assert changes.changed == {FUNCTION: ['tax'], CLASS: ['Invoice']}
+
+def test_function_context_seeds_the_scope():
+    changes = extract_symbols(patch(
+        "     $total = 0;",
+        "-    return $total;",
+        "+    return $total + 1;",
+        " }",
+        context="public function render()",
+    ), "app/View.php")
+    assert changes.changed == {FUNCTION: ['render']}
+    assert not changes.added and not changes.removed
+
+def test_closures_inside_functions_are_not_symbols():
+    changes = extract_symbols(patch(
+        " function load() {",
+        "+    const parse = (text) => {",
+        "+        return JSON.parse(text);",
+        "+    };",
+        " }",
+    ), "src/load.js")
+    assert changes.added == {}
+    assert changes.changed == {FUNCTION: ['load']}
+
+def test_strings_and_comments_do_not_open_scopes():
+    changes = extract_symbols(patch(
+        "+function quote() {",
+        "+    return \"{\"; // }",
+        "+}",
+        "+function after() {",
+        "+}",
+    ), "src/quote.js")
+    assert changes.added == {FUNCTION: ['quote', 'after']}
+
+def test_python_scopes_follow_indentation():
+    changes = extract_symbols(patch(
+        " class Service:",
+        "     def load(self):",
+        "-        return 1",
+        "+        return 2",
+        " ",
+        "+def helper():",
+        "+    pass",
+    ), "app/service.py")
+    assert changes.added == {FUNCTION: ['helper']}
+    assert changes.changed == {FUNCTION: ['load'], CLASS: ['Service']}
+
+def test_hunks_of_one_shape_are_told_apart_by_their_names():
+    changes = extract_symbols(parse_patch("\n".join([
+        "@@ -1,2 +1,2 @@", "+function one() {", "+}",
+        "@@ -9,2 +9,2 @@", "+function two() {", "+}",
+    ])), "a.js")
+    assert changes.added == {FUNCTION: ['one', 'two']}
+
+def test_patches_do_not_share_tokens():
+    first = extract_symbols(patch("+function kept() {", "+}"), "a.php")
+    second = extract_symbols(patch(" function kept() {", "+    return 1;", " }"), "b.php")
+    assert first.added == {FUNCTION: ['kept']}
+    assert second.changed == {FUNCTION: ['kept']} and not second.added
+
+def test_blade_templates_declare_php_and_use_components():
+    changes = extract_symbols(patch(
+        " @php",
+        "+    function price($item) {",
+        "+        return $item->price;",
+        "+    }",
+        " @endphp",
+        "+<x-alert type=\"info\" />",
+        "+@livewire('cart')",
+    ), "resources/views/cart.blade.php")
+    assert changes.added == {FUNCTION: ['price'], COMPONENT: ['alert', 'cart']}
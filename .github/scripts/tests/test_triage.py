@@ -0,0 +1,87 @@
+import pytest
+
+from release_notes.analysis import (
+    analyze_change_stream,
+    analyze_changes_with_ai,
+    analyze_file_changes,
+    determine_version_increment,
+    triage_file,
+)
+from release_notes.models import ChangedFile
+from release_notes.notes import format_release_notes, render_release_notes
+from release_notes.triage import classify_commits, parse_commit_message
+
+COMMIT_INFO = {'date': '2026-01-02', 'time': '03:04:05', 'author': 'dev'}
+
+def changed_file(filename, patch, status='modified'):
+    file = ChangedFile(filename, status)
+    file.patch = patch
+    file.additions = sum(1 for line in patch.splitlines() if line.startswith('+'))
+    file.deletions = sum(1 for line in patch.splitlines() if line.startswith('-'))
+    return file
+
+# Patches whose keywords would call for notes and bumps if they were scanned
+DOCS = changed_file('README.md', "@@ -1 +1,2 @@\n # App\n+Fix the api to delete users")
+ROUTES = changed_file('routes/api.php', "@@ -1,2 +0,0 @@\n-Route::get('/users', 'index');\n-Route::post('/users', 'store');",
+                      status='removed')
+VENDORED = changed_file('vendor/lib/Api.php', "@@ -1 +1 @@\n-api delete\n+api remove")
+CODE = changed_file('app/Users.php', "@@ -1 +1 @@\n-$fixed = false; // bug\n+$fixed = true; // bug")
+
+def test_files_are_skipped_settled_or_scanned():
+    assert triage_file(VENDORED) == ('vendored', None)
+    assert triage_file(DOCS)[1].message == "Documentation"
+    assert triage_file(ROUTES)[1].bump == 'major'
+    assert triage_file(CODE) == (None, None)
+
+def test_only_ci_configuration_under_github_is_settled_as_ci():
+    workflow = changed_file('.github/workflows/release.yml', "@@ -1 +1 @@\n-on: push\n+on: release")
+    dependabot = changed_file('.github/dependabot.yml', "@@ -1 +1 @@\n-version: 1\n+version: 2")
+    script = changed_file('.github/scripts/release_notes/analysis.py', "@@ -1 +1 @@\n-x = 1\n+x = 2")
+    assert triage_file(workflow)[1].message == "Build and CI configuration"
+    assert triage_file(dependabot)[1].message == "Build and CI configuration"
+    assert triage_file(script) == (None, None)
+
+def test_settling_can_be_turned_off(monkeypatch):
+    monkeypatch.setenv('RELEASE_NOTES_TIERED', '0')
+    assert triage_file(DOCS) == (None, None)
+    assert triage_file(VENDORED) == ('vendored', None)
+
+def test_settled_files_are_described_by_their_rule():
+    analysis = analyze_file_changes(DOCS)
+    assert (analysis['changes'], analysis['additions'], analysis['deletions']) == ("Documentation", 1, 0)
+
+def test_settled_files_call_for_their_rule_bump():
+    assert determine_version_increment({'files': [CODE, ROUTES]}) == (True, False, False)
+    assert determine_version_increment({'files': [DOCS, CODE]}) == (False, False, True)
+
+@pytest.mark.parametrize('tiered', ['1', '0'])
+def test_legacy_functions_agree_with_the_stream(monkeypatch, tiered):
+    monkeypatch.setenv('RELEASE_NOTES_TIERED', tiered)
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    files = [DOCS, ROUTES, VENDORED, CODE]
+    stream = analyze_change_stream({'files': iter(files)})
+    changes = {'files': files, 'commits': []}
+    summary = analyze_changes_with_ai(changes)
+
+    assert determine_version_increment(changes) == stream['version_increment']
+    assert summary == stream['analysis_summary']
+    assert format_release_notes(COMMIT_INFO, changes, summary, "1.0.0") == \
+        render_release_notes(COMMIT_INFO, stream['categories'], "1.0.0")
+
+def test_conventional_commit_messages():
+    assert parse_commit_message("feat(api)!: add exports\n\nBody") == {
+        'type': 'feat', 'scope': 'api', 'breaking': True, 'description': "add exports"
+    }
+    assert parse_commit_message("fix: typo\n\nBREAKING CHANGE: renamed the flag")['breaking']
+    assert parse_commit_message("Update README") is None
+
+def test_commits_give_entries_and_bump():
+    tier = classify_commits([
+        {'message': "feat(api): add exports"},
+        {'message': "fix: handle empty lists"},
+        {'message': "fix: handle empty lists"},
+        {'message': "Merge branch 'main'"},
+    ])
+    assert tier['bump'] == 'minor'
+    assert tier['conventional'] == 3
+    assert tier['entries'] == {'features': ["api: Add exports"], 'bugs': ["Handle empty lists"]}